@@ -0,0 +1,122 @@
+"""Barge-in through a fake duplex sound card.
+
+    python bench/bargein_bench.py [--trials 3] [--echo-gain 0.5] [--delay-ms 40]
+
+Karen "speaks" a reply of syllable-shaped noise with two bursts of the wake
+tone in it (her saying her own name), and FakeDuplex leaks the speaker back
+into the mic. Part-way through, the scripted user says the wake word. The
+wake word here is a 1 kHz tone scored by a one-bin DFT standing in for
+openWakeWord, so the run needs no model files.
+
+For each setting (echo canceller on/off) reports self-triggers on Karen's
+own voice, missed barge-ins, the time from detection until the turn is
+cancelled, and from the start of the user's wake word to silence (which
+includes the detector needing a few frames of it). Exits non-zero if the
+canceller lets Karen wake herself, misses the user, or cancelling takes
+longer than --max-cancel-ms.
+"""
+import argparse, asyncio, os, sys, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from karen.audio_io import Speaker  # noqa: E402
+from karen.bargein import EchoCanceller, interruptible  # noqa: E402
+from karen.capture import CaptureHub  # noqa: E402
+from karen.fakeaudio import FakeDuplex  # noqa: E402
+from karen.metrics import metrics  # noqa: E402
+from karen.wake import WakeWordService, FRAME_SAMPLES  # noqa: E402
+
+RATE = 16000
+TONE_HZ = 1000.0
+REPLY_S = 6.0
+KAREN_TONES = [(1.0, 1.4), (2.5, 2.9)]   # Karen says "Karen"
+USER_TONE = (3.6, 4.0)                   # the user barges in
+CHUNK = 800                              # 50 ms, as TTS delivers
+
+class ToneModel:
+    """Scores the 1 kHz wake tone by its amplitude in one DFT bin."""
+    def __init__(self, full_scale: float = 0.1):
+        n = np.arange(FRAME_SAMPLES)
+        self._basis = np.exp(-2j * np.pi * TONE_HZ * n / RATE)
+        self.full_scale = full_scale
+
+    def predict(self, frame_i16: np.ndarray) -> dict[str, float]:
+        frame_i16 = frame_i16[-FRAME_SAMPLES:]  # a batch is scored at its end, like openWakeWord
+        amp = 2.0 * abs(np.dot(frame_i16, self._basis)) / len(frame_i16) / 32767.0
+        return {"tone": min(1.0, amp / self.full_scale)}
+
+def tone(t: np.ndarray, spans, amp: float) -> np.ndarray:
+    out = np.zeros_like(t)
+    for a, b in spans:
+        m = (t >= a) & (t < b)
+        out[m] = amp * np.sin(2 * np.pi * TONE_HZ * t[m])
+    return out
+
+def karen_reply(rng) -> np.ndarray:
+    t = np.arange(int(REPLY_S * RATE)) / RATE
+    syllables = 0.5 + 0.5 * np.sin(2 * np.pi * 4.0 * t) ** 2
+    voice = rng.standard_normal(len(t)) * 0.2 * syllables
+    for a, b in KAREN_TONES:
+        voice[(t >= a) & (t < b)] = 0.0
+    return (voice + tone(t, KAREN_TONES, 0.5)).astype(np.float32)
+
+def user_track(rng) -> np.ndarray:
+    t = np.arange(int((REPLY_S + 1.0) * RATE)) / RATE
+    room = rng.standard_normal(len(t)) * 0.002
+    return (room + tone(t, [USER_TONE], 0.15)).astype(np.float32)
+
+async def trial(use_echo: bool, args, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    duplex = FakeDuplex([user_track(rng)], samplerate=RATE, echo_gain=args.echo_gain,
+                        echo_delay_ms=args.delay_ms, latency=0.05)
+    reply = karen_reply(rng)
+    async with CaptureHub(rate=RATE, stream_factory=duplex.input_stream) as hub:
+        echo = EchoCanceller(hub) if use_echo else None
+        async with Speaker(rate=RATE, echo=echo, stream_factory=duplex.output_stream) as spk, \
+                WakeWordService(hub, model=ToneModel(), echo=echo, threshold=0.5,
+                                trigger_level=2, cooldown_ms=0) as wake:
+            spk.volume = 1.0
+            t0 = time.monotonic()
+
+            async def speak():
+                for i in range(0, len(reply), CHUNK):
+                    await spk.play_pcm(reply[i:i + CHUNK])
+                await spk.drain()
+
+            metrics.set("barge_in.cancel_ms", float("nan"))
+            start = await interruptible(speak(), wake, spk)
+            t_quiet = time.monotonic()
+            user_start = hub.time_at(int(USER_TONE[0] * RATE))
+    return {
+        "self_trigger": start is not None and wake.trigger_ts < user_start,
+        "missed": start is None,
+        "cancel_ms": metrics.get("barge_in.cancel_ms"),
+        "to_silence_ms": (t_quiet - user_start) * 1000.0,
+        "talked_s": t_quiet - t0,
+        "erle_db": echo.erle_db if echo else float("nan"),
+    }
+
+async def run(args) -> int:
+    failed = False
+    print(f"{'echo':>5} {'trial':>5} {'self-trig':>9} {'missed':>6} {'cancel ms':>9} "
+          f"{'to quiet ms':>11} {'talked s':>8} {'erle dB':>7}")
+    for use_echo in (False, True):
+        for i in range(args.trials):
+            r = await trial(use_echo, args, seed=i)
+            print(f"{'on' if use_echo else 'off':>5} {i:>5} {str(r['self_trigger']):>9} {str(r['missed']):>6} "
+                  f"{r['cancel_ms']:9.1f} {r['to_silence_ms']:11.1f} {r['talked_s']:8.2f} {r['erle_db']:7.1f}")
+            if use_echo and (r["self_trigger"] or r["missed"] or not r["cancel_ms"] <= args.max_cancel_ms):
+                failed = True
+    return 1 if failed else 0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--trials", type=int, default=3)
+    ap.add_argument("--echo-gain", type=float, default=0.5, help="speaker-to-mic coupling")
+    ap.add_argument("--delay-ms", type=float, default=40.0, help="acoustic delay, speaker to mic")
+    ap.add_argument("--max-cancel-ms", type=float, default=100.0)
+    args = ap.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Endpointer accuracy and latency report over a labeled WAV corpus.
+
+    python bench/endpoint_report.py --synth corpus/endpoint   # make a corpus
+    python bench/endpoint_report.py corpus/endpoint
+
+A corpus is a directory of 16-bit mono WAVs plus `labels.json` mapping each
+file name to [speech_onset_s, speech_end_s]. Each file should start with
+at least 0.5 s of background, which is used to prime the noise floor the
+way Mic primes it from audio before the wake word. Files are fed to the
+Endpointer in random block sizes (as a blocksize=0 device would), and the
+report gives endpoint latency (detection time minus true end of speech),
+truncation rate (speech cut off early) and miss rate (no speech found).
+"""
+import argparse, json, os, sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from karen.endpoint import Endpointer  # noqa: E402
+from karen.fakeaudio import read_wav, write_wav  # noqa: E402
+
+PRIME_S = 0.5
+TRUNC_TOL_S = 0.1
+
+def synth_corpus(path: str, n: int, rate: int = 16000, seed: int = 0):
+    """Write n utterances of syllable-like harmonic bursts over noise at varied SNR."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(path, exist_ok=True)
+    labels = {}
+    for k in range(n):
+        lead = rng.uniform(0.6, 1.5)
+        parts, t = [], 0.0
+        for _ in range(rng.integers(3, 14)):
+            dur = rng.uniform(0.08, 0.25)
+            tt = np.arange(int(dur * rate)) / rate
+            f0 = rng.uniform(110, 230)
+            syl = sum(np.sin(2 * np.pi * f0 * h * tt) / h for h in range(1, 8))
+            parts.append(syl * np.hanning(len(tt)) * rng.uniform(0.05, 0.3))
+            # short gaps between syllables, occasionally a thinking pause
+            gap = rng.uniform(0.02, 0.12) if rng.random() > 0.15 else rng.uniform(0.2, 0.4)
+            parts.append(np.zeros(int(gap * rate)))
+        speech = np.concatenate(parts[:-1])
+        tail = 2.0
+        audio = np.concatenate([np.zeros(int(lead * rate)), speech, np.zeros(int(tail * rate))])
+        noise_db = rng.uniform(-65, -35)
+        noise = np.cumsum(rng.standard_normal(len(audio))) * 0.02   # reddish
+        noise = noise - np.convolve(noise, np.ones(64) / 64, mode="same")
+        noise *= 10 ** (noise_db / 20) / (np.sqrt(np.mean(noise ** 2)) + 1e-12)
+        name = f"utt_{k:04d}.wav"
+        write_wav(os.path.join(path, name), (audio + noise).astype(np.float32), rate)
+        labels[name] = [round(lead, 4), round(lead + len(speech) / rate, 4)]
+    with open(os.path.join(path, "labels.json"), "w") as f:
+        json.dump(labels, f, indent=1)
+    print(f"wrote {n} utterances to {path}")
+
+def run_file(audio: np.ndarray, rate: int, rng) -> tuple[float | None, float | None, float]:
+    ep = Endpointer(rate)
+    p = int(PRIME_S * rate)
+    ep.prime(audio[:p])
+    pos = p
+    while pos < len(audio):
+        n = int(rng.integers(64, 1024))
+        block = audio[pos:pos + n]
+        pos += len(block)
+        if ep.push(block):
+            break
+    onset = None if ep.onset is None else (p + ep.onset) / rate
+    end = None if ep.end is None else (p + ep.end) / rate
+    return onset, end, pos / rate
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("corpus", nargs="?")
+    ap.add_argument("--synth", metavar="DIR", help="write a synthetic labeled corpus to DIR")
+    ap.add_argument("-n", type=int, default=200, help="utterances to synthesize")
+    args = ap.parse_args()
+    if args.synth:
+        synth_corpus(args.synth, args.n)
+        if not args.corpus:
+            return
+    if not args.corpus:
+        ap.error("corpus directory required")
+
+    with open(os.path.join(args.corpus, "labels.json")) as f:
+        labels = json.load(f)
+    rng = np.random.default_rng(1)
+    lat, truncated, missed = [], 0, 0
+    for name, (t_on, t_end) in sorted(labels.items()):
+        audio, rate = read_wav(os.path.join(args.corpus, name))
+        onset, end, detected_at = run_file(audio, rate, rng)
+        if onset is None or end is None:
+            missed += 1
+            continue
+        if end < t_end - TRUNC_TOL_S:
+            truncated += 1
+        lat.append(detected_at - t_end)
+    n = len(labels)
+    print(f"utterances      {n}")
+    print(f"missed          {missed} ({100 * missed / n:.1f}%)")
+    print(f"truncated       {truncated} ({100 * truncated / n:.1f}%)")
+    if lat:
+        ms = np.array(lat) * 1000
+        print(f"endpoint ms     p50 {np.percentile(ms, 50):.0f}  p95 {np.percentile(ms, 95):.0f}  max {ms.max():.0f}")
+
+if __name__ == "__main__":
+    main()
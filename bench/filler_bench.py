@@ -0,0 +1,164 @@
+"""Filler scheduling: dead air and collisions with the reply, old vs new.
+
+    python bench/filler_bench.py [--turns 30] [--seed 0]
+
+Runs thinking phases through the real Speaker on a FakeOutputStream, with
+fillers from the stub TTS via the phrase cache. Each turn the reply's
+first audio is ready after a wait drawn from a mix of fast, medium and slow
+turns (--fast/--medium/--slow medians in seconds, lognormal --jitter), and
+is then a 1 s tone on the reply voice. Three workloads (MIXES): replies
+that are all fast, a mix of all three, and a model that is always slow.
+Compares:
+
+  old  what Filler used to do: a filler after a random 2.5-4 s, stopped
+       when the first sentence's text arrived, --tts-s before its audio
+  new  Filler with ReplyWaits learning the waits as it goes, stopped with
+       stop(ready=True) when the first reply audio is ready
+
+and reports, per turn, dead air (silence from the end of the question to
+the reply, as recorded by run_turn's turn.dead_air_ms, and as measured on
+the device's output blocks), fillers started and fillers cut off by the
+reply (it fades out over SPEAKER_FADE_MS; speaker_bench.py checks that
+crossfade). Exits non-zero if, in any workload, the new scheduler cuts off
+a larger share of its fillers than the old one, or has more mean dead air
+than the old one plus --tolerance.
+"""
+import argparse, asyncio, functools, os, random, sys, tempfile, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from karen.config import settings  # noqa: E402
+from karen import filler as filler_mod, main as km  # noqa: E402
+from karen.audio_io import Speaker  # noqa: E402
+from karen.fakeaudio import FakeOutputStream  # noqa: E402
+from karen.metrics import metrics  # noqa: E402
+from karen.tts import TTS  # noqa: E402
+
+RATE = 16000
+CHUNK = 800  # 50 ms
+# workload: chance of a fast, medium and slow turn
+MIXES = {"fast": (1.0, 0.0, 0.0), "mixed": (0.5, 0.35, 0.15), "slow": (0.0, 0.0, 1.0)}
+
+class BenchUI:
+    def show_karen(self, text: str):
+        pass
+
+class OldFiller:
+    """Filler as it was: a random 2.5-4 s wait, then a phrase."""
+    def __init__(self, ui, tts, spk):
+        self.ui, self.tts, self.spk = ui, tts, spk
+        self._task = None
+        self._speaking = False
+
+    async def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._speaking:
+            metrics.inc("filler.cut")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        await self.spk.flush("filler", wait=False)
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(random.uniform(2.5, 4.0))
+            phrase = random.choice(settings.FILLERS)
+            metrics.inc("filler.started")
+            self._speaking = True
+            async for chunk in self.tts.stream(phrase, cached=True, trace=False):
+                await self.spk.play_pcm(chunk, voice="filler")
+            await self.spk.drain("filler")
+            self._speaking = False
+
+def waits(mix: str, args) -> np.ndarray:
+    rng = np.random.default_rng(args.seed)
+    medians = rng.choice([args.fast, args.medium, args.slow], size=args.turns, p=MIXES[mix])
+    return medians * np.exp(rng.normal(0.0, args.jitter, size=args.turns))
+
+def reply_tone() -> np.ndarray:
+    t = np.arange(RATE) / RATE
+    return (0.3 * np.sin(2 * np.pi * 220.0 * t)).astype(np.float32)
+
+async def run_mode(name: str, mix: str, args) -> dict:
+    random.seed(args.seed)
+    filler_mod.waits = filler_mod.ReplyWaits()
+    started, cut = metrics.get("filler.started"), metrics.get("filler.cut")
+    blocks: list[tuple[float, float]] = []  # (time heard, peak) of every output block
+    factory = functools.partial(FakeOutputStream, latency=0.05,
+                                on_play=lambda d, t: blocks.append((t, float(np.abs(d).max()))))
+    ui, reply = BenchUI(), reply_tone()
+    dead, device = [], []
+    async with TTS() as tts, Speaker(rate=RATE, stream_factory=factory) as spk:
+        await tts.prewarm(settings.FILLERS)
+        for wait in waits(mix, args):
+            said = time.monotonic()
+            if name == "old":
+                filler = OldFiller(ui, tts, spk)
+                await filler.start()
+                await asyncio.sleep(max(0.0, wait - args.tts_s))  # first sentence text
+                await filler.stop()
+                await asyncio.sleep(max(0.0, said + wait - time.monotonic()))
+            else:
+                filler = filler_mod.Filler(ui, tts, spk, since=said)
+                await filler.start()
+                await asyncio.sleep(wait)
+                await filler.stop(ready=True)
+            for i in range(0, len(reply), CHUNK):
+                await spk.play_pcm(reply[i:i + CHUNK])
+            await spk.drain()
+            km._record_dead_air(spk, said)
+            dead.append(metrics.get("turn.dead_air_ms"))
+            # the same from the device side: every block is reported, silent or not
+            heard = spk.reply_heard(said)
+            quiet = sum(1 for t, peak in blocks if said <= t < heard and peak < 1e-3)
+            device.append(quiet * spk.block / RATE * 1000.0)
+            await asyncio.sleep(args.pause)
+    dead_a, device_a = np.array(dead), np.array(device)
+    return {
+        "turns": len(dead), "mean": float(dead_a.mean()), "p50": float(np.percentile(dead_a, 50)),
+        "p95": float(np.percentile(dead_a, 95)), "device": float(device_a.mean()),
+        "started": metrics.get("filler.started") - started, "cut": metrics.get("filler.cut") - cut,
+    }
+
+async def run(args) -> int:
+    settings.TTS_PROVIDER = "stub"
+    settings.TTS_CACHE_DIR = tempfile.mkdtemp(prefix="karen_bench_tts_")
+    print(f"{'mix':>5} {'filler':>6} {'turns':>5} {'dead air ms':>11} {'p50':>6} {'p95':>6} {'device ms':>9} "
+          f"{'fillers':>7} {'cut off':>7}")
+    failures = []
+    for mix in MIXES:
+        results = {}
+        for name in ("old", "new"):
+            r = results[name] = await run_mode(name, mix, args)
+            r["cut_rate"] = r["cut"] / max(1.0, r["started"])
+            print(f"{mix:>5} {name:>6} {r['turns']:5d} {r['mean']:11.0f} {r['p50']:6.0f} {r['p95']:6.0f} "
+                  f"{r['device']:9.0f} {r['started']:7.0f} {r['cut']:7.0f} ({r['cut_rate']:.0%})")
+        new, old = results["new"], results["old"]
+        if new["cut_rate"] > old["cut_rate"]:
+            failures.append(f"{mix}: {new['cut_rate']:.0%} of fillers cut off, old {old['cut_rate']:.0%}")
+        if new["mean"] > old["mean"] * (1.0 + args.tolerance):
+            failures.append(f"{mix}: dead air {new['mean']:.0f} ms, old {old['mean']:.0f} ms")
+    for msg in failures:
+        print(f"FAIL {msg}")
+    return 1 if failures else 0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--turns", type=int, default=30)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--fast", type=float, default=0.9, help="median wait of fast turns, s")
+    ap.add_argument("--medium", type=float, default=2.2)
+    ap.add_argument("--slow", type=float, default=4.5)
+    ap.add_argument("--jitter", type=float, default=0.25, help="lognormal sigma")
+    ap.add_argument("--tts-s", type=float, default=0.25, help="first sentence text to its first audio")
+    ap.add_argument("--pause", type=float, default=0.2, help="between turns, seconds")
+    ap.add_argument("--tolerance", type=float, default=0.05, help="allowed mean dead air over the old scheduler")
+    args = ap.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Shared HTTPS connection pool: reuse across STT, LLM and TTS, and warm-up.
+
+    python bench/http_pool_bench.py [--turns 5]
+
+Serves bench/stub_openai.py over TLS with a throwaway self-signed
+certificate (made with the openssl command line tool) and runs turns
+through the real STT, LLM and TTS frontends with the "openai" providers:
+a batch transcription, a streamed reply and streamed speech per turn.
+Connections and TLS handshakes are counted from httpcore's trace events,
+as ClientPool.stats() reports them. Two sessions:
+
+  cold  turns with no warm-up: the first request pays for TCP + TLS
+  warm  clients.warm() at the wake word, then --speech-s of the user
+        talking before the turn's first request, as serve() does
+
+and reports per session requests, connections, handshakes and the time to
+the first transcript. Exits non-zero if a turn after the first opens a
+connection, or the cold session needs more than one (two over HTTP/1.1,
+where the reply's speech is fetched while its text is still streaming), or
+if any warm-session turn has to do a TLS handshake itself.
+"""
+import argparse, asyncio, os, ssl, subprocess, sys, tempfile, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from karen.clients import HAS_HTTP2, clients  # noqa: E402
+from karen.config import settings  # noqa: E402
+from karen.llm import LLM  # noqa: E402
+from karen.stt import STT  # noqa: E402
+from karen.tts import TTS  # noqa: E402
+from stub_openai import StubOpenAI  # noqa: E402
+
+RATE = 16000
+
+def self_signed(folder: str) -> ssl.SSLContext:
+    """A server context for 127.0.0.1; the certificate is trusted through SSL_CERT_FILE."""
+    cert, key = os.path.join(folder, "cert.pem"), os.path.join(folder, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "ec", "-pkeyopt", "ec_paramgen_curve:prime256v1",
+                    "-nodes", "-keyout", key, "-out", cert, "-days", "1", "-subj", "/CN=127.0.0.1",
+                    "-addext", "subjectAltName=IP:127.0.0.1"], check=True, capture_output=True)
+    os.environ["SSL_CERT_FILE"] = cert  # read by httpx when the pool's client is built
+    ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    ctx.load_cert_chain(cert, key)
+    return ctx
+
+def utterance() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    audio = 0.001 * rng.standard_normal(2 * RATE)
+    audio[RATE // 2:3 * RATE // 2] += 0.2 * np.sin(2 * np.pi * 180.0 * np.arange(RATE) / RATE)
+    return audio.astype(np.float32)
+
+def counters() -> dict[str, float]:
+    return dict(clients.stats())
+
+def delta(before: dict[str, float]) -> dict[str, float]:
+    return {k: v - before[k] for k, v in counters().items()}
+
+async def session(name: str, url: str, args) -> dict:
+    settings.OPENAI_BASE_URL = url
+    audio = utterance()
+    start, firsts, turn_handshakes, later = counters(), [], 0, 0
+    async with STT() as stt, LLM() as llm, TTS() as tts:
+        for i in range(args.turns):
+            if name == "warm":
+                stt.warm()  # the wake word
+                await asyncio.sleep(args.speech_s)
+            before = counters()
+            t0 = time.monotonic()
+            text = await stt.transcribe(audio, RATE)
+            firsts.append((time.monotonic() - t0) * 1000.0)
+            async for sentence in llm.stream(f"{text} (turn {i})"):
+                async for _ in tts.stream(sentence):
+                    pass
+            turn = delta(before)
+            turn_handshakes += turn["tls_handshakes"]
+            if i:
+                later += turn["connections"]
+            await asyncio.sleep(args.pause)
+    return {**delta(start), "first_ms": float(np.mean(firsts[1:] if len(firsts) > 1 else firsts)),
+            "first_turn_ms": firsts[0], "turn_handshakes": turn_handshakes, "later": later}
+
+async def run(args) -> int:
+    settings.STT_PROVIDER = settings.LLM_PROVIDER = settings.TTS_PROVIDER = "openai"
+    settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "stub"
+    settings.STT_UPLOAD_FORMAT = "wav"
+    settings.TTS_CACHE_DIR = ""
+    settings.RESPONSE_CACHE_PATH = ""
+    print(f"{'session':>7} {'turns':>5} {'requests':>8} {'connections':>11} {'handshakes':>10} "
+          f"{'in turns':>8} {'1st stt ms':>10} {'later':>6}")
+    failures, need = [], 1 if settings.HTTP2 and HAS_HTTP2 else 2
+    with tempfile.TemporaryDirectory(prefix="karen_bench_tls_") as folder:
+        tls = self_signed(folder)
+        for name in ("cold", "warm"):
+            async with StubOpenAI(base_ms=args.base_ms, tls=tls) as stub:
+                r = await session(name, stub.url, args)
+            print(f"{name:>7} {args.turns:5d} {r['requests']:8.0f} {r['connections']:11.0f} "
+                  f"{r['tls_handshakes']:10.0f} {r['turn_handshakes']:8.0f} {r['first_turn_ms']:10.1f} "
+                  f"{r['first_ms']:6.1f}")
+            if r["requests"] < 3 * args.turns:
+                failures.append(f"{name}: {r['requests']:.0f} requests for {args.turns} turns")
+            if r["later"]:
+                failures.append(f"{name}: {r['later']:.0f} connections opened after the first turn")
+            if name == "cold" and r["connections"] > need:
+                failures.append(f"cold: {r['connections']:.0f} connections for STT, LLM and TTS, want {need}")
+            if name == "warm" and r["turn_handshakes"]:
+                failures.append(f"warm: {r['turn_handshakes']:.0f} TLS handshakes inside turns after warm()")
+    for msg in failures:
+        print(f"FAIL {msg}")
+    return 1 if failures else 0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--turns", type=int, default=5)
+    ap.add_argument("--base-ms", type=float, default=30.0, help="stub latency per request")
+    ap.add_argument("--speech-s", type=float, default=0.5, help="wake word to the turn's first request")
+    ap.add_argument("--pause", type=float, default=0.2, help="between turns, seconds")
+    args = ap.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+if __name__ == "__main__":
+    main()
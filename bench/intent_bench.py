@@ -0,0 +1,93 @@
+"""Local intent matching: accuracy on utterance->intent cases and latency
+versus the LLM path.
+
+    python bench/intent_bench.py
+
+Exits non-zero if any case is misclassified. The LLM path is measured
+against bench/stub_openai.py with its default latency model, so real API
+round trips will be much slower than shown.
+"""
+import asyncio, os, sys, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from karen.config import settings  # noqa: E402
+from karen.intents import intents, extract_actions  # noqa: E402
+from stub_openai import StubOpenAI  # noqa: E402
+
+CASES = [
+    ("Stop.", "stop"),
+    ("stop it", "stop"),
+    ("Karen, shut up!", "stop"),
+    ("okay please be quiet", "stop"),
+    ("cancel", "stop"),
+    ("Never mind.", "never_mind"),
+    ("nevermind", "never_mind"),
+    ("uh, forget it", "never_mind"),
+    ("Volume up", "volume_up"),
+    ("can you turn it up", "volume_up"),
+    ("louder please", "volume_up"),
+    ("turn the volume down", "volume_down"),
+    ("volume down", "volume_down"),
+    ("turn it down", "volume_down"),
+    ("quieter", "volume_down"),
+    ("What time is it?", "time"),
+    ("hey karen what's the time", "time"),
+    ("what day is it today", "date"),
+    ("What's the date?", "date"),
+    ("how do I stop Plankton from stealing the formula", None),
+    ("tell me a joke", None),
+    ("what time does the Krusty Krab open tomorrow", None),
+    ("why is everyone so quiet in here today", None),
+    ("", None),
+]
+
+def check_cases() -> int:
+    bad = 0
+    for text, want in CASES:
+        got = intents.match(text)
+        if got != want:
+            bad += 1
+            print(f"  MISS {text!r}: expected {want}, got {got}")
+    print(f"intent cases: {len(CASES) - bad}/{len(CASES)} correct")
+    clean, actions = extract_actions("Louder. Happy now? [[action:volume_up]]")
+    if clean != "Louder. Happy now?" or actions != [{"intent": "volume_up"}]:
+        bad += 1
+        print(f"  MISS action tag extraction: {clean!r} {actions}")
+    return bad
+
+def match_latency_us(n: int = 20000) -> np.ndarray:
+    texts = [t for t, _ in CASES]
+    out = np.empty(n)
+    for i in range(n):
+        t0 = time.perf_counter()
+        intents.match(texts[i % len(texts)])
+        out[i] = (time.perf_counter() - t0) * 1e6
+    return out
+
+async def llm_latency_ms(n: int = 30) -> np.ndarray:
+    from karen.llm import LLM
+    settings.LLM_PROVIDER = "openai"
+    settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "stub"
+    settings.RESPONSE_CACHE_PATH = ""
+    out = np.empty(n)
+    async with StubOpenAI() as stub:
+        settings.OPENAI_BASE_URL = stub.url
+        async with LLM() as llm:
+            for i in range(n):
+                t0 = time.perf_counter()
+                await llm.reply("what time is it")
+                out[i] = (time.perf_counter() - t0) * 1000
+    return out
+
+def main():
+    bad = check_cases()
+    us = match_latency_us()
+    ms = asyncio.run(llm_latency_ms())
+    print(f"local match   p50 {np.percentile(us, 50):8.1f} us   p99 {np.percentile(us, 99):8.1f} us")
+    print(f"LLM (stub)    p50 {np.percentile(ms, 50) * 1000:8.1f} us   p99 {np.percentile(ms, 99) * 1000:8.1f} us")
+    if bad:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
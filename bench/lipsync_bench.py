@@ -0,0 +1,253 @@
+"""Lip-sync: mouth frames against the audio heard, and UI CPU while Karen talks.
+
+    python bench/lipsync_bench.py [--seconds 8] [--latency-ms 80]
+
+Plays synthetic speech (syllables of shaped noise at random loudness, with
+pauses) through Speaker on a FakeOutputStream, whose on_play() reports each
+block with the time it is heard. A task standing in for the window asks
+the Speaker's LipSync for a mouth frame LIPSYNC_FPS times a second. The
+frames it should have shown are worked out afterwards from the device's
+own blocks. Reports, for the audio-driven mouth and for a GIF that
+free-runs while Karen talks:
+
+  match      frames equal to the expected one within one video frame
+  exact      frames equal to the expected one at the same moment
+  lag        shift of the shown openness against the heard audio that
+             fits best
+  onset      how far the mouth opening lags each syllable onset, p95
+
+With PySide6 installed it then drives the real window (Qt's offscreen
+platform, a generated 480x320 mouth GIF) during the same speech, each mode
+in a fresh interpreter: a still mouth, the old QMovie playing while Karen
+talks (decoding every frame, as large GIFs do, or with every frame cached)
+and QtUI's sprite atlas driven by LipSync. It reports process CPU per
+second of speech, the part of it the mouth costs over the still one, and
+mouth repaints per second.
+
+Exits non-zero if fewer than --min-match of the audio-driven frames match,
+the lag exceeds one video frame, or, with Qt, the sprite atlas uses as much
+CPU as the decoding QMovie.
+"""
+import argparse, asyncio, functools, json, os, struct, subprocess, sys, tempfile, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from karen.audio_io import Speaker  # noqa: E402
+from karen.config import settings  # noqa: E402
+from karen.fakeaudio import FakeOutputStream  # noqa: E402
+from karen.lipsync import LipSync  # noqa: E402
+
+RATE = 16000
+GIF_FPS = 25
+
+def speech(seconds: float, seed: int = 0) -> tuple[np.ndarray, list[float]]:
+    """Syllables of band-limited noise, -40 to -6 dBFS, with pauses; and their onsets in seconds."""
+    rng = np.random.default_rng(seed)
+    out, onsets, pos = [], [], 0
+    while pos < seconds * RATE:
+        n = int(rng.uniform(0.08, 0.25) * RATE)
+        gap = int(rng.choice([rng.uniform(0.03, 0.08), rng.uniform(0.15, 0.3)]) * RATE)
+        noise = np.convolve(rng.standard_normal(n), np.ones(8) / 8, mode="same")
+        shape = np.sin(np.pi * np.arange(n) / n) ** 0.5
+        gain = 10 ** (rng.uniform(-40, -6) / 20) / (noise.std() + 1e-9)
+        onsets.append(pos / RATE)
+        out += [noise * shape * gain, np.zeros(gap)]
+        pos += n + gap
+    return np.clip(np.concatenate(out), -1, 1).astype(np.float32), onsets
+
+async def play(audio: np.ndarray, mouth: LipSync | None, on_play, sample=None, latency: float = 0.08):
+    """Play `audio` through Speaker on a fake device; `sample(t)` runs every video frame meanwhile."""
+    factory = functools.partial(FakeOutputStream, latency=latency, on_play=on_play)
+    async with Speaker(rate=RATE, stream_factory=factory, mouth=mouth) as spk:
+        stop = asyncio.Event()
+        async def video():
+            period = 1.0 / settings.LIPSYNC_FPS
+            t_next = time.monotonic()
+            while not stop.is_set():
+                sample(time.monotonic())
+                t_next += period
+                await asyncio.sleep(max(0.0, t_next - time.monotonic()))
+        sampler = asyncio.create_task(video()) if sample else None
+        t0 = time.monotonic()
+        await spk.play_pcm(audio)
+        await spk.drain()
+        stop.set()
+        if sampler:
+            await sampler
+        return t0, time.monotonic()
+
+def score(shown: list[tuple[float, float]], truth: LipSync, frames: int) -> dict:
+    """Compare (time, openness) samples with what the heard audio says."""
+    t = np.array([s[0] for s in shown])
+    got = np.array([round(s[1] * (frames - 1)) for s in shown])
+    frame_s = truth.frame_s
+    expect = lambda dt: np.array([truth.frame(x + dt, frames) for x in t])
+    shifts = np.arange(-frame_s, frame_s + 1e-9, truth.hop_s)
+    hits = np.array([expect(dt) == got for dt in shifts])
+    # the shift of the shown openness that fits the audio best
+    lags = np.arange(-4 * frame_s, 4 * frame_s + 1e-9, truth.hop_s)
+    err = [np.abs(np.array([truth.openness(x + dt) for x in t]) - got / (frames - 1)).mean() for dt in lags]
+    return {
+        "match": float(hits.any(axis=0).mean()), "exact": float((expect(0.0) == got).mean()),
+        "lag_ms": float(lags[int(np.argmin(err))] * 1000.0),
+    }
+
+def onset_lag(shown: list[tuple[float, float]], onsets_t: list[float], frame_s: float) -> float:
+    """p95 of how long after each heard syllable onset the mouth first opens."""
+    t = np.array([s[0] for s in shown])
+    opened = np.array([s[1] > 0 for s in shown])
+    lags = []
+    for onset in onsets_t:
+        after = np.nonzero(opened & (t >= onset - frame_s))[0]
+        if len(after):
+            lags.append(max(0.0, t[after[0]] - onset) * 1000.0)
+    return float(np.percentile(lags, 95)) if lags else float("nan")
+
+async def alignment(args) -> dict:
+    audio, onsets = speech(args.seconds)
+    frames = settings.UI_MOUTH_FRAMES
+    heard: list[tuple[np.ndarray, float]] = []
+    mouth = LipSync(RATE)
+    shown: list[tuple[float, float]] = []
+    t0, t1 = await play(audio, mouth, lambda pcm, t: heard.append((pcm, t)),
+                        lambda t: shown.append((t, mouth.openness(t))), args.latency_ms / 1000.0)
+    truth = LipSync(RATE, history_s=args.seconds + 10.0)
+    for pcm, t in heard:
+        truth.played(pcm, t)
+    # syllable onsets on the device clock: where the heard audio starts
+    first = next(t for pcm, t in heard if np.abs(pcm).max() > 0)
+    onsets_t = [first + o for o in onsets]
+    results = {"audio": {**score(shown, truth, frames), "onset_ms": onset_lag(shown, onsets_t, truth.frame_s)}}
+    # the old mouth: the GIF free-runs from the moment Karen starts talking
+    gif = np.abs(np.sin(np.arange(frames * 2) * 2.1))  # openness of each GIF frame, in play order
+    free = [(t, gif[int((t - t0) * GIF_FPS) % len(gif)]) for t, _ in shown]
+    results["gif"] = {**score(free, truth, frames), "onset_ms": onset_lag(free, onsets_t, truth.frame_s)}
+    return results
+
+# --- the window, with Qt ---
+
+def write_gif(path: str, frames: list[np.ndarray], palette: np.ndarray, fps: float):
+    """An uncompressed animated GIF: 9-bit LZW literals, cleared before the code size grows."""
+    h, w = frames[0].shape
+    out = bytearray(b"GIF89a" + struct.pack("<HHBBB", w, h, 0xF7, 0, 0))
+    out += palette.astype(np.uint8).tobytes()
+    out += b"\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00"
+    for f in frames:
+        out += b"\x21\xf9\x04\x00" + struct.pack("<H", int(round(100 / fps))) + b"\x00\x00"
+        out += b"\x2c" + struct.pack("<HHHHB", 0, 0, w, h, 0) + b"\x08"
+        px = f.astype(np.uint16).ravel()
+        chunks = np.array_split(px, int(np.ceil(len(px) / 250)))
+        codes = np.concatenate([np.concatenate(([256], c)) for c in chunks] + [[257]]).astype(np.uint16)
+        bits = ((codes[:, None] >> np.arange(9)) & 1).astype(np.uint8).ravel()
+        bits = np.concatenate([bits, np.zeros(-len(bits) % 8, np.uint8)])
+        data = np.packbits(bits.reshape(-1, 8), axis=1, bitorder="little").ravel().tobytes()
+        for i in range(0, len(data), 255):
+            out += bytes([len(data[i:i + 255])]) + data[i:i + 255]
+        out += b"\x00"
+    out += b"\x3b"
+    with open(path, "wb") as f:
+        f.write(out)
+
+def mouth_gif(path: str, w: int = 480, h: int = 320, n: int = 16):
+    """A mouth that opens and closes out of order; frame 0 is closed."""
+    palette = np.zeros((256, 3))
+    palette[:4] = [(7, 10, 15), (90, 10, 25), (200, 60, 80), (240, 240, 240)]
+    y, x = np.mgrid[-h // 2:h // 2, -w // 2:w // 2] / np.array([h / 2, w / 2])[:, None, None]
+    frames = []
+    for o in [0.0] + list(np.random.default_rng(2).permutation(np.linspace(0.05, 1.0, n - 1))):
+        lips = (x / 0.8) ** 2 + (y / (0.12 + 0.6 * o)) ** 2 < 1
+        inside = (x / 0.7) ** 2 + (y / max(0.02, 0.5 * o)) ** 2 < 1
+        teeth = inside & (y < -0.5 * o * 0.6)
+        frames.append(np.where(teeth, 3, np.where(inside, 1, np.where(lips, 2, 0))).astype(np.uint8))
+    write_gif(path, frames, palette, GIF_FPS)
+
+async def window(args) -> dict:
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6 import QtCore, QtGui, QtWidgets
+    from karen.qt_ui import QtUI
+    audio, _ = speech(args.seconds)
+    ui = QtUI(args.gif)
+    view = ui.win.mouth
+    mouth = LipSync(RATE)
+    if args.child in ("decode", "cached"):
+        # the window as it was: a QLabel playing the GIF while Karen talks
+        view = QtWidgets.QLabel()
+        view.setAlignment(QtCore.Qt.AlignCenter)
+        ui.win.centralWidget().layout().replaceWidget(ui.win.mouth, view)
+        ui.win.mouth.hide()
+        movie = QtGui.QMovie(args.gif)
+        movie.setCacheMode(QtGui.QMovie.CacheAll if args.child == "cached" else QtGui.QMovie.CacheNone)
+        view.setMovie(movie)
+        movie.start()
+    elif args.child == "new":
+        ui.set_mouth(mouth)
+    paints = [0]
+    class Paints(QtCore.QObject):
+        def eventFilter(self, obj, ev):
+            if ev.type() == QtCore.QEvent.Paint:
+                paints[0] += 1
+            return False
+    counter = Paints()
+    view.installEventFilter(counter)
+    await asyncio.sleep(0.5)
+    paints[0] = 0
+    c0 = time.process_time()
+    t0, t1 = await play(audio, mouth if args.child == "new" else None, None, latency=args.latency_ms / 1000.0)
+    cpu = time.process_time() - c0
+    ui.close()
+    return {"cpu": cpu / (t1 - t0) * 100.0, "paints": paints[0] / (t1 - t0),
+            "frames": len(ui.win.mouth_frames)}
+
+def run_window(args) -> dict | None:
+    try:
+        import PySide6  # noqa: F401
+    except ImportError:
+        print("\nPySide6 is not installed; skipping the window.")
+        return None
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        gif = os.path.join(tmp, "mouth.gif")
+        mouth_gif(gif)
+        print(f"\n{'mouth':>18} {'cpu %':>6} {'for the mouth':>13} {'repaints/s':>10}")
+        for mode in ("still", "decode", "cached", "new"):
+            cmd = [sys.executable, __file__, "--child", mode, "--gif", gif, "--seconds", str(args.seconds),
+                   "--latency-ms", str(args.latency_ms)]
+            out = subprocess.run(cmd, capture_output=True, text=True)
+            if out.returncode:
+                sys.stderr.write(out.stderr)
+                return {}
+            r = results[mode] = json.loads(out.stdout.strip().splitlines()[-1])
+            name = {"still": "none (still)", "decode": "QMovie, no cache", "cached": "QMovie, cached",
+                    "new": f"atlas ({r['frames']} sprites)"}[mode]
+            print(f"{name:>18} {r['cpu']:6.1f} {r['cpu'] - results['still']['cpu']:13.1f} {r['paints']:10.1f}")
+    return results
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=8.0, help="speech per run")
+    ap.add_argument("--latency-ms", type=float, default=80.0, help="output device latency")
+    ap.add_argument("--min-match", type=float, default=0.98)
+    ap.add_argument("--child", choices=("still", "decode", "cached", "new"), help=argparse.SUPPRESS)
+    ap.add_argument("--gif", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        print(json.dumps(asyncio.run(window(args))))
+        return
+    results = asyncio.run(alignment(args))
+    frame_ms = 1000.0 / settings.LIPSYNC_FPS
+    print(f"{LipSync(RATE).frame_s * 1000:.0f} ms video frames, {settings.UI_MOUTH_FRAMES} mouth sprites")
+    print(f"{'mouth':>12} {'match':>6} {'exact':>6} {'lag ms':>7} {'onset ms p95':>12}")
+    for name, r in results.items():
+        label = "audio" if name == "audio" else "GIF"
+        print(f"{label:>12} {r['match']:6.1%} {r['exact']:6.1%} {r['lag_ms']:7.0f} {r['onset_ms']:12.0f}")
+    a = results["audio"]
+    ok = a["match"] >= args.min_match and abs(a["lag_ms"]) <= frame_ms
+    qt = run_window(args)
+    if qt == {}:
+        ok = False
+    elif qt:
+        ok = ok and qt["new"]["cpu"] < qt["decode"]["cpu"]
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
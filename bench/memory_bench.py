@@ -0,0 +1,68 @@
+"""Conversation-memory benchmark against a local stub LLM.
+
+    python bench/memory_bench.py [--turns 200]
+
+Runs a synthetic session through LLM.stream + LLM.remember and reports
+prompt tokens, prefix-cached tokens and reply latency per turn. Fails if
+the prompt size or latency of the last turns grows beyond the middle of
+the session by more than --max-growth.
+"""
+import argparse, asyncio, os, sys, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from karen.config import settings  # noqa: E402
+from karen.llm import LLM  # noqa: E402
+from stub_openai import StubOpenAI  # noqa: E402
+
+QUESTIONS = [
+    "what's the plan for stealing the krabby patty formula today",
+    "remind me what I asked you about the chum bucket menu",
+    "can you set a timer for my evil scheme",
+    "what do you think of spongebob",
+    "tell me a joke about mr krabs",
+]
+
+async def session(turns: int):
+    settings.LLM_PROVIDER = "openai"
+    settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "stub"
+    async with StubOpenAI() as stub:
+        settings.OPENAI_BASE_URL = stub.url
+        rows = []
+        async with LLM() as llm:
+            for i in range(turns):
+                text = f"{QUESTIONS[i % len(QUESTIONS)]} (turn {i})"
+                t0 = time.perf_counter()
+                n_req = len(stub.requests)
+                reply = [s async for s in llm.stream(text)]
+                lat = time.perf_counter() - t0
+                req = stub.requests[n_req]
+                llm.remember(text, " ".join(reply))
+                rows.append((req["prompt_tokens"], req["cached_tokens"], lat * 1000))
+                # the user takes a moment before the next question
+                await llm.memory.wait_idle()
+        folds = sum(1 for r in stub.requests if not r["stream"])
+    return np.array(rows), folds
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--turns", type=int, default=200)
+    ap.add_argument("--max-growth", type=float, default=1.5)
+    args = ap.parse_args()
+    rows, folds = asyncio.run(session(args.turns))
+    n = len(rows)
+    w = max(1, n // 10)
+    print(f"{'turns':>11} {'prompt tok':>11} {'cached tok':>11} {'latency ms':>11}")
+    for a in range(0, n, w):
+        seg = rows[a:a + w]
+        print(f"{a + 1:>5}-{a + len(seg):<5} {seg[:, 0].mean():11.0f} {seg[:, 1].mean():11.0f} {seg[:, 2].mean():11.1f}")
+    print(f"summaries: {folds}")
+    mid, last = rows[n // 2 - w // 2:n // 2 + w // 2 + 1], rows[-w:]
+    for col, name in ((0, "prompt tokens"), (2, "latency")):
+        growth = last[:, col].mean() / max(mid[:, col].mean(), 1e-9)
+        if growth > args.max_growth:
+            print(f"FAIL: {name} grew {growth:.2f}x from mid-session to the end")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""Network monitor: probes, probe time and wake-to-turn latency, old vs new.
+
+    python bench/netwatch_bench.py [--seconds 30] [--every 1.3]
+
+Probes a local TCP stand-in that is up for the first and last third of the
+run and down in between. While down its accept queue is full, so connects
+hang until they time out, like a dead uplink. A scripted wake word fires
+about every --every seconds and each turn takes --turn-s. Compares:
+
+  old  what serve() used to do: a blocking connect in the thread pool
+       before every wake.wait(), and a 1 s sleep after a failed one
+  new  NetWatch in the background, fed by each turn's API calls, with
+       main.online() checked after the wake word
+
+and reports wake words, turns started and turned away, detection-to-turn
+latency, probes, time spent probing and UI network-state updates. Exits
+non-zero if the new monitor's p95 latency exceeds --max-latency-ms or it
+probes as often as the old one.
+"""
+import argparse, asyncio, os, socket, sys, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from karen import main as km, netwatch  # noqa: E402
+from karen.netwatch import NetWatch  # noqa: E402
+
+class StandIn:
+    """A local TCP endpoint that can go dark: while down its accept queue is full."""
+    def __init__(self):
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(0)
+        self.sock.setblocking(False)
+        self.port = self.sock.getsockname()[1]
+        self.is_up = False
+        self._fill: list[socket.socket] = []
+        self._accepting: asyncio.Task | None = None
+
+    def up(self):
+        self.is_up = True
+        self._accepting = asyncio.create_task(self._accept())
+
+    def down(self):
+        self.is_up = False
+        if self._accepting:
+            self._accepting.cancel()
+        for _ in range(3):
+            c = socket.socket()
+            c.setblocking(False)
+            try:
+                c.connect(("127.0.0.1", self.port))
+            except BlockingIOError:
+                pass
+            self._fill.append(c)
+
+    async def _accept(self):
+        loop = asyncio.get_running_loop()
+        for c in self._fill:
+            c.close()
+        self._fill.clear()
+        while True:
+            conn, _ = await loop.sock_accept(self.sock)
+            conn.close()
+
+    def close(self):
+        if self._accepting:
+            self._accepting.cancel()
+        for c in self._fill:
+            c.close()
+        self.sock.close()
+
+class OldNetWatch:
+    """NetWatch as it was: a blocking connect in the default executor per call."""
+    def __init__(self, host: str, port: int, timeout: float = 0.6):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.probes, self.probe_s = 0, 0.0
+
+    async def ok(self) -> bool:
+        t0 = time.perf_counter()
+        self.probes += 1
+        try:
+            fut = asyncio.get_running_loop().run_in_executor(None, self._try_connect)
+            await asyncio.wait_for(fut, timeout=self.timeout + 0.2)
+            return True
+        except Exception:
+            return False
+        finally:
+            self.probe_s += time.perf_counter() - t0
+
+    def _try_connect(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.settimeout(self.timeout)
+            s.connect((self.host, self.port))
+
+class FakeWake:
+    """WakeWordService's wait() contract: a trigger stays pending until waited for."""
+    def __init__(self):
+        self._event = asyncio.Event()
+        self.trigger_ts = 0.0
+        self.triggers = 0
+
+    def trigger(self):
+        self.triggers += 1
+        self.trigger_ts = time.monotonic()
+        self._event.set()
+
+    async def wait(self):
+        await self._event.wait()
+        self._event.clear()
+
+class BenchUI:
+    def __init__(self):
+        self.net_updates = 0
+        self.toasts: list[str] = []
+
+    def set_net_ok(self, ok: bool):
+        self.net_updates += 1
+
+    def toast(self, text: str):
+        self.toasts.append(text)
+
+async def script(stand_in: StandIn, wake: FakeWake, args):
+    """Network up, down, up in thirds; a wake word every ~args.every seconds."""
+    rng = np.random.default_rng(0)
+    t0 = time.monotonic()
+    stand_in.up()
+    third = args.seconds / 3
+    next_wake = args.every * rng.uniform(0.5, 1.0)
+    while (t := time.monotonic() - t0) < args.seconds:
+        if stand_in.is_up and third <= t < 2 * third:
+            stand_in.down()
+        elif not stand_in.is_up and t >= 2 * third:
+            stand_in.up()
+        if t >= next_wake:
+            wake.trigger()
+            next_wake += args.every * rng.uniform(0.8, 1.2)
+        await asyncio.sleep(0.005)
+
+async def old_loop(net: OldNetWatch, wake: FakeWake, ui: BenchUI, stand_in: StandIn, r: dict, args):
+    while True:
+        ok = await net.ok()
+        ui.set_net_ok(ok)
+        if not ok:
+            ui.toast("Network's down.")
+            await asyncio.sleep(1.0)
+            continue
+        await wake.wait()
+        r["latency"].append((time.monotonic() - wake.trigger_ts) * 1000.0)
+        await asyncio.sleep(args.turn_s)
+
+async def new_loop(net: NetWatch, wake: FakeWake, ui: BenchUI, stand_in: StandIn, r: dict, args):
+    net.on_change = lambda ok: km.net_changed(ui, ok)
+    while True:
+        await wake.wait()
+        if not await km.online(ui, net):
+            r["refused"] += 1
+            continue
+        r["latency"].append((time.monotonic() - wake.trigger_ts) * 1000.0)
+        await asyncio.sleep(args.turn_s)
+        # the turn's API calls
+        netwatch.report(None if stand_in.is_up else ConnectionError("stand-in down"))
+
+async def run_mode(name: str, args) -> dict:
+    stand_in, wake, ui = StandIn(), FakeWake(), BenchUI()
+    r = {"latency": [], "refused": 0}
+    if name == "old":
+        net = OldNetWatch("127.0.0.1", stand_in.port)
+        loop = asyncio.create_task(old_loop(net, wake, ui, stand_in, r, args))
+        await script(stand_in, wake, args)
+    else:
+        async with NetWatch("127.0.0.1", stand_in.port) as net:
+            loop = asyncio.create_task(new_loop(net, wake, ui, stand_in, r, args))
+            await script(stand_in, wake, args)
+    loop.cancel()
+    await asyncio.gather(loop, return_exceptions=True)
+    stand_in.close()
+    lat = np.array(r["latency"]) if r["latency"] else np.array([float("nan")])
+    return {
+        "wakes": wake.triggers, "turns": len(r["latency"]), "refused": r["refused"],
+        "p50": float(np.percentile(lat, 50)), "p95": float(np.percentile(lat, 95)), "max": float(lat.max()),
+        "probes": net.probes, "probe_s": net.probe_s, "ui": ui.net_updates,
+    }
+
+async def run(args) -> int:
+    print(f"{'monitor':>7} {'wakes':>5} {'turns':>5} {'refused':>7} {'lat p50 ms':>10} {'p95 ms':>7} "
+          f"{'max ms':>7} {'probes':>6} {'probing s':>9} {'ui updates':>10}")
+    results = {}
+    for name in ("old", "new"):
+        r = results[name] = await run_mode(name, args)
+        print(f"{name:>7} {r['wakes']:5d} {r['turns']:5d} {r['refused']:7d} {r['p50']:10.1f} {r['p95']:7.1f} "
+              f"{r['max']:7.1f} {r['probes']:6d} {r['probe_s']:9.2f} {r['ui']:10d}")
+    new, old = results["new"], results["old"]
+    ok = new["p95"] <= args.max_latency_ms and new["probes"] < old["probes"]
+    return 0 if ok else 1
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=30.0)
+    ap.add_argument("--every", type=float, default=1.3, help="seconds between wake words")
+    ap.add_argument("--turn-s", type=float, default=0.5)
+    ap.add_argument("--max-latency-ms", type=float, default=20.0)
+    args = ap.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+if __name__ == "__main__":
+    main()
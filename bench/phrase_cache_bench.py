@@ -0,0 +1,79 @@
+"""Phrase cache: entries survive a restart, eviction keeps the byte budget.
+
+    python bench/phrase_cache_bench.py [--phrases 40]
+
+Fills a PhraseCache in a temporary directory with --phrases entries of
+0.5-2 s of int16 PCM at 24 kHz, then opens a fresh PhraseCache on the same
+directory, as the next start of the app would, and reads every entry back.
+Then shrinks the budget so eviction runs, reopens again, and checks the
+directory against the index. Reports put and hit times. Exits non-zero if
+a reopened cache misses an entry or returns different samples, if the
+evicted cache is over budget after reopening, or if any .pcm file on disk
+is not in the index.
+"""
+import argparse, os, sys, tempfile, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from karen.phrase_cache import PhraseCache  # noqa: E402
+
+RATE = 24000
+
+def on_disk(root: str) -> set[str]:
+    return {name[:-4] for name in os.listdir(root) if name.endswith(".pcm")}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--phrases", type=int, default=40)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    rng = np.random.default_rng(args.seed)
+    failures = []
+    with tempfile.TemporaryDirectory(prefix="karen_bench_phrases_") as root:
+        phrases = {}
+        for i in range(args.phrases):
+            text = f"filler number {i}"
+            key = PhraseCache.key("stub", "model", "voice", text, RATE)
+            phrases[key] = (rng.standard_normal(int(RATE * rng.uniform(0.5, 2.0))) * 3000).astype(np.int16)
+
+        cache = PhraseCache(root, max_bytes=64 * 1024 * 1024)
+        t0 = time.perf_counter()
+        for i, (key, pcm) in enumerate(phrases.items()):
+            cache.put(key, pcm, text=f"filler number {i}")
+        put_ms = (time.perf_counter() - t0) * 1000.0 / len(phrases)
+        cache.save()
+
+        # the next start of the app
+        reopened = PhraseCache(root, max_bytes=64 * 1024 * 1024)
+        t0 = time.perf_counter()
+        for key, pcm in phrases.items():
+            got = reopened.get(key)
+            if got is None:
+                failures.append(f"not in the reopened cache: {key[:12]}")
+            elif not np.array_equal(got, pcm):
+                failures.append(f"different samples after reopening: {key[:12]}")
+        hit_us = (time.perf_counter() - t0) * 1e6 / len(phrases)
+        reopened.save()
+
+        # a smaller budget evicts the least recently used, and that must persist too
+        budget = sum(p.nbytes for p in phrases.values()) // 3
+        PhraseCache(root, max_bytes=budget).put("extra", np.ones(RATE, dtype=np.int16))
+        evicted = PhraseCache(root, max_bytes=budget)
+        kept = sum(1 for key in list(phrases) + ["extra"] if key in evicted)
+        used = sum(evicted.samples(key) * 2 for key in list(phrases) + ["extra"] if key in evicted)
+        if used > budget:
+            failures.append(f"{used} bytes cached after reopening, budget {budget}")
+        if "extra" not in evicted:
+            failures.append("the newest entry did not survive eviction and reopening")
+        stray = on_disk(root) - {key for key in list(phrases) + ["extra"] if key in evicted}
+        if stray:
+            failures.append(f"{len(stray)} .pcm files on disk outside the index")
+
+    print(f"{len(phrases)} phrases: put {put_ms:.2f} ms, hit after reopening {hit_us:.1f} us; "
+          f"{kept} kept of {len(phrases) + 1} under a {budget // 1024} KiB budget")
+    for msg in failures:
+        print(f"FAIL {msg}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
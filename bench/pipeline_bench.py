@@ -0,0 +1,287 @@
+"""Full-pipeline latency benchmark: no sound card, no network, no API keys.
+
+    python bench/pipeline_bench.py --synth 6 corpus/pipeline   # make a corpus
+    python bench/pipeline_bench.py corpus/pipeline [--save base.json] [--baseline base.json]
+
+Runs main.serve() -- the real wake/turn loop with run_turn, Filler, Speaker,
+echo canceller and tracer -- on a FakeDuplex sound card with the "stub"
+STT, LLM and TTS providers (karen/stubs.py). Their latency medians, jitter,
+streaming speed and failure rate are the STUB_* settings, so e.g.
+STUB_LLM_FIRST_TOKEN_MS=900 in the environment models a slower model.
+
+Each WAV in the corpus directory is spoken after a synthetic wake word (a
+3 kHz tone scored by a one-bin DFT in place of openWakeWord) once the
+previous turn is over. Files should start with at least ROOM_S of
+background, as for endpoint_report.py; it is looped before the wake word
+so the endpointer primes its noise floor on the same room. An optional
+transcripts.json maps file names to what the stub STT hears; otherwise a
+fixed list of questions is cycled, so repeats also exercise the response
+cache.
+
+Reports p50/p95/p99/max per traced span, loop lag, dead air per turn (the
+silence between the end of the question and the reply, fillers excepted),
+fillers spoken and cut off by the reply, turn errors, CPU time per turn and
+peak RSS. Exits non-zero if a span's p95 exceeds its limit
+(LIMITS, or --limit span=ms), more than --max-errors turns fail or get no
+reply, or with --baseline if a p95 regressed by more than --tolerance
+(or dead air's p95 by more than --tolerance and --slack-ms) against a
+report saved with --save.
+"""
+import argparse, asyncio, json, os, random, resource, sys, tempfile, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from karen.config import settings  # noqa: E402
+from karen import stubs  # noqa: E402
+from karen.audio_io import Speaker  # noqa: E402
+from karen.bargein import EchoCanceller  # noqa: E402
+from karen.capture import CaptureHub  # noqa: E402
+from karen.fakeaudio import FakeDuplex, read_wav  # noqa: E402
+from karen.llm import LLM  # noqa: E402
+from karen.main import serve  # noqa: E402
+from karen.metrics import metrics, tracer, SPANS  # noqa: E402
+from karen.resample import Resampler  # noqa: E402
+from karen.stt import STT  # noqa: E402
+from karen.tts import TTS  # noqa: E402
+from karen.wake import WakeWordService, FRAME_SAMPLES  # noqa: E402
+from endpoint_report import synth_corpus  # noqa: E402
+
+RATE = 16000
+WAKE_HZ = 3000.0
+WAKE_S = 0.24          # three detector frames
+ROOM_S = 0.5
+PREROLL_S = 3.0        # Mic primes its noise floor from 3 s to 1.5 s before the wake word
+QUESTIONS = [
+    "what's the plan for stealing the krabby patty formula",
+    "how do I make the chum bucket popular",
+    "tell me a joke about mr krabs",
+    "what do you think of spongebob",
+    "volume up",
+]
+# p95 limits in ms, for the default STUB_* settings
+LIMITS = {
+    "endpoint": 900.0,
+    "stt": 400.0,
+    "llm_first_token": 1000.0,
+    "llm_first_sentence": 1300.0,
+    "tts_first_frame": 700.0,
+    "first_audio": 2600.0,
+}
+
+class ToneModel:
+    """Scores the wake tone by its amplitude in one DFT bin."""
+    def __init__(self, full_scale: float = 0.1):
+        n = np.arange(FRAME_SAMPLES)
+        self._basis = np.exp(-2j * np.pi * WAKE_HZ * n / RATE)
+        self.full_scale = full_scale
+
+    def predict(self, frame_i16: np.ndarray) -> dict[str, float]:
+        frame_i16 = frame_i16[-FRAME_SAMPLES:]  # a batch is scored at its end, like openWakeWord
+        amp = 2.0 * abs(np.dot(frame_i16, self._basis)) / len(frame_i16) / 32767.0
+        return {"tone": min(1.0, amp / self.full_scale)}
+
+class BenchUI:
+    """Console UI stand-in that stays quiet and tells the harness when a turn is over."""
+    def __init__(self):
+        self.idle = asyncio.Event()
+        self.errors: list[str] = []
+
+    def set_state(self, state: str):
+        if state == "idle":
+            self.idle.set()
+    def error(self, msg: str): self.errors.append(msg)
+    def show_user(self, text: str): pass
+    def show_partial(self, text: str): pass
+    def show_karen(self, text: str): pass
+    def toast(self, msg: str): pass
+    def ping(self): pass
+    def show_trace(self, text: str): pass
+
+class Online:
+    on_change = None
+
+    def ok(self) -> bool:
+        return True
+
+class TurnLog:
+    """Tracer sink keeping every finished turn."""
+    def __init__(self):
+        self.turns: list[dict] = []
+
+    def turn(self, turn: dict):
+        self.turns.append(turn)
+
+    def snapshot(self, tracer):
+        pass
+
+def load_corpus(path: str) -> list[tuple[str, np.ndarray, str]]:
+    names = sorted(f for f in os.listdir(path) if f.endswith(".wav"))
+    try:
+        with open(os.path.join(path, "transcripts.json"), encoding="utf-8") as f:
+            texts = json.load(f)
+    except OSError:
+        texts = {}
+    out = []
+    for i, name in enumerate(names):
+        audio, rate = read_wav(os.path.join(path, name))
+        if rate != RATE:
+            rs = Resampler(rate, RATE)
+            audio = np.concatenate([rs.process(audio), rs.flush()])
+        out.append((name, audio, texts.get(name, QUESTIONS[i % len(QUESTIONS)])))
+    return out
+
+def with_wake_word(audio: np.ndarray) -> np.ndarray:
+    """The room, then the wake word said over it, then the utterance."""
+    room = audio[:int(ROOM_S * RATE)]
+    t = np.arange(int(WAKE_S * RATE)) / RATE
+    wake = np.resize(room, len(t)) + 0.2 * np.sin(2 * np.pi * WAKE_HZ * t)
+    return np.concatenate([np.resize(room, int(PREROLL_S * RATE)), wake, audio]).astype(np.float32)
+
+def cpu_s() -> float:
+    r = resource.getrusage(resource.RUSAGE_SELF)
+    return r.ru_utime + r.ru_stime
+
+async def session(corpus, args) -> dict:
+    settings.STT_PROVIDER = settings.LLM_PROVIDER = settings.TTS_PROVIDER = "stub"
+    settings.TTS_CACHE_DIR = tempfile.mkdtemp(prefix="karen_bench_tts_")
+    settings.RESPONSE_CACHE_PATH = ""
+    stubs.seed(args.seed)
+    random.seed(args.seed)  # filler timing
+    tracer.enabled = True
+    log = TurnLog()
+    tracer.sinks.append(log)
+    ui = BenchUI()
+    duplex = FakeDuplex(samplerate=RATE, echo_gain=args.echo_gain, echo_delay_ms=20.0, latency=0.05)
+    missed = 0
+
+    async with CaptureHub(rate=RATE, stream_factory=duplex.input_stream) as hub:
+        echo = EchoCanceller(hub) if settings.BARGE_IN else None
+        async with Speaker(rate=RATE, echo=echo, stream_factory=duplex.output_stream) as spk, \
+                STT() as stt, LLM() as llm, TTS() as tts, \
+                WakeWordService(hub, model=ToneModel(), echo=echo, threshold=0.5,
+                                trigger_level=2, cooldown_ms=0) as wake:
+            server = asyncio.create_task(serve(ui, Online(), hub, spk, stt, llm, tts, wake))
+            lag = asyncio.create_task(tracer.watch_loop())
+            await asyncio.sleep(1.0)  # phrase cache prewarm
+            t0, c0 = time.perf_counter(), cpu_s()
+            for i, (name, audio, text) in enumerate(corpus):
+                done = len(log.turns)
+                ui.idle.clear()
+                stubs.transcript = text
+                duplex.say(with_wake_word(audio))
+                try:
+                    await asyncio.wait_for(ui.idle.wait(), args.turn_timeout)
+                except asyncio.TimeoutError:
+                    print(f"[bench] {name}: no turn finished within {args.turn_timeout:.0f} s")
+                if len(log.turns) == done or not log.turns[-1]["spans_ms"].get("first_audio"):
+                    missed += 1
+                while duplex.talking:
+                    await asyncio.sleep(0.05)
+                await asyncio.sleep(args.pause)
+            wall, cpu = time.perf_counter() - t0, cpu_s() - c0
+            for task in (server, lag):
+                task.cancel()
+            await asyncio.gather(server, lag, return_exceptions=True)
+
+    spans = {}
+    for name, _, _ in SPANS:
+        values = [t["spans_ms"][name] for t in log.turns if name in t["spans_ms"]]
+        if values:
+            p = np.percentile(values, [50, 95, 99])
+            spans[name] = {"p50": p[0], "p95": p[1], "p99": p[2], "max": max(values), "n": len(values)}
+    hists = {name: {f"p{q}": v for q, v in h.percentiles().items()}
+             for name, h in tracer.histograms.items() if not name.startswith("span.")}
+    return {
+        "utterances": len(corpus),
+        "turns": len(log.turns),
+        "errors": len(ui.errors),
+        "no_reply": missed,
+        "wall_s": wall,
+        "cpu_s": cpu,
+        "cpu_per_turn_ms": cpu / max(1, len(corpus)) * 1000.0,
+        "cpu_pct": 100.0 * cpu / wall if wall else 0.0,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+        "underruns": metrics.get("speaker.underruns"),
+        "fillers": metrics.get("filler.started"),
+        "fillers_cut": metrics.get("filler.cut"),
+        "spans": spans,
+        "histograms": hists,
+    }
+
+def print_report(r: dict):
+    print(f"{'span ms':<20} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'n':>4}")
+    for name, s in r["spans"].items():
+        print(f"{name:<20} {s['p50']:8.1f} {s['p95']:8.1f} {s['p99']:8.1f} {s['max']:8.1f} {s['n']:4d}")
+    for name, p in sorted(r["histograms"].items()):
+        print(f"{name:<20} {p['p50']:8.1f} {p['p95']:8.1f} {p['p99']:8.1f}")
+    print(f"\n{r['turns']} turns from {r['utterances']} utterances, {r['errors']} errors, "
+          f"{r['no_reply']} without a reply, {r['underruns']:.0f} underruns")
+    dead = r["histograms"].get("turn.dead_air_ms")
+    if dead:
+        print(f"dead air {dead['p50']:.0f} ms p50, {dead['p95']:.0f} ms p95; "
+              f"{r['fillers']:.0f} fillers, {r['fillers_cut']:.0f} cut off by the reply")
+    print(f"cpu {r['cpu_s']:.2f} s over {r['wall_s']:.1f} s ({r['cpu_pct']:.1f}%), "
+          f"{r['cpu_per_turn_ms']:.0f} ms/turn, peak rss {r['peak_rss_mb']:.0f} MB")
+
+def check(r: dict, args) -> list[str]:
+    failures = []
+    limits = dict(LIMITS)
+    for item in args.limit:
+        name, _, ms = item.partition("=")
+        limits[name] = float(ms)
+    for name, limit in limits.items():
+        p95 = r["spans"].get(name, {}).get("p95")
+        if p95 is not None and p95 > limit:
+            failures.append(f"{name} p95 {p95:.1f} ms > limit {limit:.0f} ms")
+    if r["no_reply"] > args.max_errors:  # failed turns get no reply either
+        failures.append(f"{r['no_reply']} turns without a reply ({r['errors']} errors)")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            base = json.load(f)
+        for name, s in base["spans"].items():
+            now = r["spans"].get(name)
+            if now and now["p95"] > s["p95"] * (1.0 + args.tolerance) + args.slack_ms:
+                failures.append(f"{name} p95 {now['p95']:.1f} ms, baseline {s['p95']:.1f} ms")
+        dead, base_dead = r["histograms"].get("turn.dead_air_ms"), base["histograms"].get("turn.dead_air_ms")
+        if dead and base_dead and dead["p95"] > base_dead["p95"] * (1.0 + args.tolerance) + args.slack_ms:
+            failures.append(f"dead air p95 {dead['p95']:.0f} ms, baseline {base_dead['p95']:.0f} ms")
+        if r["cpu_per_turn_ms"] > base["cpu_per_turn_ms"] * (1.0 + args.tolerance) + args.slack_ms:
+            failures.append(f"cpu {r['cpu_per_turn_ms']:.0f} ms/turn, baseline {base['cpu_per_turn_ms']:.0f}")
+        if r["peak_rss_mb"] > base["peak_rss_mb"] * (1.0 + args.tolerance):
+            failures.append(f"peak rss {r['peak_rss_mb']:.0f} MB, baseline {base['peak_rss_mb']:.0f}")
+    return failures
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("corpus", help="directory of 16-bit WAV utterances")
+    ap.add_argument("--synth", type=int, default=0, metavar="N",
+                    help="write this many synthetic utterances to the corpus dir and exit")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--echo-gain", type=float, default=0.3, help="speaker-to-mic coupling")
+    ap.add_argument("--pause", type=float, default=0.5, help="silence between turns, seconds")
+    ap.add_argument("--turn-timeout", type=float, default=30.0)
+    ap.add_argument("--limit", action="append", default=[], metavar="SPAN=MS", help="override a p95 limit")
+    ap.add_argument("--max-errors", type=int, default=0)
+    ap.add_argument("--save", help="write the report as JSON")
+    ap.add_argument("--baseline", help="report to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 regression vs baseline")
+    ap.add_argument("--slack-ms", type=float, default=25.0, help="absolute slack on top of --tolerance")
+    args = ap.parse_args()
+    if args.synth:
+        synth_corpus(args.corpus, args.synth, RATE, seed=args.seed)
+        return
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        sys.exit(f"no WAV files in {args.corpus}")
+    report = asyncio.run(session(corpus, args))
+    print_report(report)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+    failures = check(report, args)
+    for msg in failures:
+        print(f"FAIL {msg}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Resampler micro-benchmark and quality check.
+
+    python bench/resample_bench.py [--budget-pct 2.0]
+
+Compares the streaming polyphase Resampler with the old per-frame linear
+`tts.resample` on 50 ms chunks: CPU time per second of audio (as % of one
+core), SNR on a sine sweep, and alias rejection for content above the
+output Nyquist. Exits non-zero if the Resampler exceeds the CPU budget
+(default is sized for a single Pi 5 core with headroom for everything else).
+"""
+import argparse, os, sys, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from karen.resample import Resampler  # noqa: E402
+
+def linear(audio: np.ndarray, from_rate: int, to_rate: int) -> np.ndarray:
+    # copy of karen.tts.resample so this script doesn't need openai installed
+    samps = int(len(audio) / from_rate * to_rate)
+    x_old = np.linspace(0.0, 1.0, len(audio), endpoint=False, dtype=np.float64)
+    x_new = np.linspace(0.0, 1.0, samps, endpoint=False, dtype=np.float64)
+    return np.interp(x_new, x_old, audio.astype(np.float32)).astype(np.float32)
+
+def chunks(x: np.ndarray, n: int):
+    for i in range(0, len(x), n):
+        yield x[i:i + n]
+
+def run_linear(x, src, dst, chunk):
+    return np.concatenate([linear(c, src, dst) for c in chunks(x, chunk)])
+
+def run_poly(x, src, dst, chunk):
+    rs = Resampler(src, dst)
+    return np.concatenate([rs.process(c) for c in chunks(x, chunk)] + [rs.flush()])
+
+def sweep(rate: int, f0: float, f1: float, secs: float) -> tuple[np.ndarray, np.ndarray]:
+    t = np.arange(int(rate * secs)) / rate
+    phase = 2 * np.pi * (f0 * t + (f1 - f0) * t * t / (2 * secs))
+    return np.sin(phase).astype(np.float32) * 0.5, phase
+
+def cpu_pct(fn, x, src, dst, chunk, repeat=5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.process_time()
+        fn(x, src, dst, chunk)
+        best = min(best, time.process_time() - t0)
+    return 100.0 * best / (len(x) / src)
+
+def snr_db(y: np.ndarray, dst: int, f0: float, f1: float, secs: float) -> float:
+    ref, _ = sweep(dst, f0, f1, secs)
+    n = min(len(y), len(ref))
+    edge = dst // 50
+    err = y[edge:n - edge] - ref[edge:n - edge]
+    return 10 * np.log10(np.mean(ref[edge:n - edge] ** 2) / max(np.mean(err ** 2), 1e-20))
+
+def alias_db(fn, src, dst, chunk) -> float:
+    # a sweep that lies entirely above the output Nyquist should vanish
+    nyq = min(src, dst) / 2
+    x, _ = sweep(src, nyq * 1.1, src / 2 * 0.95, 2.0)
+    y = fn(x, src, dst, chunk)
+    return 10 * np.log10(max(np.mean(y ** 2), 1e-20) / np.mean(x ** 2))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--budget-pct", type=float, default=2.0,
+                    help="max Resampler CPU per second of audio, %% of one core")
+    ap.add_argument("--seconds", type=float, default=10.0)
+    args = ap.parse_args()
+
+    failed = False
+    print(f"{'ratio':>12} {'impl':>7} {'cpu %':>7} {'snr dB':>7} {'alias dB':>9}")
+    for src, dst in ((24000, 16000), (24000, 48000), (16000, 48000)):
+        chunk = int(0.05 * src)
+        f1 = min(src, dst) / 2 * 0.8
+        x, _ = sweep(src, 100.0, f1, args.seconds)
+        for name, fn in (("linear", run_linear), ("poly", run_poly)):
+            pct = cpu_pct(fn, x, src, dst, chunk)
+            snr = snr_db(fn(x, src, dst, chunk), dst, 100.0, f1, args.seconds)
+            alias = alias_db(fn, src, dst, chunk) if dst < src else float("nan")
+            print(f"{src // 1000:>4}k->{dst // 1000:>2}k {name:>7} {pct:7.3f} {snr:7.1f} {alias:9.1f}")
+            if name == "poly" and pct > args.budget_pct:
+                failed = True
+    if failed:
+        print(f"FAIL: Resampler above {args.budget_pct}% CPU budget")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
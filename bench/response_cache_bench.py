@@ -0,0 +1,107 @@
+"""Response cache keys: paraphrases that should share a reply, questions that
+must not, and follow-ups that must never be cached.
+
+    python bench/response_cache_bench.py
+
+Exits non-zero if two DISTINCT questions get the same key, a SAME pair gets
+different keys, a FOLLOW_UPS question (or one the TTL rules exclude) is
+cacheable, a STANDALONE question is not cacheable with its TTL or is not
+answered by a cache reopened from disk, or if put() followed by get() does
+not round-trip.
+"""
+import itertools, os, sys, tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from karen.config import settings  # noqa: E402
+from karen.response_cache import ResponseCache, normalize  # noqa: E402
+
+SAME = [
+    ("What's the plan for stealing the Krabby Patty formula?",
+     "hey karen, um, what is the plan for stealing the krabby patty formula"),
+    ("How do I make the Chum Bucket popular?", "Karen, uh, how do I make the chum bucket popular please"),
+    ("Tell me a joke about Mr Krabs.", "tell me a joke about mr krabs"),
+]
+DISTINCT = [
+    "Do you like me?",
+    "Do you like Plankton?",
+    "Are you?",
+    "Are you right now?",
+    "Can you hear me?",
+    "Can you hear Plankton?",
+    "What do you think of SpongeBob?",
+    "What do you think of Squidward?",
+    "Could you sing a song?",
+    "Would you sing a song?",
+    "Tell me a joke about Mr Krabs.",
+    "Tell me a joke about Gary.",
+    "How do I make the Chum Bucket popular?",
+    "How do I make the Chum Bucket unpopular?",
+    "Is the Krusty Krab open outside of summer?",
+    "Is the Krusty Krab open in summer?",
+]
+# whole questions, and the TTL they must be cached for (None: the default)
+STANDALONE = [
+    ("Tell me a joke.", None),
+    ("What's the weather like?", 900.0),
+    ("Who are you?", None),
+]
+FOLLOW_UPS = [
+    "why?",
+    "Why not?",
+    "tell me more",
+    "yes",
+    "no",
+    "what did I just ask",
+    "say that again",
+    "what about him",
+    "and then?",
+    "really?",
+    "how come?",
+    "how about you",
+    "are you sure",
+    "what is the weather right now",
+    "what time is it",
+]
+
+def main():
+    failures = []
+    for a, b in SAME:
+        if normalize(a) != normalize(b):
+            failures.append(f"different keys: {a!r} -> {normalize(a)!r}, {b!r} -> {normalize(b)!r}")
+    for a, b in itertools.combinations(DISTINCT, 2):
+        if normalize(a) == normalize(b):
+            failures.append(f"same key {normalize(a)!r}: {a!r} and {b!r}")
+    cache = ResponseCache(path="")
+    for q in FOLLOW_UPS:
+        if cache.cacheable(q):
+            failures.append(f"cacheable follow-up: {q!r} -> {normalize(q)!r}")
+        cache.put(q, ["Whatever."])
+        if cache.get(q) is not None:
+            failures.append(f"follow-up answered from the cache: {q!r}")
+    for a, b in SAME:
+        cache.put(a, ["Reply."])
+        if cache.get(b) != ["Reply."]:
+            failures.append(f"no hit for {b!r} after {a!r}")
+    with tempfile.TemporaryDirectory(prefix="karen_bench_responses_") as folder:
+        path = os.path.join(folder, "responses.json")
+        before = ResponseCache(path=path)
+        for q, ttl in STANDALONE:
+            want = ttl if ttl is not None else settings.RESPONSE_CACHE_TTL_S
+            if not before.cacheable(q):
+                failures.append(f"not cacheable: {q!r} -> {normalize(q)!r}")
+            elif before.ttl(normalize(q)) != want:
+                failures.append(f"ttl of {q!r} is {before.ttl(normalize(q)):.0f} s, want {want:.0f} s")
+            before.put(q, [f"Reply to {q}"])
+        after = ResponseCache(path=path)  # the next start of the app
+        for q, _ in STANDALONE:
+            if after.get(q) != [f"Reply to {q}"]:
+                failures.append(f"no hit after reopening for {q!r}")
+    cached = sum(cache.cacheable(q) for q in DISTINCT)
+    print(f"{len(SAME)} paraphrase pairs, {len(DISTINCT)} distinct questions ({cached} cacheable), "
+          f"{len(STANDALONE)} standalone questions, {len(FOLLOW_UPS)} follow-ups")
+    for msg in failures:
+        print(f"FAIL {msg}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Speaker output: event-loop responsiveness and mixer transitions.
+
+    python bench/speaker_bench.py [--seconds 10] [--max-lag-ms 5]
+
+Plays a reply delivered in 50 ms chunks as fast as TTS could produce them,
+through a FakeOutputStream, while a probe task measures how late a 1 ms
+sleep wakes up. Compares the old blocking write-per-chunk playback with the
+callback-driven Speaker, and reports underruns.
+
+Then checks the mixer: a filler tone is playing when the reply starts. With
+a crossfade (Filler.stop() flushes without waiting) the largest
+sample-to-sample step in the output should stay near that of the tones
+themselves; a hard cut (stop()) is shown for comparison.
+
+Exits non-zero if the Speaker's p99 loop lag exceeds --max-lag-ms, it
+underruns, or the crossfade clicks.
+"""
+import argparse, asyncio, functools, os, sys, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from karen.audio_io import Speaker  # noqa: E402
+from karen.fakeaudio import FakeOutputStream  # noqa: E402
+from karen.metrics import metrics  # noqa: E402
+
+RATE = 16000
+CHUNK = 800  # 50 ms
+
+def sine(hz: float, seconds: float, amp: float = 0.5) -> np.ndarray:
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (amp * np.sin(2 * np.pi * hz * t)).astype(np.float32)
+
+async def probe(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append((time.perf_counter() - t0 - 0.001) * 1000.0)
+
+async def blocking_playback(audio: np.ndarray):
+    # what Speaker.play_pcm used to do: a blocking write inside the coroutine
+    stream = FakeOutputStream(samplerate=RATE)
+    stream.start()
+    for i in range(0, len(audio), CHUNK):
+        stream.write(audio[i:i + CHUNK] * 0.8)
+        await asyncio.sleep(0)
+    stream.stop()
+
+async def speaker_playback(audio: np.ndarray):
+    async with Speaker(rate=RATE, stream_factory=FakeOutputStream) as spk:
+        for i in range(0, len(audio), CHUNK):
+            await spk.play_pcm(audio[i:i + CHUNK])
+        await spk.drain()
+
+async def measure(play, audio: np.ndarray) -> dict:
+    lags: list[float] = []
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe(lags, stop))
+    before = metrics.get("speaker.underruns")
+    t0 = time.perf_counter()
+    await play(audio)
+    wall = time.perf_counter() - t0
+    stop.set()
+    await prober
+    lag = np.array(lags)
+    return {
+        "p50": float(np.percentile(lag, 50)), "p99": float(np.percentile(lag, 99)),
+        "max": float(lag.max()), "wall": wall,
+        "underruns": metrics.get("speaker.underruns") - before,
+    }
+
+async def transition(crossfade: bool) -> float:
+    """Largest output step around the moment the reply takes over from a filler."""
+    heard: list[np.ndarray] = []
+    factory = functools.partial(FakeOutputStream, on_play=lambda d, t: heard.append(d))
+    async with Speaker(rate=RATE, stream_factory=factory) as spk:
+        spk.volume = 1.0
+        await spk.play_pcm(sine(210.0, 1.5), voice="filler")
+        await asyncio.sleep(0.5)
+        if crossfade:
+            await spk.flush("filler", wait=False)
+        else:
+            spk.stop()
+        await spk.play_pcm(sine(330.0, 0.5))
+        await spk.drain()
+    out = np.concatenate(heard)
+    return float(np.abs(np.diff(out)).max())
+
+async def run(args) -> int:
+    audio = sine(220.0, args.seconds, 0.3)
+    print(f"{'playback':>9} {'lag p50 ms':>10} {'p99 ms':>8} {'max ms':>8} {'underruns':>9} {'wall s':>7}")
+    results = {}
+    for name, play in (("blocking", blocking_playback), ("callback", speaker_playback)):
+        r = results[name] = await measure(play, audio)
+        print(f"{name:>9} {r['p50']:10.2f} {r['p99']:8.2f} {r['max']:8.2f} {r['underruns']:9.0f} {r['wall']:7.2f}")
+
+    # the tones alone step by at most 2*pi*f/rate*amp
+    natural = 2 * np.pi * 330.0 / RATE * 0.5 * 1.25
+    fade, cut = await transition(True), await transition(False)
+    print(f"\nfiller -> reply, largest sample step: crossfade {fade:.3f}, hard cut {cut:.3f} "
+          f"(tones alone < {natural:.3f})")
+
+    cb = results["callback"]
+    ok = cb["p99"] <= args.max_lag_ms and cb["underruns"] == 0 and fade <= natural
+    return 0 if ok else 1
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=10.0, help="length of the reply")
+    ap.add_argument("--max-lag-ms", type=float, default=5.0)
+    args = ap.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+if __name__ == "__main__":
+    main()
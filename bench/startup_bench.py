@@ -0,0 +1,151 @@
+"""Startup: import time and time from process start to an armed wake detector.
+
+    python bench/startup_bench.py [--runs 5] [--model-load-ms 800] [--ui-ms 0]
+
+Each run is a fresh interpreter. It reports how long `import karen.main`
+takes and which heavy packages it pulls in, then boots with fake audio
+devices and serves until Karen is "online" (the wake detector is loaded and
+listening). Two boots are compared:
+
+  sequential  what main() used to do: UI, then each device and provider in
+              turn, the wake model loaded on the event loop
+  concurrent  main.boot(): provider imports and the wake model load in
+              worker threads while devices open and the UI is built
+
+Providers are "openai" (with a dummy key; nothing is sent) when the SDK is
+installed, else "stub". The wake model is a stand-in whose loading takes
+--model-load-ms (pass --model-paths to load real openWakeWord models), and
+--ui-ms adds a blocking UI build like a Qt window's. Times are medians from
+process start. Exits non-zero if the import pulls in a heavy package, or the
+concurrent boot's import or time to online exceed --max-import-ms or
+--max-online-ms.
+"""
+import argparse, json, os, subprocess, sys, time
+
+HEAVY = ("openai", "httpx", "websockets", "openwakeword", "soundfile", "sounddevice", "PySide6")
+
+def child(args) -> dict:
+    t_import = time.monotonic()
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+    import karen.main as km
+    imported = time.monotonic()
+    eager = [m for m in HEAVY if m in sys.modules]
+
+    import asyncio, functools, importlib.util
+    from karen.config import settings
+    from karen.fakeaudio import FakeInputStream, FakeOutputStream
+    from karen.ui import UI
+    from karen.wake import FRAME_SAMPLES
+
+    provider = "openai" if importlib.util.find_spec("openai") else "stub"
+    settings.STT_PROVIDER = settings.LLM_PROVIDER = settings.TTS_PROVIDER = provider
+    settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "bench"
+    settings.TTS_CACHE_DIR = ""
+    marks: dict[str, float] = {}
+
+    class Silence:
+        def predict(self, frame):
+            return {"silence": 0.0}
+
+    def load_model():
+        time.sleep(args.model_load_ms / 1000.0)  # file reads and session setup
+        return Silence()
+
+    def make_ui():
+        time.sleep(args.ui_ms / 1000.0)
+        ui = UI()
+        marks["ui"] = time.monotonic()
+        set_state = ui.set_state
+        def watch(state: str):
+            if state == "idle":
+                marks.setdefault("online", time.monotonic())
+            set_state(state)
+        ui.set_state = watch
+        return ui
+
+    class Online:
+        on_change = None
+
+        def ok(self) -> bool:
+            return True
+
+    wake_model = None if args.model_paths else load_model
+    devices = dict(input_factory=functools.partial(FakeInputStream, block=FRAME_SAMPLES // 4),
+                   output_factory=FakeOutputStream)
+
+    async def until_online(k):
+        task = asyncio.create_task(km.serve(k.ui, Online(), k.hub, k.spk, k.stt, k.llm, k.tts, k.wake))
+        while "online" not in marks:
+            await asyncio.sleep(0.001)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    async def concurrent():
+        async with km.boot(ui_factory=make_ui, model_paths=args.model_paths, wake_model=wake_model,
+                           **devices) as k:
+            await until_online(k)
+
+    async def sequential():
+        ui = make_ui()
+        async with km.CaptureHub(stream_factory=devices["input_factory"]) as hub:
+            model = wake_model() if wake_model else None
+            async with km.Speaker(stream_factory=devices["output_factory"]) as spk, \
+                    km.STT() as stt, km.LLM() as llm, km.TTS() as tts, \
+                    km.WakeWordService(hub, model_paths=args.model_paths, model=model) as wake:
+                if model is None:
+                    await wake.ready()
+                await until_online(km.Assistant(ui, hub, spk, stt, llm, tts, wake))
+
+    asyncio.run(concurrent() if args.child == "concurrent" else sequential())
+    t0 = args.t0
+    return {
+        "start_ms": (t_import - t0) * 1000.0,
+        "import_ms": (imported - t_import) * 1000.0,
+        "ui_ms": (marks["ui"] - t0) * 1000.0,
+        "online_ms": (marks["online"] - t0) * 1000.0,
+        "eager": eager,
+        "provider": provider,
+    }
+
+def run_child(mode: str, args) -> dict:
+    cmd = [sys.executable, __file__, "--child", mode, "--model-load-ms", str(args.model_load_ms),
+           "--ui-ms", str(args.ui_ms)]
+    for p in args.model_paths:
+        cmd += ["--model-paths", p]
+    t0 = time.monotonic()  # CLOCK_MONOTONIC is shared across processes on Linux
+    out = subprocess.run(cmd + ["--t0", repr(t0)], capture_output=True, text=True, timeout=120)
+    lines = [l for l in out.stdout.splitlines() if l.startswith("{")]
+    if out.returncode or not lines:
+        sys.exit(f"{mode} boot failed:\n{out.stdout}\n{out.stderr}")
+    return json.loads(lines[-1])
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--model-load-ms", type=float, default=800.0, help="stand-in wake model load time")
+    ap.add_argument("--model-paths", action="append", default=[], help="load real openWakeWord models")
+    ap.add_argument("--ui-ms", type=float, default=0.0, help="extra blocking UI build time")
+    ap.add_argument("--max-import-ms", type=float, default=600.0)
+    ap.add_argument("--max-online-ms", type=float, default=2000.0)
+    ap.add_argument("--child", choices=["sequential", "concurrent"], help=argparse.SUPPRESS)
+    ap.add_argument("--t0", type=float, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        print(json.dumps(child(args)))
+        return
+
+    print(f"{'boot':>10} {'python ms':>9} {'import ms':>9} {'ui ms':>7} {'online ms':>9}")
+    results = {}
+    for mode in ("sequential", "concurrent"):
+        runs = [run_child(mode, args) for _ in range(args.runs)]
+        med = {k: sorted(r[k] for r in runs)[len(runs) // 2]
+               for k in ("start_ms", "import_ms", "ui_ms", "online_ms")}
+        results[mode] = {**med, "eager": runs[0]["eager"], "provider": runs[0]["provider"]}
+        print(f"{mode:>10} {med['start_ms']:9.0f} {med['import_ms']:9.0f} {med['ui_ms']:7.0f} {med['online_ms']:9.0f}")
+    c = results["concurrent"]
+    print(f"\nproviders: {c['provider']}; heavy packages imported by karen.main: {', '.join(c['eager']) or 'none'}")
+    ok = not c["eager"] and c["import_ms"] <= args.max_import_ms and c["online_ms"] <= args.max_online_ms
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Streaming transcription: partial transcripts while the user talks, old vs new.
+
+    python bench/stt_stream_bench.py [--turns 4] [--speech-s 3.0]
+
+Runs openai_provider.STTStream against a local websocket stand-in for the
+realtime transcription API. Like the real one with turn detection off, it
+only transcribes audio once it is committed: each commit gets its words
+(--wps words per second of audio) as deltas after --first-ms, then the
+completed transcript. Audio is fed in real time in 50 ms blocks, then
+finish() is called as the local endpointer would. Compares:
+
+  old  one commit at finish(), as STTStream used to (STT_COMMIT_MS beyond
+       the utterance)
+  new  a commit every STT_COMMIT_MS while the user talks
+
+and reports partial transcripts seen before finish(), when the first one
+arrived, and the time from finish() to the final transcript. Exits non-zero
+if the new stream shows no partial before endpointing, or if either final
+transcript is not every word spoken, in order.
+"""
+import argparse, asyncio, base64, json, os, sys, time
+import numpy as np
+import websockets
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from karen.config import settings  # noqa: E402
+from karen.openai_provider import MIN_COMMIT_MS, STREAM_RATE, STTStream  # noqa: E402
+
+RATE = 16000
+BLOCK = 800  # 50 ms
+WORDS = ("hey karen what is the plan for stealing the krabby patty formula this time "
+         "and do not tell me it involves a giant robot again").split()
+
+class RealtimeStandIn:
+    """Local websocket endpoint speaking the realtime transcription events."""
+    def __init__(self, wps: float, first_ms: float, word_ms: float):
+        self.wps, self.first_ms, self.word_ms = wps, first_ms, word_ms
+        self.commits = 0
+        self._server = None
+        self.url = ""
+
+    async def __aenter__(self):
+        self._server = await websockets.serve(self._handle, "127.0.0.1", 0, max_size=None)
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f"ws://127.0.0.1:{port}/v1/realtime?intent=transcription"
+        return self
+
+    async def __aexit__(self, *a):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, ws):
+        buffered, heard = 0, 0  # samples in the input buffer, and committed before it
+        jobs = []
+        try:
+            async for raw in ws:
+                msg = json.loads(raw)
+                if msg["type"] == "input_audio_buffer.append":
+                    buffered += len(base64.b64decode(msg["audio"])) // 2
+                elif msg["type"] == "input_audio_buffer.commit":
+                    if buffered < STREAM_RATE * MIN_COMMIT_MS // 1000:
+                        await ws.send(json.dumps({"type": "error", "error": {
+                            "message": "buffer too small"}}))
+                        continue
+                    self.commits += 1
+                    item = f"item_{self.commits}"
+                    await ws.send(json.dumps({"type": "input_audio_buffer.committed", "item_id": item}))
+                    words = WORDS[self._words(heard):self._words(heard + buffered)]
+                    heard += buffered
+                    buffered = 0
+                    jobs.append(asyncio.create_task(self._transcribe(ws, item, words)))
+        finally:
+            for job in jobs:
+                job.cancel()
+
+    def _words(self, samples: int) -> int:
+        return min(len(WORDS), int(samples / STREAM_RATE * self.wps))
+
+    async def _transcribe(self, ws, item: str, words: list[str]):
+        await asyncio.sleep(self.first_ms / 1000.0)
+        for i, word in enumerate(words):
+            await ws.send(json.dumps({"type": "conversation.item.input_audio_transcription.delta",
+                                      "item_id": item, "delta": (" " if i else "") + word}))
+            await asyncio.sleep(self.word_ms / 1000.0)
+        await ws.send(json.dumps({"type": "conversation.item.input_audio_transcription.completed",
+                                  "item_id": item, "transcript": " ".join(words)}))
+
+async def turn(url: str, args) -> dict:
+    partials: list[tuple[float, str]] = []
+    stream = STTStream(url, "bench", RATE, on_partial=lambda text: partials.append((time.monotonic(), text)))
+    rng = np.random.default_rng(0)
+    t0 = time.monotonic()
+    blocks = int(args.speech_s * RATE / BLOCK)
+    for i in range(blocks):
+        stream.feed((0.1 * rng.standard_normal(BLOCK)).astype(np.float32))
+        await asyncio.sleep(max(0.0, t0 + (i + 1) * BLOCK / RATE - time.monotonic()))
+    end = time.monotonic()
+    final = await stream.finish()
+    early = [t for t, _ in partials if t < end]
+    return {"early": len(early), "first": (early[0] - t0) * 1000.0 if early else None,
+            "final_ms": (time.monotonic() - end) * 1000.0, "final": final,
+            "expected": " ".join(WORDS[:int(blocks * BLOCK / RATE * args.wps)])}
+
+async def run(args) -> int:
+    print(f"{'stream':>6} {'turns':>5} {'commits':>7} {'partials before end':>19} "
+          f"{'first ms':>8} {'final ms':>8}")
+    failures = []
+    for name, commit_ms in (("old", int(args.speech_s * 1000) * 10), ("new", settings.STT_COMMIT_MS)):
+        settings.STT_COMMIT_MS = commit_ms
+        async with RealtimeStandIn(args.wps, args.first_ms, args.word_ms) as server:
+            results = [await turn(server.url, args) for _ in range(args.turns)]
+        firsts = [r["first"] for r in results if r["first"] is not None]
+        first = f"{np.mean(firsts):8.0f}" if firsts else f"{'-':>8}"
+        print(f"{name:>6} {len(results):5d} {server.commits:7d} {np.mean([r['early'] for r in results]):19.1f} "
+              f"{first} {np.mean([r['final_ms'] for r in results]):8.0f}")
+        for r in results:
+            if r["final"] != r["expected"]:
+                failures.append(f"{name}: final transcript {r['final']!r}, spoken {r['expected']!r}")
+        if name == "new" and len(firsts) < len(results):
+            failures.append(f"new: {len(results) - len(firsts)} turns with no partial before endpointing")
+    for msg in failures:
+        print(f"FAIL {msg}")
+    return 1 if failures else 0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--turns", type=int, default=4)
+    ap.add_argument("--speech-s", type=float, default=3.0, help="audio fed per turn, seconds")
+    ap.add_argument("--wps", type=float, default=2.5, help="words per second of speech")
+    ap.add_argument("--first-ms", type=float, default=120.0, help="commit to first delta")
+    ap.add_argument("--word-ms", type=float, default=20.0, help="between deltas")
+    args = ap.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Minimal local OpenAI-compatible server for benchmarks.
+
+Serves /v1/chat/completions (plain and SSE streaming) with a configurable
+latency model: `base_ms` plus `per_token_ms` per prompt token, where tokens
+not shared with the previous request's prompt prefix cost full price and
+shared ones cost `cached_ratio` of it (a rough model of provider prompt
+caching). Every request is recorded in `StubOpenAI.requests`. Also answers
+/v1/audio/transcriptions, /v1/audio/speech (a short PCM tone, chunked) and
+HEAD /v1/models, the warm-up request; pass a `tls` server context to serve
+HTTPS.
+
+    async with StubOpenAI() as stub:
+        settings.OPENAI_BASE_URL = stub.url
+"""
+import asyncio, json, os, ssl, sys, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from karen.memory import estimate_tokens  # noqa: E402
+
+class StubOpenAI:
+    def __init__(self, base_ms: float = 30.0, per_token_ms: float = 0.05, cached_ratio: float = 0.1,
+                 reply: str = "Uhh. Wow. Another question. Fine, the answer is forty two, mmkay?",
+                 tls: ssl.SSLContext | None = None):
+        self.tls = tls
+        self.base_ms = base_ms
+        self.per_token_ms = per_token_ms
+        self.cached_ratio = cached_ratio
+        self.reply = reply
+        self.requests: list[dict] = []
+        self._prev_prompt = ""
+        self._server = None
+        self.url = ""
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0, ssl=self.tls)
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f"{'https' if self.tls else 'http'}://127.0.0.1:{port}/v1"
+        return self
+
+    async def __aexit__(self, *a):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = lines[0].split(" ", 2)
+                headers = {k.lower(): v.strip() for k, v in (l.split(":", 1) for l in lines[1:] if ":" in l)}
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                if method == "POST" and path.endswith("/chat/completions"):
+                    await self._chat(json.loads(body), writer)
+                elif method == "POST" and path.endswith("/audio/transcriptions"):
+                    await self._transcribe(body, writer)
+                elif method == "POST" and path.endswith("/audio/speech"):
+                    await self._speech(json.loads(body), writer)
+                elif method == "HEAD" and path.endswith("/models"):
+                    writer.write(b"HTTP/1.1 200 OK\r\ncontent-length: 0\r\n\r\n")
+                else:
+                    writer.write(b"HTTP/1.1 404 Not Found\r\ncontent-length: 0\r\n\r\n")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _chat(self, req: dict, writer: asyncio.StreamWriter):
+        prompt = "".join(m["role"] + m["content"] for m in req["messages"])
+        shared = os.path.commonprefix([prompt, self._prev_prompt])
+        self._prev_prompt = prompt
+        tokens = sum(estimate_tokens(m["content"]) for m in req["messages"])
+        cached = min(tokens, len(shared) // 4)
+        delay = self.base_ms + self.per_token_ms * ((tokens - cached) + cached * self.cached_ratio)
+        self.requests.append({"t": time.monotonic(), "prompt_tokens": tokens, "cached_tokens": cached,
+                              "stream": bool(req.get("stream")), "messages": req["messages"]})
+        await asyncio.sleep(delay / 1000.0)
+        if not req.get("stream"):
+            data = json.dumps({
+                "id": "stub", "object": "chat.completion", "created": 0, "model": req["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": self.reply}}],
+                "usage": {"prompt_tokens": tokens, "completion_tokens": 16, "total_tokens": tokens + 16},
+            }).encode()
+            writer.write(b"HTTP/1.1 200 OK\r\ncontent-type: application/json\r\n"
+                         b"content-length: %d\r\n\r\n%s" % (len(data), data))
+            return
+        writer.write(b"HTTP/1.1 200 OK\r\ncontent-type: text/event-stream\r\ntransfer-encoding: chunked\r\n\r\n")
+        for word in self.reply.split(" "):
+            chunk = {"id": "stub", "object": "chat.completion.chunk", "created": 0, "model": req["model"],
+                     "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]}
+            self._write_chunk(writer, f"data: {json.dumps(chunk)}\n\n".encode())
+            await writer.drain()
+            await asyncio.sleep(0.002)
+        self._write_chunk(writer, b"data: [DONE]\n\n")
+        self._write_chunk(writer, b"")
+
+    async def _transcribe(self, body: bytes, writer: asyncio.StreamWriter):
+        self.requests.append({"t": time.monotonic(), "path": "/audio/transcriptions", "bytes": len(body)})
+        await asyncio.sleep(self.base_ms / 1000.0)
+        data = json.dumps({"text": "What is the plan for today?"}).encode()
+        writer.write(b"HTTP/1.1 200 OK\r\ncontent-type: application/json\r\n"
+                     b"content-length: %d\r\n\r\n%s" % (len(data), data))
+
+    async def _speech(self, req: dict, writer: asyncio.StreamWriter):
+        self.requests.append({"t": time.monotonic(), "path": "/audio/speech", "input": req["input"]})
+        await asyncio.sleep(self.base_ms / 1000.0)
+        t = np.arange(2400) / 24000.0  # 100 ms per chunk of 24 kHz pcm16
+        pcm = (8000 * np.sin(2 * np.pi * 220.0 * t)).astype(np.int16).tobytes()
+        writer.write(b"HTTP/1.1 200 OK\r\ncontent-type: audio/pcm\r\ntransfer-encoding: chunked\r\n\r\n")
+        for _ in range(3):
+            self._write_chunk(writer, pcm)
+            await writer.drain()
+        self._write_chunk(writer, b"")
+
+    @staticmethod
+    def _write_chunk(writer: asyncio.StreamWriter, data: bytes):
+        writer.write(b"%x\r\n%s\r\n" % (len(data), data))
@@ -0,0 +1,88 @@
+"""Tracing overhead, enabled versus disabled.
+
+    python bench/trace_bench.py [--turns 20000]
+
+Times Tracer.mark()/observe() calls and a synthetic turn with the marks a
+real turn makes (wake through first audio, one per stage boundary plus the
+repeated per-token and per-frame ones). Exits non-zero if a disabled
+tracer costs more than --max-disabled-us per turn, or if the Prometheus
+textfile declares a metric name twice (node_exporter rejects such a file);
+the bench sets gauges under the names of some histograms, as the app does.
+"""
+import argparse, os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from karen.metrics import Tracer, JsonlSink, PrometheusTextfile, metrics  # noqa: E402
+
+STAGES = ["speech_start", "speech_end", "endpointed", "transcribed", "llm_request",
+          "tts_request", "tts_first_byte", "tts_first_frame", "first_audio"]
+TOKENS = 60        # llm_first_token is marked on every streamed delta
+SENTENCES = 4      # llm_first_sentence on every sentence
+AUDIO_BLOCKS = 250 # first_audio on every audible reply block (5 s at 20 ms)
+LAG_SAMPLES = 20   # loop lag probes during one turn
+
+def one_turn(tr: Tracer):
+    tr.start_turn()
+    for stage in STAGES[:5]:
+        tr.mark(stage)
+    for _ in range(TOKENS):
+        tr.mark("llm_first_token")
+    for _ in range(SENTENCES):
+        tr.mark("llm_first_sentence")
+    for stage in STAGES[5:]:
+        tr.mark(stage)
+    for _ in range(AUDIO_BLOCKS):
+        tr.mark("first_audio")
+    for i in range(LAG_SAMPLES):
+        tr.observe("loop.lag_ms", 0.1 * i)
+    tr.end_turn()
+
+def per_call(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1e9
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--turns", type=int, default=20000)
+    ap.add_argument("--max-disabled-us", type=float, default=50.0)
+    args = ap.parse_args()
+
+    off, on = Tracer(enabled=False), Tracer(enabled=True)
+    on.start_turn()
+    print(f"{'call':<22} {'off ns':>8} {'on ns':>8}")
+    for name, f_off, f_on in (
+        ("mark (repeat stage)", lambda: off.mark("x"), lambda: on.mark("x")),
+        ("observe", lambda: off.observe("h", 1.0), lambda: on.observe("h", 1.0)),
+    ):
+        print(f"{name:<22} {per_call(f_off, 200000):8.0f} {per_call(f_on, 200000):8.0f}")
+    on.end_turn()
+
+    baseline = per_call(lambda: None, args.turns)
+    t_off = per_call(lambda: one_turn(off), args.turns) - baseline
+    t_on = per_call(lambda: one_turn(on), args.turns) - baseline
+    print(f"\nper turn ({TOKENS} tokens, {AUDIO_BLOCKS} audio blocks): "
+          f"off {t_off / 1000:.1f} us, on {t_on / 1000:.1f} us "
+          f"({t_off / 2e9 * 1e6:.1f} / {t_on / 2e9 * 1e6:.1f} ppm of a 2 s turn)")
+
+    # exporting is off the critical path, but shouldn't be slow either
+    import tempfile
+    for name in ("loop.lag_ms", "first_audio"):
+        metrics.set(name, 1.0)  # like speaker.loop_lag_ms and turn.dead_air_ms
+    metrics.inc("first_audio")
+    with tempfile.TemporaryDirectory() as d:
+        sinks = [PrometheusTextfile(os.path.join(d, "karen.prom")), JsonlSink(os.path.join(d, "trace.jsonl"))]
+        t0 = time.perf_counter()
+        for sink in sinks:
+            sink.snapshot(on)
+        print(f"snapshot export: {(time.perf_counter() - t0) * 1000:.2f} ms")
+        with open(os.path.join(d, "karen.prom"), encoding="utf-8") as f:
+            declared = [line.split()[2] for line in f if line.startswith("# TYPE ")]
+    twice = sorted({m for m in declared if declared.count(m) > 1})
+    for metric in twice:
+        print(f"FAIL {metric} declared twice in the Prometheus textfile")
+    sys.exit(0 if t_off / 1000 <= args.max_disabled_us and not twice else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Qt window soak: RSS and time per update over thousands of turns, old vs new.
+
+    python bench/ui_soak_bench.py [--turns 5000] [--turn-ms 2]
+
+Needs PySide6 (skipped if it is not installed); runs on Qt's offscreen
+platform. Each mode is a fresh interpreter that drives the window with the
+calls a turn makes (listening, partial transcripts, the user's text,
+thinking, a filler toast, speaking, reply sentences, idle, a toast), one
+turn every --turn-ms, and samples RSS ten times along the way. Compares:
+
+  old  what qt_ui used to do: every call updates a widget right away and
+       the transcript is a QTextEdit that keeps every line
+  new  QtUI: calls are recorded and applied once per frame, the transcript
+       is a UI_TRANSCRIPT_LINES ring buffer behind a QListView
+
+Both get their events processed once per frame, like QtUI's loop does.
+Reports RSS after the first tenth of the run and its growth after that,
+the cost of a UI call on the event loop, frame time (applying the updates,
+layout and paint) early and late in the run, all UI time per turn, and
+widget paints per frame. Exits non-zero if the new window's RSS grows more
+than --max-growth-mb, its late p95 frame time exceeds --max-frame-ms, or it
+gets slower over the run.
+"""
+import argparse, array, asyncio, json, os, subprocess, sys, time
+import numpy as np
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+PARTIALS = ["what's", "what's the", "what's the plan", "what's the plan for", "what's the plan for today"]
+REPLY = ["Ugh, fine, here's your answer:", "You have three meetings, none of which need you.",
+         "Lunch is at noon, try not to be late this time.", "Mmkay?"]
+CALLS = 8 + len(PARTIALS) + len(REPLY)  # UI calls per turn
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+def old_ui():
+    """qt_ui before the ring buffer: widgets updated per call, an unbounded QTextEdit."""
+    from datetime import datetime
+    from PySide6 import QtGui, QtWidgets
+    from karen.qt_ui import _KarenWindow
+
+    class OldUI:
+        def __init__(self):
+            self.win = _KarenWindow("assets/karen_mouth.gif")
+            self.transcript = QtWidgets.QTextEdit()
+            self.transcript.setReadOnly(True)
+            self.win.centralWidget().layout().replaceWidget(self.win.transcript, self.transcript)
+            self.win.transcript.hide()
+        def set_state(self, state): self.win.set_state(state)
+        def show_partial(self, text): self.win.partial_lbl.setText(text)
+        def show_user(self, text): self.append("You", text)
+        def show_karen(self, text): self.append("Karen", text)
+        def toast(self, msg): self.append("*", msg)
+        def append(self, who, text):
+            ts = datetime.now().strftime('%H:%M:%S')
+            self.transcript.append(f"""<b>[{ts}] {who}:</b> {text}""")
+            self.transcript.moveCursor(QtGui.QTextCursor.End)
+    return OldUI()
+
+async def child(args) -> dict:
+    from PySide6 import QtCore, QtWidgets
+    from karen.config import settings
+    QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    frame_s = 1.0 / settings.UI_FPS
+    if args.mode == "new":
+        from karen.qt_ui import QtUI
+        ui = QtUI()
+        tick = ui._tick
+        def pump():  # time QtUI's own frames
+            t0 = time.perf_counter()
+            tick()
+            frames.append((time.perf_counter() - t0) * 1000.0)
+        ui._handle.cancel()
+        ui._tick = pump
+        ui._handle = asyncio.get_running_loop().call_soon(ui._tick)
+    else:
+        ui = old_ui()
+        app = QtWidgets.QApplication.instance()
+        async def pump_old():
+            while True:
+                t0 = time.perf_counter()
+                app.processEvents()
+                frames.append((time.perf_counter() - t0) * 1000.0)
+                await asyncio.sleep(frame_s)
+        pumping = asyncio.create_task(pump_old())
+    paints = [0]
+    class PaintCounter(QtCore.QObject):
+        def eventFilter(self, obj, ev):
+            if ev.type() == QtCore.QEvent.Paint:
+                paints[0] += 1
+            return False
+    counter = PaintCounter()
+    QtWidgets.QApplication.instance().installEventFilter(counter)
+
+    # preallocated, so the samples don't count as growth
+    frames = array.array("d")
+    calls = np.zeros(args.turns * CALLS)
+    n = 0
+    def call(fn, *a):
+        nonlocal n
+        t0 = time.perf_counter()
+        fn(*a)
+        calls[n] = (time.perf_counter() - t0) * 1e6
+        n += 1
+
+    rss, marks = [], []
+    for turn in range(args.turns):
+        call(ui.set_state, "listening")
+        for p in PARTIALS:
+            call(ui.show_partial, p)
+        call(ui.set_state, "transcribing")
+        call(ui.show_user, f"{PARTIALS[-1]} #{turn}")
+        call(ui.set_state, "thinking")
+        call(ui.toast, "Hmm, let me think...")
+        call(ui.set_state, "speaking")
+        for s in REPLY:
+            call(ui.show_karen, s)
+            await asyncio.sleep(args.turn_ms / 1000.0 / len(REPLY))
+        call(ui.set_state, "idle")
+        call(ui.toast, "Back to waiting. Don't make me sit here all day.")
+        if (turn + 1) % max(1, args.turns // 10) == 0:
+            await asyncio.sleep(2 * frame_s)  # let the last updates land
+            rss.append(rss_mb())
+            marks.append(len(frames))
+    if args.mode != "new":
+        pumping.cancel()
+    early = np.array(frames[marks[0]:marks[1]])
+    late = np.array(frames[marks[-2]:marks[-1]])
+    lines = ui.win.transcript_model.rowCount() if args.mode == "new" else ui.transcript.document().blockCount()
+    return {
+        "rss0": rss[0], "growth": rss[-1] - rss[0],
+        "call_p50": float(np.percentile(calls[:n], 50)), "call_p99": float(np.percentile(calls[:n], 99)),
+        "early_p95": float(np.percentile(early, 95)), "late_p50": float(np.percentile(late, 50)),
+        "late_p95": float(np.percentile(late, 95)), "late_max": float(late.max()),
+        "turn_ms": (calls[:n].sum() / 1000.0 + sum(frames)) / args.turns,
+        "paints": paints[0], "frames": len(frames), "lines": lines,
+    }
+
+def run(args) -> int:
+    try:
+        import PySide6  # noqa: F401
+    except ImportError:
+        print("PySide6 is not installed; skipping the soak.")
+        return 0
+    print(f"{'ui':>4} {'turns':>6} {'rss MB':>7} {'growth':>7} {'call us p50':>11} {'p99':>6} "
+          f"{'frame ms p95 early':>18} {'late p50':>8} {'p95':>6} {'max':>6} {'ui ms/turn':>10} "
+          f"{'paints/frame':>12} {'lines':>6}")
+    results = {}
+    for mode in ("old", "new"):
+        cmd = [sys.executable, __file__, "--child", "--mode", mode, "--turns", str(args.turns),
+               "--turn-ms", str(args.turn_ms)]
+        out = subprocess.run(cmd, capture_output=True, text=True)
+        if out.returncode:
+            sys.stderr.write(out.stderr)
+            return 1
+        r = results[mode] = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{mode:>4} {args.turns:6d} {r['rss0']:7.1f} {r['growth']:+7.1f} "
+              f"{r['call_p50']:11.1f} {r['call_p99']:6.1f} {r['early_p95']:18.2f} {r['late_p50']:8.2f} "
+              f"{r['late_p95']:6.2f} {r['late_max']:6.1f} {r['turn_ms']:10.2f} "
+              f"{r['paints'] / r['frames']:12.1f} {r['lines']:6d}")
+    new = results["new"]
+    ok = (new["growth"] <= args.max_growth_mb and new["late_p95"] <= args.max_frame_ms
+          and new["late_p95"] <= 2 * new["early_p95"] + 1.0)
+    return 0 if ok else 1
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--turns", type=int, default=5000)
+    ap.add_argument("--turn-ms", type=float, default=2.0, help="time each turn takes")
+    ap.add_argument("--max-growth-mb", type=float, default=4.0)
+    ap.add_argument("--max-frame-ms", type=float, default=16.0)
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    ap.add_argument("--mode", default="new", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        print(json.dumps(asyncio.run(child(args))))
+        return
+    sys.exit(run(args))
+
+if __name__ == "__main__":
+    main()
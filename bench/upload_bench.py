@@ -0,0 +1,89 @@
+"""Batch STT uploads: what trimming keeps, upload size and encode time.
+
+    python bench/upload_bench.py [--seconds 6]
+
+Runs upload.prepare_upload on synthetic captures at 48 kHz:
+
+  padded     speech-like bursts with quiet room noise before and after
+  no quiet   steady speech-like noise from start to end: no quiet frames
+             to take the noise floor from
+  loud room  speech over room noise as loud as the speech's quiet parts
+  silence    room noise below ENDPOINT_MIN_DB only
+
+and reports, per capture, the seconds kept, the upload size and the time
+taken for each STT_UPLOAD_FORMAT that can be encoded here. Exits non-zero
+if a capture with speech in it is trimmed to nothing or loses more than
+--max-cut-ms of its speech, or if the silent one is uploaded at all.
+"""
+import argparse, os, sys, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from karen import upload  # noqa: E402
+
+RATE = 48000
+
+def bursts(rng, seconds: float) -> np.ndarray:
+    """Syllable-like tone bursts, 120-250 ms on, 30-80 ms off."""
+    out, n = [], int(seconds * RATE)
+    while sum(len(x) for x in out) < n:
+        on = int(RATE * rng.uniform(0.12, 0.25))
+        f = rng.uniform(120.0, 300.0)
+        env = np.hanning(on)
+        out.append(0.3 * env * np.sin(2 * np.pi * f * np.arange(on) / RATE))
+        out.append(np.zeros(int(RATE * rng.uniform(0.03, 0.08))))
+    return np.concatenate(out)[:n]
+
+def captures(rng, seconds: float) -> dict[str, tuple[np.ndarray, tuple[int, int] | None]]:
+    """name -> (audio, (first, last) speech sample or None)."""
+    room = lambda n, db: (10 ** (db / 20) * rng.standard_normal(n))
+    speech = bursts(rng, seconds)
+    lead = int(RATE)
+    padded = room(len(speech) + 2 * lead, -60.0)
+    padded[lead:lead + len(speech)] += speech
+    steady = 0.1 * rng.standard_normal(int(seconds * RATE))
+    loud_room = speech + room(len(speech), -25.0)
+    silence = room(int(seconds * RATE), -70.0)
+    return {
+        "padded": (padded, (lead, lead + len(speech))),
+        "no quiet": (steady, (0, len(steady))),
+        "loud room": (loud_room, (0, len(loud_room))),
+        "silence": (silence, None),
+    }
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=6.0)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--max-cut-ms", type=float, default=50.0, help="speech lost off either end")
+    args = ap.parse_args()
+    rng = np.random.default_rng(args.seed)
+    formats = [f for f in upload.FORMATS if f == "wav" or upload.sf is not None]
+    failures = []
+    print(f"{'capture':>9} {'seconds':>7} {'kept s':>6} " + " ".join(f"{f + ' KiB':>9} {'ms':>5}" for f in formats))
+    for name, (audio, speech) in captures(rng, args.seconds).items():
+        audio = audio.astype(np.float32)
+        trimmed = upload.trim_silence(audio, RATE)
+        cells = []
+        for fmt in formats:
+            t0 = time.perf_counter()
+            result = upload.prepare_upload(audio, RATE, fmt)
+            ms = (time.perf_counter() - t0) * 1000.0
+            cells.append(f"{len(result[1]) / 1024 if result else 0:9.1f} {ms:5.1f}")
+            if speech is None and result is not None:
+                failures.append(f"{name}: uploaded as {fmt}")
+            if speech is not None and result is None:
+                failures.append(f"{name}: nothing left to upload as {fmt}")
+        print(f"{name:>9} {len(audio) / RATE:7.2f} {len(trimmed) / RATE:6.2f} " + " ".join(cells))
+        if speech is not None and len(trimmed):
+            # trim_silence returns a view: where it starts says what was cut
+            start = (trimmed.__array_interface__["data"][0] - audio.__array_interface__["data"][0]) // audio.itemsize
+            cut = max(start - speech[0], speech[1] - (start + len(trimmed)), 0) / RATE * 1000.0
+            if cut > args.max_cut_ms:
+                failures.append(f"{name}: {cut:.0f} ms of speech trimmed off")
+    for msg in failures:
+        print(f"FAIL {msg}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
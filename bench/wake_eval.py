@@ -0,0 +1,349 @@
+"""Wake-word false accepts, misses and latency over a labeled corpus, swept over settings.
+
+    python bench/wake_eval.py --synth corpus/wake            # make a synthetic corpus
+    python bench/wake_eval.py corpus/wake --tone             # score it with the test-tone model
+    python bench/wake_eval.py corpus/wake --models hey_karen.tflite [--jobs 4]
+
+A corpus is a directory of 16 kHz 16-bit WAVs: `positive/` clips that each
+hold one wake word, `labels.json` mapping each of them ("positive/x.wav")
+to [wake_onset_s, wake_end_s], and `negative/` with any amount of
+background audio (TV, talk, kitchen noise) that contains no wake word.
+
+Files are cut into spans of --span-s and scored the way WakeWordService
+scores the mic (80 ms int16 frames) in a process pool, each span starting
+--warmup-s early so streaming model state is primed. The per-frame scores
+of every model go into a float16 memory-mapped .npy under --cache (default
+<corpus>/.wake_scores), keyed on the models and each file's size and
+mtime, so only new or changed files are scored again and re-analysis
+starts instantly.
+
+The sweep then replays WakeWordService's trigger rule (max score over the
+models, wake.replay_triggers) on the cached scores for every threshold,
+trigger level and cooldown. A positive is detected if it triggers between
+the wake word's onset and --late-s after its end; latency is the trigger
+time minus the end. False accepts per hour count triggers in the
+negatives. Prints miss rate, FA/h and latency against threshold for each
+trigger level, marks the current settings, and picks the setting with the
+fewest misses within --max-fa-per-hour. --out writes every point as JSON.
+"""
+import argparse, concurrent.futures, json, math, os, sys, time, wave
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from karen.capture import FrameAssembler  # noqa: E402
+from karen.config import settings  # noqa: E402
+from karen.fakeaudio import write_wav  # noqa: E402
+from karen.wake import FRAME_MS, FRAME_SAMPLES, load_model, replay_triggers  # noqa: E402
+
+RATE = 16000
+TONE_HZ = 1000.0
+
+class ToneModel:
+    """Stand-in for a wake-word model: scores a 1 kHz tone by its amplitude in one DFT bin."""
+    def __init__(self, full_scale: float = 0.1):
+        n = np.arange(FRAME_SAMPLES)
+        self._basis = np.exp(-2j * np.pi * TONE_HZ * n / RATE)
+        self.full_scale = full_scale
+
+    def predict(self, frame_i16: np.ndarray) -> dict[str, float]:
+        amp = 2.0 * abs(np.dot(frame_i16, self._basis)) / len(frame_i16) / 32767.0
+        return {"tone": min(1.0, amp / self.full_scale)}
+
+# --- corpus ---------------------------------------------------------------
+
+def noise(rng, n: int, db: float) -> np.ndarray:
+    x = np.cumsum(rng.standard_normal(n)) * 0.02   # reddish
+    x = x - np.convolve(x, np.ones(64) / 64, mode="same")
+    return x * 10 ** (db / 20) / (np.sqrt(np.mean(x ** 2)) + 1e-12)
+
+def burst(rng, seconds: float, hz: float, amp: float) -> np.ndarray:
+    t = np.arange(int(seconds * RATE)) / RATE
+    return amp * np.sin(2 * np.pi * hz * t) * np.hanning(len(t))
+
+def synth_corpus(path: str, n: int, negative_minutes: float, seed: int = 0):
+    """Positives: a two-burst 1 kHz "wake word" at varied level over noise.
+    Negatives: noise with blips near 1 kHz of random pitch, length and level."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.join(path, "positive"), exist_ok=True)
+    os.makedirs(os.path.join(path, "negative"), exist_ok=True)
+    labels = {}
+    for k in range(n):
+        lead = rng.uniform(0.8, 1.5)
+        hz, amp = TONE_HZ + rng.uniform(-8, 8), rng.uniform(0.03, 0.4)
+        word = np.concatenate([burst(rng, 0.22, hz, amp), np.zeros(int(0.06 * RATE)),
+                               burst(rng, rng.uniform(0.25, 0.4), hz, amp)])
+        audio = np.concatenate([np.zeros(int(lead * RATE)), word, np.zeros(int(1.5 * RATE))])
+        audio += noise(rng, len(audio), rng.uniform(-60, -35))
+        name = f"positive/wake_{k:04d}.wav"
+        write_wav(os.path.join(path, name), audio.astype(np.float32), RATE)
+        labels[name] = [round(lead, 4), round(lead + len(word) / RATE, 4)]
+    with open(os.path.join(path, "labels.json"), "w") as f:
+        json.dump(labels, f, indent=1)
+    file_s = 600.0
+    for k in range(math.ceil(negative_minutes * 60 / file_s)):
+        seconds = min(file_s, negative_minutes * 60 - k * file_s)
+        audio = noise(rng, int(seconds * RATE), rng.uniform(-55, -35))
+        for at in rng.uniform(0, seconds - 1.0, int(seconds / 8)):
+            hz = TONE_HZ + rng.choice([-1, 1]) * rng.uniform(10, 150)
+            b = burst(rng, rng.uniform(0.05, 0.5), hz, rng.uniform(0.01, 0.3))
+            i = int(at * RATE)
+            audio[i:i + len(b)] += b
+        write_wav(os.path.join(path, f"negative/background_{k:02d}.wav"), audio.astype(np.float32), RATE)
+    print(f"wrote {n} positives and {negative_minutes:.0f} min of negatives to {path}")
+
+def corpus_files(corpus: str) -> tuple[dict, list[str]]:
+    with open(os.path.join(corpus, "labels.json")) as f:
+        labels = json.load(f)
+    negatives = []
+    for root, _, names in os.walk(os.path.join(corpus, "negative")):
+        negatives += [os.path.relpath(os.path.join(root, n), corpus) for n in names if n.endswith(".wav")]
+    return labels, sorted(negatives)
+
+def read_span(path: str, start: int, n: int) -> np.ndarray:
+    """Samples [start, start + n) of a 16-bit WAV as mono float32."""
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2 or wf.getframerate() != RATE:
+            raise ValueError(f"{path}: expected 16-bit PCM at {RATE} Hz")
+        ch = wf.getnchannels()
+        wf.setpos(start)
+        data = np.frombuffer(wf.readframes(n), dtype=np.int16)
+    audio = data.reshape(-1, ch).mean(axis=1) if ch > 1 else data
+    return audio.astype(np.float32) / 32768.0
+
+# --- scoring (pool processes) ---------------------------------------------
+
+_model = None
+
+def make_model(spec: dict):
+    if spec["tone"]:
+        return ToneModel()
+    return load_model(spec["paths"], spec["vad_threshold"], spec["speex_ns"])
+
+def _init_worker(spec: dict):
+    global _model
+    _model = make_model(spec)
+
+def score_span(job: tuple) -> tuple[str, int, np.ndarray, list[str]]:
+    """Scores of frames [first, first + n) of one file, after `warm` frames of priming."""
+    path, rel, first, n, warm = job
+    if hasattr(_model, "reset"):
+        _model.reset()
+    warm = min(warm, first)
+    audio = read_span(path, (first - warm) * FRAME_SAMPLES, (n + warm) * FRAME_SAMPLES)
+    frames = FrameAssembler(FRAME_SAMPLES)
+    buf = np.empty(FRAME_SAMPLES, dtype=np.float32)
+    names: list[str] = []
+    out = None
+    for k in range(len(audio) // FRAME_SAMPLES):
+        buf[:] = audio[k * FRAME_SAMPLES:(k + 1) * FRAME_SAMPLES]
+        scores = _model.predict(frames.to_i16(buf))
+        if out is None:
+            names = sorted(scores)
+            out = np.zeros((n, len(names)), dtype=np.float16)
+        if k >= warm:
+            out[k - warm] = [scores[m] for m in names]
+    return rel, first, out if out is not None else np.zeros((0, 0), dtype=np.float16), names
+
+def model_key(spec: dict) -> dict:
+    if spec["tone"]:
+        return {"tone": True}
+    return {"models": [[os.path.abspath(p), os.path.getsize(p), os.path.getmtime(p)] for p in spec["paths"]],
+            "vad_threshold": spec["vad_threshold"], "speex_ns": spec["speex_ns"]}
+
+def file_frames(path: str) -> int:
+    with wave.open(path, "rb") as wf:
+        return wf.getnframes() // FRAME_SAMPLES
+
+def score_corpus(corpus: str, files: list[str], spec: dict, cache: str, jobs: int,
+                 span_s: float, warmup_s: float) -> tuple[np.ndarray, dict]:
+    """Memory-mapped (frames, models) float16 scores for `files`, and their index."""
+    key = model_key(spec)
+    index_path, scores_path = os.path.join(cache, "index.json"), os.path.join(cache, "scores.npy")
+    old, old_scores = {"files": {}}, None
+    if os.path.exists(index_path) and os.path.exists(scores_path):
+        with open(index_path) as f:
+            old = json.load(f)
+        if old.get("key") == key and old.get("frame_ms") == FRAME_MS:
+            old_scores = np.load(scores_path, mmap_mode="r")
+        else:
+            old = {"files": {}}
+
+    entries, todo = {}, []
+    span, warm = max(1, int(span_s * 1000 / FRAME_MS)), int(warmup_s * 1000 / FRAME_MS)
+    for rel in files:
+        path = os.path.join(corpus, rel)
+        st = os.stat(path)
+        prev = old["files"].get(rel)
+        if old_scores is not None and prev and prev["size"] == st.st_size and prev["mtime"] == st.st_mtime:
+            entries[rel] = {**prev, "cached": True}
+            continue
+        n = file_frames(path)
+        entries[rel] = {"size": st.st_size, "mtime": st.st_mtime, "frames": n, "cached": False}
+        todo += [(path, rel, first, min(span, n - first), warm) for first in range(0, n, span)]
+
+    fresh: dict[str, list] = {}
+    names = old.get("models") if old_scores is not None else None
+    if todo:
+        t0 = time.perf_counter()
+        audio_s = sum(j[3] for j in todo) * FRAME_MS / 1000.0
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                                    initargs=(spec,)) as pool:
+            for rel, first, out, span_names in pool.map(score_span, todo, chunksize=1):
+                fresh.setdefault(rel, []).append((first, out))
+                names = names or span_names
+                if span_names and span_names != names:
+                    sys.exit(f"models changed between spans: {names} vs {span_names}")
+        wall = time.perf_counter() - t0
+        print(f"scored {audio_s / 3600:.2f} h of audio in {len(todo)} spans on {jobs} processes "
+              f"in {wall:.1f} s ({audio_s / wall:.0f}x real time)")
+    else:
+        print("all scores cached")
+
+    # write the new layout next to the old one, then swap it in
+    os.makedirs(cache, exist_ok=True)
+    total = sum(e["frames"] for e in entries.values())
+    tmp = scores_path + ".tmp.npy"
+    scores = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float16, shape=(total, len(names or [])))
+    offset = 0
+    for rel in files:
+        e = entries[rel]
+        if e.pop("cached"):
+            scores[offset:offset + e["frames"]] = old_scores[e["offset"]:e["offset"] + e["frames"]]
+        else:
+            for first, out in fresh.get(rel, []):
+                scores[offset + first:offset + first + len(out)] = out
+        e["offset"] = offset
+        offset += e["frames"]
+    scores.flush()
+    del scores, old_scores
+    os.replace(tmp, scores_path)
+    index = {"key": key, "frame_ms": FRAME_MS, "models": names or [], "files": entries}
+    with open(index_path, "w") as f:
+        json.dump(index, f, indent=1)
+    return np.load(scores_path, mmap_mode="r"), index
+
+# --- sweep -----------------------------------------------------------------
+
+def track(scores: np.ndarray, index: dict, rel: str, model: str | None) -> np.ndarray:
+    e = index["files"][rel]
+    rows = scores[e["offset"]:e["offset"] + e["frames"]]
+    if model is not None:
+        return np.asarray(rows[:, index["models"].index(model)], dtype=np.float32)
+    return np.asarray(rows, dtype=np.float32).max(axis=1) if rows.shape[1] else np.zeros(len(rows), np.float32)
+
+def sweep(pos: list[tuple[np.ndarray, float, float]], neg: list[np.ndarray], thresholds, levels,
+          cooldowns, late_s: float) -> list[dict]:
+    frame_s = FRAME_MS / 1000.0
+    neg_hours = sum(len(t) for t in neg) * frame_s / 3600.0
+    points = []
+    for cooldown in cooldowns:
+        cool = math.ceil(cooldown / frame_s - 1e-9)
+        for level in levels:
+            for thr in thresholds:
+                fa = sum(len(replay_triggers(t, thr, level, cool)) for t in neg)
+                lat, missed = [], 0
+                for t, onset, end in pos:
+                    # a trigger reports at the end of the frame that completed the streak
+                    hits = [(i + 1) * frame_s for i in replay_triggers(t, thr, level, cool)]
+                    hits = [h for h in hits if onset <= h <= end + late_s]
+                    if hits:
+                        lat.append((hits[0] - end) * 1000.0)
+                    else:
+                        missed += 1
+                points.append({
+                    "threshold": round(float(thr), 4), "trigger_level": level, "cooldown_s": cooldown,
+                    "miss_rate": missed / len(pos) if pos else float("nan"),
+                    "false_accepts": fa, "fa_per_hour": fa / neg_hours if neg_hours else float("nan"),
+                    "latency_p50_ms": float(np.percentile(lat, 50)) if lat else float("nan"),
+                    "latency_p95_ms": float(np.percentile(lat, 95)) if lat else float("nan"),
+                })
+    return points
+
+def report(points: list[dict], max_fa: float):
+    current = (settings.WAKE_THRESHOLD, settings.WAKE_TRIGGER_LEVEL, settings.WAKE_COOLDOWN_S)
+    ok = [p for p in points if p["fa_per_hour"] <= max_fa]
+    best = min(ok, key=lambda p: (p["miss_rate"], p["latency_p50_ms"])) if ok else None
+    for cooldown in sorted({p["cooldown_s"] for p in points}):
+        for level in sorted({p["trigger_level"] for p in points}):
+            print(f"\ntrigger level {level}, cooldown {cooldown:g} s")
+            print(f"{'threshold':>9} {'miss %':>7} {'FA/h':>7} {'lat p50 ms':>10} {'p95 ms':>7}")
+            for p in points:
+                if p["trigger_level"] != level or p["cooldown_s"] != cooldown:
+                    continue
+                tags = []
+                if math.isclose(p["threshold"], current[0]) and level == current[1] and cooldown == current[2]:
+                    tags.append("current")
+                if p is best:
+                    tags.append("best")
+                print(f"{p['threshold']:9.2f} {100 * p['miss_rate']:7.1f} {p['fa_per_hour']:7.2f} "
+                      f"{p['latency_p50_ms']:10.0f} {p['latency_p95_ms']:7.0f}  {' '.join(tags)}")
+    if best:
+        print(f"\nfewest misses within {max_fa:g} FA/h: WAKE_THRESHOLD={best['threshold']:g} "
+              f"WAKE_TRIGGER_LEVEL={best['trigger_level']} WAKE_COOLDOWN_S={best['cooldown_s']:g} "
+              f"({100 * best['miss_rate']:.1f}% missed, {best['fa_per_hour']:.2f} FA/h, "
+              f"{best['latency_p50_ms']:.0f} ms p50)")
+    else:
+        print(f"\nno setting stays within {max_fa:g} FA/h")
+
+def float_range(text: str) -> list[float]:
+    """"0.1:0.95:0.05" (start:stop:step, inclusive) or "0.4,0.5,0.6"."""
+    if ":" in text:
+        a, b, step = (float(x) for x in text.split(":"))
+        return [round(x, 6) for x in np.arange(a, b + step / 2, step)]
+    return [float(x) for x in text.split(",")]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("corpus", nargs="?")
+    ap.add_argument("--synth", metavar="DIR", help="write a synthetic labeled corpus to DIR")
+    ap.add_argument("-n", type=int, default=200, help="positives to synthesize")
+    ap.add_argument("--negative-minutes", type=float, default=60.0, help="background to synthesize")
+    ap.add_argument("--models", nargs="+", default=[], help="openWakeWord model files")
+    ap.add_argument("--tone", action="store_true", help="score with the 1 kHz test-tone model")
+    ap.add_argument("--model", help="evaluate one model's scores instead of the max over all")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--span-s", type=float, default=300.0, help="audio per scoring task")
+    ap.add_argument("--warmup-s", type=float, default=2.0, help="audio scored before each span to prime the model")
+    ap.add_argument("--cache", help="score cache directory (default <corpus>/.wake_scores)")
+    ap.add_argument("--thresholds", type=float_range, default=float_range("0.1:0.95:0.05"))
+    ap.add_argument("--levels", type=int, nargs="+", default=[1, 2, 3, 4, 5])
+    ap.add_argument("--cooldowns", type=float, nargs="+", default=[settings.WAKE_COOLDOWN_S])
+    ap.add_argument("--late-s", type=float, default=1.0, help="latest a trigger counts after the wake word")
+    ap.add_argument("--max-fa-per-hour", type=float, default=0.5)
+    ap.add_argument("--out", help="write every sweep point to this JSON file")
+    args = ap.parse_args()
+    if args.synth:
+        synth_corpus(args.synth, args.n, args.negative_minutes)
+        if not args.corpus:
+            return
+    if not args.corpus:
+        ap.error("corpus directory required")
+    if not args.tone and not args.models:
+        args.models = list(settings.WAKE_MODEL_PATHS)
+        if not args.models:
+            ap.error("pass --models or --tone")
+
+    spec = {"tone": args.tone, "paths": args.models,
+            "vad_threshold": float(getattr(settings, "WAKE_VAD_THRESHOLD", 0.0)),
+            "speex_ns": bool(getattr(settings, "WAKE_SPEEX_NS", False))}
+    labels, negatives = corpus_files(args.corpus)
+    cache = args.cache or os.path.join(args.corpus, ".wake_scores")
+    scores, index = score_corpus(args.corpus, sorted(labels) + negatives, spec, cache,
+                                 args.jobs, args.span_s, args.warmup_s)
+    if args.model is not None and args.model not in index["models"]:
+        sys.exit(f"unknown model {args.model!r}; scored: {', '.join(index['models'])}")
+
+    t0 = time.perf_counter()
+    pos = [(track(scores, index, rel, args.model), onset, end) for rel, (onset, end) in sorted(labels.items())]
+    neg = [track(scores, index, rel, args.model) for rel in negatives]
+    points = sweep(pos, neg, args.thresholds, args.levels, args.cooldowns, args.late_s)
+    neg_h = sum(len(t) for t in neg) * FRAME_MS / 1000.0 / 3600.0
+    print(f"{len(pos)} positives, {neg_h:.2f} h of negatives, models: {', '.join(index['models'])}; "
+          f"{len(points)} settings swept in {time.perf_counter() - t0:.2f} s")
+    report(points, args.max_fa_per_hour)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(points, f, indent=1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Wake-loop frame assembly benchmark.
+
+    python bench/wake_frames_bench.py [--minutes 10]
+
+Feeds simulated idle-room audio through the old queue + np.concatenate
+framing of WakeWordService._listen_loop and through CaptureHub +
+FrameAssembler, with model inference left out. Reports CPU and transient
+heap bytes (numpy buffers plus Python objects, via tracemalloc), scaled
+to one hour of listening.
+"""
+import argparse, asyncio, os, sys, time, tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from karen.capture import CaptureHub, FrameAssembler  # noqa: E402
+
+RATE = 16000
+FRAME = 1280   # 80 ms, as in wake.py
+BLOCK = 320    # typical device period with blocksize=0
+
+def blocks(minutes: float):
+    rng = np.random.default_rng(0)
+    noise = (rng.standard_normal((64, BLOCK, 1)) * 0.003).astype(np.float32)
+    for i in range(int(minutes * 60 * RATE / BLOCK)):
+        yield noise[i % 64]
+
+async def old_loop(minutes: float, on_step):
+    queue: asyncio.Queue = asyncio.Queue(maxsize=32)
+    buf = np.empty(0, dtype=np.float32)
+    for indata in blocks(minutes):
+        on_step()
+        queue.put_nowait(indata[:, 0].copy())          # the old callback
+        chunk = await queue.get()
+        buf = chunk if buf.size == 0 else np.concatenate([buf, chunk])
+        while buf.size >= FRAME:
+            frame_f32 = buf[:FRAME]
+            buf = buf[FRAME:]
+            frame_i16 = (np.clip(frame_f32, -1.0, 1.0) * 32767.0).astype(np.int16)
+            del frame_i16
+
+async def new_loop(minutes: float, on_step):
+    hub = CaptureHub(rate=RATE, seconds=2.0)
+    reader = hub.reader(name="bench")
+    frames = FrameAssembler(FRAME)
+    pending = 0
+    for indata in blocks(minutes):
+        on_step()
+        hub._callback(indata, BLOCK, None, None)
+        pending += BLOCK
+        while pending >= FRAME:
+            await frames.next_frame(reader)
+            pending -= FRAME
+
+def measure(loop_fn, minutes: float) -> tuple[float, float]:
+    t0 = time.process_time()
+    asyncio.run(loop_fn(minutes, lambda: None))
+    cpu = time.process_time() - t0
+
+    # transient bytes: peak above the baseline between consecutive callbacks
+    total = 0
+    def on_step():
+        nonlocal total
+        cur, peak = tracemalloc.get_traced_memory()
+        total += peak - cur
+        tracemalloc.reset_peak()
+    tracemalloc.start()
+    asyncio.run(loop_fn(minutes, on_step))
+    tracemalloc.stop()
+    return cpu, total
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--minutes", type=float, default=10.0, help="simulated listening time")
+    args = ap.parse_args()
+    scale = 60.0 / args.minutes
+    print(f"{'impl':>6} {'cpu s/h':>9} {'cpu %':>7} {'heap MB/h':>11}")
+    for name, fn in (("old", old_loop), ("new", new_loop)):
+        cpu, alloc = measure(fn, args.minutes)
+        print(f"{name:>6} {cpu * scale:9.2f} {100 * cpu / (args.minutes * 60):7.3f} {alloc * scale / 1e6:11.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Wake-word inference on the event loop vs on the InferenceWorker thread.
+
+    python bench/wake_worker_bench.py [--seconds 20] [--model-ms 8] [--frame-ms 4]
+
+Streams room noise with a 1 kHz "wake" tone every --every seconds through a
+real-time FakeInputStream into WakeWordService, whose stand-in model scores
+the tone and burns --model-ms per predict() call plus --frame-ms per 80 ms
+frame in numpy (which, like onnxruntime and tflite, releases the GIL). Every
+--spike-every calls one takes --spike-ms extra, like a core taken by another
+process, so the worker falls behind and batches. A probe task measures how
+late a 1 ms sleep wakes up.
+
+Reports loop lag, tones detected and how long after onset, inference time,
+the most frames queued when a predict() call started and frames per call,
+inline and with the worker. Exits non-zero if the worker's p99 loop lag
+exceeds --max-lag-ms, it misses a tone or fires on nothing, or it drops
+frames.
+"""
+import argparse, asyncio, functools, os, sys, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from karen.capture import CaptureHub  # noqa: E402
+from karen.fakeaudio import FakeInputStream  # noqa: E402
+from karen.metrics import metrics, tracer  # noqa: E402
+from karen.wake import FRAME_SAMPLES, WakeWordService  # noqa: E402
+
+RATE = 16000
+TONE_HZ = 1000.0
+TONE_S = 0.4
+
+class SlowModel:
+    """Scores the tone in the last frame, after burning CPU like a real model."""
+    def __init__(self, model_ms: float, frame_ms: float, spike_ms: float, spike_every: int):
+        n = np.arange(FRAME_SAMPLES)
+        self._basis = np.exp(-2j * np.pi * TONE_HZ * n / RATE)
+        self._a = np.random.default_rng(0).standard_normal((192, 192))
+        self._per_ms = self._calibrate()
+        self.model_ms, self.frame_ms = model_ms, frame_ms
+        self.spike_ms, self.spike_every = spike_ms, spike_every
+        self.calls = 0
+
+    def _calibrate(self) -> float:
+        t0 = time.perf_counter()
+        for _ in range(200):
+            self._a @ self._a
+        return 200 / ((time.perf_counter() - t0) * 1000.0)
+
+    def _burn(self, ms: float):
+        for _ in range(int(ms * self._per_ms)):
+            self._a @ self._a
+
+    def predict(self, frame_i16: np.ndarray) -> dict[str, float]:
+        self.calls += 1
+        ms = self.model_ms + self.frame_ms * len(frame_i16) / FRAME_SAMPLES
+        if self.spike_every and self.calls % self.spike_every == 0:
+            ms += self.spike_ms
+        self._burn(ms)
+        last = frame_i16[-FRAME_SAMPLES:]
+        amp = 2.0 * abs(np.dot(last, self._basis)) / len(last) / 32767.0
+        return {"tone": min(1.0, amp / 0.1)}
+
+def scene(seconds: float, every: float) -> tuple[np.ndarray, list[float]]:
+    rng = np.random.default_rng(1)
+    t = np.arange(int(seconds * RATE)) / RATE
+    audio = rng.standard_normal(len(t)) * 0.003
+    onsets = list(np.arange(every, seconds - 1.0, every))
+    for a in onsets:
+        m = (t >= a) & (t < a + TONE_S)
+        audio[m] += 0.2 * np.sin(2 * np.pi * TONE_HZ * t[m])
+    return audio.astype(np.float32), onsets
+
+async def probe(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append((time.perf_counter() - t0 - 0.001) * 1000.0)
+
+async def run_mode(worker: bool, args) -> dict:
+    audio, onsets = scene(args.seconds, args.every)
+    model = SlowModel(args.model_ms, args.frame_ms, args.spike_ms, args.spike_every)
+    tracer.histograms.clear()
+    before = metrics.snapshot()
+    factory = functools.partial(FakeInputStream, [audio])
+    detections: list[float] = []
+    lags: list[float] = []
+    stop = asyncio.Event()
+    async with CaptureHub(rate=RATE, stream_factory=factory) as hub:
+        start = hub.position
+        async with WakeWordService(hub, model=model, threshold=0.5, trigger_level=2,
+                                   cooldown_ms=1000, worker=worker) as wake:
+            wake.on_trigger = lambda: detections.append((wake.trigger_pos, wake.trigger_ts))
+            prober = asyncio.create_task(probe(lags, stop))
+            await asyncio.sleep(args.seconds)
+            stop.set()
+            await prober
+    delays, missed = [], 0
+    for onset in onsets:
+        pos = start + int(onset * RATE)
+        hits = [ts for p, ts in detections if pos <= p < pos + RATE]
+        if hits:
+            delays.append((hits[0] - hub.time_at(pos)) * 1000.0)
+        else:
+            missed += 1
+    after = metrics.snapshot()
+    delta = lambda k: after.get(k, 0) - before.get(k, 0)
+    lag = np.array(lags)
+    infer = tracer.histograms.get("wake.infer_ms")
+    backlog = tracer.histograms.get("wake.backlog_frames")
+    batches = delta("wake.batches")
+    return {
+        "lag_p50": float(np.percentile(lag, 50)), "lag_p99": float(np.percentile(lag, 99)),
+        "lag_max": float(lag.max()),
+        "tones": len(onsets), "missed": missed, "false": len(detections) - len(delays),
+        "detect_ms": float(np.median(delays)) if delays else float("nan"),
+        "infer_p50": infer.percentiles((50,))[50] if infer else float("nan"),
+        "backlog_max": backlog.percentiles((100,))[100] if backlog else 0,
+        "per_call": delta("wake.frames") / batches if batches else 1.0,
+        "dropped": delta("wake.dropped_frames"),
+    }
+
+async def run(args) -> int:
+    tracer.enabled = True  # for the inference histograms
+    print(f"{'inference':>9} {'lag p50 ms':>10} {'p99 ms':>7} {'max ms':>7} {'detected':>8} "
+          f"{'detect ms':>9} {'infer ms':>8} {'backlog':>7} {'frames/call':>11} {'dropped':>7}")
+    results = {}
+    for name, worker in (("loop", False), ("worker", True)):
+        r = results[name] = await run_mode(worker, args)
+        print(f"{name:>9} {r['lag_p50']:10.2f} {r['lag_p99']:7.2f} {r['lag_max']:7.1f} "
+              f"{r['tones'] - r['missed']:>4}/{r['tones']:<3} {r['detect_ms']:9.0f} {r['infer_p50']:8.1f} "
+              f"{r['backlog_max']:7.0f} {r['per_call']:11.2f} {r['dropped']:7.0f}")
+    w = results["worker"]
+    ok = w["lag_p99"] <= args.max_lag_ms and w["missed"] == 0 and w["false"] == 0 and w["dropped"] == 0
+    return 0 if ok else 1
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=20.0, help="audio per mode")
+    ap.add_argument("--every", type=float, default=2.5, help="seconds between wake tones")
+    ap.add_argument("--model-ms", type=float, default=8.0, help="CPU per predict() call")
+    ap.add_argument("--frame-ms", type=float, default=4.0, help="extra CPU per 80 ms frame scored")
+    ap.add_argument("--spike-ms", type=float, default=300.0)
+    ap.add_argument("--spike-every", type=int, default=60, help="calls between spikes (0: none)")
+    ap.add_argument("--max-lag-ms", type=float, default=5.0)
+    args = ap.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+if __name__ == "__main__":
+    main()
@@ -1,81 +1,371 @@
 import asyncio
+import collections
+import threading
+import time
+from typing import Callable
 import numpy as np
-import sounddevice as sd
 from .config import settings
+from .capture import CaptureHub, HubReader
+from .endpoint import Endpointer
+from .metrics import metrics, tracer
 
 class Mic:
-    def __init__(self, rate: int | None = None):
-        self.rate = rate or settings.SAMPLE_RATE
-        self.channels = settings.CHANNELS
-        self._queue = asyncio.Queue()
-        self._stream = None
+    """Records a command from the shared CaptureHub.
+    Reading starts at `start` (e.g. the end of the wake word) rather than at
+    the moment the recorder is opened, so nothing said right after the wake
+    word is lost.
+    """
+    def __init__(self, hub: CaptureHub, start: int | None = None):
+        self.hub = hub
+        self.rate = hub.rate
+        self.start = start
+        self._reader: HubReader | None = None
 
     async def __aenter__(self):
-        loop = asyncio.get_running_loop()
-        def cb(indata, frames, time, status):
-            if status: # print xruns, etc.
-                pass
-            # Copy to avoid reuse
-            loop.call_soon_threadsafe(self._queue.put_nowait, indata.copy())
-
-        self._stream = sd.InputStream(samplerate=self.rate,
-                                     channels=self.channels, callback=cb, blocksize=0)
-        self._stream.start()
+        self._reader = self.hub.reader(self.start)
         return self
 
     async def __aexit__(self, *args):
-        if self._stream:
-            self._stream.stop(); self._stream.close(); self._stream = None
+        if self._reader:
+            self._reader.close(); self._reader = None
 
     async def capture_until_silence(self, max_sec: int | None = None,
-                                   silence_ms: int = 600):
+                                   silence_ms: int | None = None,
+                                   on_audio: Callable[[np.ndarray], None] | None = None) -> "Utterance":
+        """Record until the endpointer hears the end of speech (or max_sec).
+        `on_audio` gets every block as it is captured (e.g. streaming STT).
+        """
         max_sec = max_sec or settings.MAX_SEC
-        chunk_ms = 30
-        chunk_samples = int(self.rate * chunk_ms / 1000)
-        silence_chunks_needed = silence_ms // chunk_ms
+        start = self._reader.pos
+        ep = Endpointer(self.rate, hangover_ms=silence_ms)
+        # room noise: 3 s to 1.5 s before `start` (the end of the wake word), before it was said
+        ep.prime(self.hub.history(start - int(3.0 * self.rate), int(1.5 * self.rate)))
 
+        limit = int(max_sec * self.rate)
+        no_speech = int(settings.ENDPOINT_NO_SPEECH_S * self.rate)
         buf = []
-        silent = 0
-        total_ms = 0
-
-        while total_ms < max_sec * 1000:
-            data = await self._queue.get()
-            mono = data[:,0] if data.ndim > 1 else data
-            buf.append(mono.copy())
-
-            # simple VAD based on RMS
-            rms = np.sqrt(np.mean(mono**2))
-            if rms < 0.01:
-                silent += 1
-            else:
-                silent = 0
-
-            total_ms += int(len(mono) / self.rate * 1000)
-
-            if silent >= silence_chunks_needed and total_ms > 500: # at least 0.5s
+        total = 0
+        while total < limit:
+            mono = await self._reader.read(limit - total)
+            buf.append(mono)
+            total += len(mono)
+            if on_audio:
+                on_audio(mono)
+            if ep.push(mono):
                 break
+            if ep.onset is None and total >= no_speech:
+                break
+        done_ts = time.monotonic()
+        tracer.mark("endpointed", done_ts)
 
         audio = np.concatenate(buf) if buf else np.zeros(1, dtype=np.float32)
-        return (audio.astype(np.float32), self.rate)
+        utt = Utterance(audio, self.rate, ep.onset, ep.end)
+        if ep.onset is not None:
+            utt.onset_ts = self.hub.time_at(start + ep.onset)
+            tracer.mark("speech_start", utt.onset_ts)
+        if ep.end is not None:
+            utt.end_ts = self.hub.time_at(start + ep.end)
+            tracer.mark("speech_end", utt.end_ts)
+            metrics.set("endpoint.latency_ms", (done_ts - utt.end_ts) * 1000.0)
+        return utt
+
+class Utterance:
+    """A recorded command. `onset`/`end` are sample offsets of detected speech
+    in `audio` (None if not found); `*_ts` are the matching monotonic times.
+    """
+    def __init__(self, audio: np.ndarray, rate: int, onset: int | None = None, end: int | None = None):
+        self.audio = audio
+        self.rate = rate
+        self.onset = onset
+        self.end = end
+        self.onset_ts: float | None = None
+        self.end_ts: float | None = None
+
+    @property
+    def has_speech(self) -> bool:
+        return self.onset is not None
+
+# mixer inputs; the reply ducks the others
+VOICES = ("reply", "filler", "earcon")
+
+class _Voice:
+    """One mixer input: a preallocated ring written by the event loop and
+    read by the device callback, plus its gain ramp. Positions are absolute
+    sample counts.
+    """
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+        self.buf = np.zeros(size, dtype=np.float32)
+        self.read = 0
+        self.write = 0
+        self.gain = 1.0
+        self.target = 1.0
+        self.open = False       # mid-utterance: running dry counts as an underrun
+        self.starved = False
+        self.dropping = False   # fading out, to be discarded by flush()
+
+    def queued(self) -> int:
+        return self.write - self.read
 
 class Speaker:
-    def __init__(self, rate: int | None = None):
+    """Callback-driven output with a small mixer.
+
+    play_pcm() copies audio into a voice's preallocated ring and only waits
+    (on the event loop, never blocking it) while that ring is full; the
+    device callback mixes the voices on the audio thread. The reply ducks
+    fillers and earcons by SPEAKER_DUCK_DB, a voice that starts while another
+    is audible fades in over SPEAKER_FADE_MS, and flush() fades out over the
+    same time. drain() waits until queued audio has been heard; stop()
+    silences everything at once (within one device buffer). Underruns and
+    event-loop lag during playback are reported to metrics, and everything
+    mixed is reported to `echo`, if given, so the mic side can subtract it,
+    and to `mouth` (a LipSync), if given, so the UI's mouth follows it.
+    """
+    def __init__(self, rate: int | None = None, echo=None, stream_factory=None,
+                 block: int | None = None, mouth=None):
         self.rate = rate or settings.SAMPLE_RATE
+        self.volume = settings.VOLUME
+        self.echo = echo
+        self.mouth = mouth
+        self.block = block or settings.SPEAKER_BLOCK
+        self.underruns = 0
+        self.lag_max_ms = 0.0   # worst event-loop lag during the current/last playback
+        self._duck = 10.0 ** (settings.SPEAKER_DUCK_DB / 20.0)
+        self._fade_step = 1.0 / max(1, int(self.rate * settings.SPEAKER_FADE_MS / 1000))
+        size = int(self.rate * settings.SPEAKER_BUFFER_S)
+        self._voices = {name: _Voice(name, size) for name in VOICES}
+        self._lock = threading.Lock()
+        self._alloc(self.block)
+        self._tick = asyncio.Event()   # set after every device callback
+        self._queued = asyncio.Event() # set when audio is queued
+        self._stream_factory = stream_factory
         self._stream = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._watch: asyncio.Task | None = None
+        # what reached the speaker, for dead-air accounting: [start, end] spans
+        # of any audio, and the times a reply started after silence on its voice
+        self._heard: collections.deque[list[float]] = collections.deque(maxlen=64)
+        self._reply_starts: collections.deque[float] = collections.deque(maxlen=64)
+        self._reply_on = False
 
     async def __aenter__(self):
-        self._stream = sd.OutputStream(samplerate=self.rate, channels=1)
+        self._loop = asyncio.get_running_loop()
+        factory = self._stream_factory
+        if factory is None:
+            import sounddevice as sd
+            factory = sd.OutputStream
+        self._stream = factory(samplerate=self.rate, channels=1, dtype="float32",
+                               callback=self._callback, blocksize=self.block)
         self._stream.start()
+        self._watch = asyncio.create_task(self._watch_lag())
         return self
 
     async def __aexit__(self, *args):
+        if self._watch:
+            self._watch.cancel()
+            self._watch = None
         if self._stream:
             self._stream.stop(); self._stream.close(); self._stream = None
 
-    async def play_pcm(self, pcm: np.ndarray):
-        # pcm: float32 [-1,1]
-        self._stream.write(pcm.astype(np.float32))
+    @property
+    def playing(self) -> bool:
+        return any(v.queued() > 0 for v in self._voices.values())
 
-    async def play_chunks(self, gen):
+    async def play_pcm(self, pcm: np.ndarray, voice: str = "reply"):
+        """Queue float32 [-1, 1] audio on a voice; waits only for ring space."""
+        v = self._voices[voice]
+        pcm = np.asarray(pcm, dtype=np.float32).reshape(-1)
+        i = 0
+        while i < len(pcm):
+            with self._lock:
+                free = 0 if v.dropping else v.size - v.queued()
+                if free:
+                    if v.queued() == 0:
+                        # fade in under anything already playing, else start at full gain
+                        others = any(o is not v and o.queued() > 0 for o in self._voices.values())
+                        v.gain = 0.0 if others else self._target(v)
+                    n = min(free, len(pcm) - i)
+                    self._put(v, pcm[i:i + n])
+                    v.open = True
+                    i += n
+                    self._queued.set()
+                    continue
+            await self._next_tick()
+
+    async def play_chunks(self, gen, voice: str = "reply"):
         async for chunk in gen:
-            await self.play_pcm(chunk)
+            await self.play_pcm(chunk, voice)
+        await self.drain(voice)
+
+    async def drain(self, voice: str | None = None):
+        """Wait until everything queued (on one voice, or all) has been heard."""
+        voices = [self._voices[voice]] if voice else list(self._voices.values())
+        for v in voices:
+            v.open = False  # the utterance is complete; running dry is expected now
+        while any(v.queued() > 0 for v in voices):
+            await self._next_tick()
+        await asyncio.sleep(getattr(self._stream, "latency", 0.0) or 0.0)
+
+    async def flush(self, voice: str | None = None, wait: bool = True):
+        """Fade out and discard what is queued (on one voice, or all).
+        With wait=False, returns as soon as the fade has begun.
+        """
+        voices = [self._voices[voice]] if voice else list(self._voices.values())
+        with self._lock:
+            for v in voices:
+                v.open = False
+                if v.queued() > 0:
+                    v.dropping = True
+        while wait and any(v.dropping for v in voices):
+            await self._next_tick()
+
+    def silence(self, t0: float, t1: float) -> float:
+        """Seconds between monotonic times `t0` and `t1` when nothing reached the speaker."""
+        heard = sum(max(0.0, min(b, t1) - max(a, t0)) for a, b in list(self._heard))
+        return max(0.0, t1 - t0 - heard)
+
+    def reply_heard(self, since: float) -> float | None:
+        """When reply audio first reached the speaker at or after `since`, if it has."""
+        return next((t for t in list(self._reply_starts) if t >= since), None)
+
+    def stop(self):
+        """Silence every voice immediately (barge-in)."""
+        with self._lock:
+            for v in self._voices.values():
+                v.read = v.write
+                v.open = v.dropping = v.starved = False
+        if self.echo is not None:
+            self.echo.stop()
+        if self.mouth is not None:
+            self.mouth.stop()
+
+    async def _next_tick(self):
+        if self._stream is None:
+            raise RuntimeError("Speaker is not running")
+        self._tick.clear()
+        await self._tick.wait()
+
+    def _target(self, v: _Voice) -> float:
+        if v.dropping:
+            return 0.0
+        if v.name != "reply" and self._voices["reply"].queued() > 0:
+            return self._duck
+        return 1.0
+
+    def _alloc(self, n: int):
+        self._mix = np.zeros(n, dtype=np.float32)
+        self._tmp = np.zeros(n, dtype=np.float32)
+        self._gains = np.zeros(n, dtype=np.float32)
+        self._ramp = np.arange(1, n + 1, dtype=np.float32)
+
+    def _put(self, v: _Voice, data: np.ndarray):
+        s = v.write % v.size
+        first = min(len(data), v.size - s)
+        v.buf[s:s + first] = data[:first]
+        v.buf[:len(data) - first] = data[first:]
+        v.write += len(data)
+
+    def _take(self, v: _Voice, out: np.ndarray):
+        s = v.read % v.size
+        n = len(out)
+        first = min(n, v.size - s)
+        out[:first] = v.buf[s:s + first]
+        out[first:] = v.buf[:n - first]
+        v.read += n
+
+    def _callback(self, outdata, frames, time_info, status):
+        if status:
+            metrics.inc("speaker.status_flags")
+        if frames > len(self._mix):
+            self._alloc(frames)
+        mix, tmp, gains = self._mix[:frames], self._tmp, self._gains
+        mix.fill(0.0)
+        audible = reply_audible = False
+        with self._lock:
+            for v in self._voices.values():
+                v.target = self._target(v)
+                n = min(frames, v.queued())
+                if n == frames:
+                    v.starved = False
+                elif v.open and not v.starved:
+                    v.starved = True
+                    self.underruns += 1
+                    metrics.inc("speaker.underruns")
+                if n == 0:
+                    continue
+                self._take(v, tmp[:n])
+                delta = v.target - v.gain
+                if delta == 0.0:
+                    if v.gain != 1.0:
+                        tmp[:n] *= v.gain
+                else:
+                    # linear ramp towards the target, SPEAKER_FADE_MS for a full swing
+                    g = gains[:n]
+                    np.multiply(self._ramp[:n], self._fade_step if delta > 0 else -self._fade_step, out=g)
+                    g += v.gain
+                    if delta > 0:
+                        np.minimum(g, v.target, out=g)
+                    else:
+                        np.maximum(g, v.target, out=g)
+                    v.gain = float(g[-1])
+                    tmp[:n] *= g
+                mix[:n] += tmp[:n]
+                audible = True
+                if v.name == "reply":
+                    reply_audible = True
+                if v.dropping and (v.gain <= 0.0 or v.queued() == 0):
+                    v.read = v.write
+                    v.dropping = False
+        if audible:
+            mix *= self.volume
+            np.clip(mix, -1.0, 1.0, out=mix)
+        outdata[:, 0] = mix
+        if outdata.shape[1] > 1:
+            outdata[:, 1:] = mix[:, None]
+        if self._loop is None:
+            return
+        if audible:
+            # monotonic time this block reaches the speaker
+            latency = getattr(self._stream, "latency", 0.0) or 0.0
+            if time_info is not None and time_info.outputBufferDacTime > time_info.currentTime > 0:
+                latency = time_info.outputBufferDacTime - time_info.currentTime
+            t_heard = time.monotonic() + latency
+            block_s = frames / self.rate
+            heard = self._heard
+            if heard and t_heard - heard[-1][1] < block_s:
+                heard[-1][1] = max(heard[-1][1], t_heard + block_s)
+            else:
+                heard.append([t_heard, t_heard + block_s])
+            if reply_audible:
+                tracer.mark("first_audio", t_heard)
+                if not self._reply_on:
+                    self._reply_starts.append(t_heard)
+            if self.echo is not None:
+                self._loop.call_soon_threadsafe(self.echo.played, mix.copy(), t_heard)
+            if self.mouth is not None:
+                self.mouth.played(mix, t_heard)  # a few loudness values; no need to wake the loop
+        self._reply_on = reply_audible
+        self._loop.call_soon_threadsafe(self._tick.set)
+
+    async def _watch_lag(self):
+        # how late a short sleep wakes up while audio is playing
+        period = settings.SPEAKER_LAG_PERIOD_MS / 1000.0
+        was_playing = False
+        while True:
+            playing = self.playing
+            if playing and not was_playing:
+                self.lag_max_ms = 0.0
+            was_playing = playing
+            if not playing:
+                self._queued.clear()
+                await self._queued.wait()
+                continue
+            t0 = time.perf_counter()
+            await asyncio.sleep(period)
+            lag = (time.perf_counter() - t0 - period) * 1000.0
+            if lag > self.lag_max_ms:
+                self.lag_max_ms = lag
+                metrics.set("speaker.loop_lag_max_ms", lag)
+            metrics.set("speaker.loop_lag_ms", lag)
+            tracer.observe("speaker.loop_lag_ms", lag)
@@ -0,0 +1,141 @@
+import asyncio
+import time
+from typing import Awaitable
+import numpy as np
+from .config import settings
+from .metrics import metrics
+
+class EchoCanceller:
+    """Subtracts Karen's own playback from the mic signal.
+
+    The Speaker reports every block it mixes via played(); the block goes
+    into a reference ring indexed by CaptureHub sample position, placed where
+    the device timing says it will leave the speaker. process() finds the
+    remaining speaker-to-mic delay by cross-correlating a frame with the
+    reference, fits a gain by least squares and subtracts the delayed, scaled
+    reference in place. That is a single-tap echo path, much cruder than an
+    adaptive AEC, but enough to keep the wake detector from firing on Karen's
+    own voice while still hearing the user over her.
+    """
+    def __init__(self, hub, max_delay_ms: int | None = None):
+        self.hub = hub
+        self.rate = hub.rate
+        self.size = hub.size
+        self.max_delay = int(self.rate * (max_delay_ms or settings.ECHO_MAX_DELAY_MS) / 1000)
+        self.delay: int | None = None   # current speaker-to-mic delay estimate, samples
+        self.erle_db = 0.0              # smoothed echo return loss enhancement
+        self._ref = np.zeros(self.size, dtype=np.float32)
+        self._ref_end = 0               # hub position just after the last reference sample
+        self._play_until = 0.0          # monotonic time the reported output ends
+
+    def played(self, pcm: np.ndarray, t: float):
+        """Record output (same rate as the hub) that starts being heard at monotonic time `t`."""
+        n = len(pcm)
+        if abs(t - self._play_until) < 0.5 * n / self.rate:
+            pos = self._ref_end  # continues the previous block without a gap
+            self._play_until += n / self.rate
+        else:
+            pos = max(self.hub.position_at(t), self._ref_end)
+            self._play_until = t + n / self.rate
+        self._put(self._ref_end, np.zeros(min(pos - self._ref_end, self.size), dtype=np.float32))
+        self._put(pos, pcm)
+        self._ref_end = pos + n
+
+    def stop(self):
+        """Playback was cut off: forget reference audio that will never play."""
+        self._ref_end = min(self._ref_end, self.hub.position)
+        self._play_until = 0.0
+
+    def process(self, frame: np.ndarray, pos: int) -> np.ndarray:
+        """Remove echo from `frame` (mic samples starting at hub position `pos`) in place."""
+        n = len(frame)
+        lo = pos - self.max_delay
+        if lo >= self._ref_end or pos + n <= self._ref_end - self.size:
+            return frame
+        ref = self._window(lo, n + self.max_delay)
+        if float(np.dot(ref, ref)) < 1e-6:
+            return frame
+
+        # xc[j] = sum_k ref[j + k] * frame[k]; reference lag j means delay max_delay - j
+        nfft = 1 << (len(ref) - 1).bit_length()
+        xc = np.fft.irfft(np.fft.rfft(ref, nfft) * np.conj(np.fft.rfft(frame, nfft)), nfft)
+        j = int(np.argmax(xc[:self.max_delay + 1]))
+        seg = ref[j:j + n]
+        e_frame, e_seg, cross = float(np.dot(frame, frame)), float(np.dot(seg, seg)), float(xc[j])
+        if e_seg > 0 and e_frame > 0 and cross * cross > 0.3 * e_frame * e_seg:
+            self.delay = self.max_delay - j   # only trust a clearly coherent peak
+        if self.delay is None:
+            return frame
+
+        seg = ref[self.max_delay - self.delay:][:n]
+        e_seg = float(np.dot(seg, seg))
+        if e_seg <= 0:
+            return frame
+        gain = min(max(float(np.dot(frame, seg)) / e_seg, 0.0), 4.0)
+        frame -= gain * seg
+        e_out = float(np.dot(frame, frame))
+        if e_frame > 0:
+            erle = 10.0 * np.log10(e_frame / max(e_out, 1e-12))
+            self.erle_db = 0.9 * self.erle_db + 0.1 * erle
+            metrics.set("echo.erle_db", self.erle_db)
+        return frame
+
+    def _window(self, start: int, n: int) -> np.ndarray:
+        # reference from `start`; silence where nothing has been played
+        out = np.zeros(n, dtype=np.float32)
+        lo, hi = max(start, self._ref_end - self.size, 0), min(start + n, self._ref_end)
+        for i in range(lo, hi, self.size):
+            m = min(hi, i + self.size) - i
+            s = i % self.size
+            first = min(m, self.size - s)
+            out[i - start:i - start + first] = self._ref[s:s + first]
+            out[i - start + first:i - start + m] = self._ref[:m - first]
+        return out
+
+    def _put(self, pos: int, data: np.ndarray):
+        if len(data) > self.size:
+            pos += len(data) - self.size
+            data = data[-self.size:]
+        s = pos % self.size
+        first = min(len(data), self.size - s)
+        self._ref[s:s + first] = data[:first]
+        self._ref[:len(data) - first] = data[first:]
+
+async def interruptible(turn: Awaitable, wake, spk) -> int | None:
+    """Run `turn` while listening for the wake word.
+
+    If the wake word is heard before the turn finishes, the speaker is
+    silenced and the turn (and with it any LLM/TTS streaming) cancelled from
+    inside the detector, on the frame that completed the wake word, rather
+    than after a few more trips round the event loop. Returns the hub
+    position where the new command starts, or None if the turn ended on its
+    own. Exceptions from the turn propagate.
+    """
+    task = asyncio.ensure_future(turn)
+    barged = False
+
+    def cut_off():
+        nonlocal barged
+        if not task.done():
+            barged = True
+            spk.stop()
+            task.cancel()
+
+    wake.on_trigger = cut_off
+    try:
+        await asyncio.wait({task})
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        wake.on_trigger = None
+    if not barged:
+        task.result()
+        return None
+
+    if not task.cancelled() and task.exception():
+        print(f"[barge-in] Turn failed while being cancelled: {task.exception()!r}")
+    metrics.inc("barge_in.count")
+    metrics.set("barge_in.cancel_ms", (time.monotonic() - wake.trigger_ts) * 1000.0)
+    await wake.wait()  # consume the trigger; it is already set
+    return wake.trigger_pos
@@ -0,0 +1,199 @@
+import asyncio
+import time
+import numpy as np
+from .config import settings
+from .metrics import metrics
+
+class CaptureHub:
+    """Owns the input device for the whole session.
+
+    The device callback writes mono float32 into a preallocated ring buffer
+    and every consumer (wake detector, command recorder, meters) reads from it
+    through its own HubReader. Positions are absolute sample counts since the
+    hub started, so a reader can be opened at a point in the past (pre-roll)
+    as long as it is still inside the ring.
+    """
+    def __init__(self, rate: int | None = None, seconds: float | None = None,
+                 device: int | None = None, stream_factory=None):
+        self.rate = rate or settings.SAMPLE_RATE
+        self.channels = settings.CHANNELS
+        self.device = device
+        self.size = int(self.rate * (seconds or settings.CAPTURE_RING_S))
+        self._ring = np.zeros(self.size, dtype=np.float32)
+        self._written = 0          # total samples written since start
+        self._t_written = 0.0      # monotonic time of the last write
+        self._readers: set[HubReader] = set()
+        self._stream_factory = stream_factory
+        self._stream = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def __aenter__(self):
+        self._loop = asyncio.get_running_loop()
+        factory = self._stream_factory
+        if factory is None:
+            import sounddevice as sd
+            factory = sd.InputStream
+        self._stream = factory(
+            samplerate=self.rate,
+            channels=self.channels,
+            dtype="float32",
+            callback=self._callback,
+            blocksize=0,
+            device=self.device,
+        )
+        # anchor time_at()/position_at() before the first block arrives
+        self._t_written = time.monotonic()
+        self._stream.start()
+        return self
+
+    async def __aexit__(self, *a):
+        if self._stream:
+            try:
+                self._stream.stop()
+                self._stream.close()
+            finally:
+                self._stream = None
+
+    @property
+    def position(self) -> int:
+        """Absolute sample position of the next sample to be captured."""
+        return self._written
+
+    def time_at(self, pos: int) -> float:
+        """Monotonic timestamp of sample `pos` (estimated from the last write)."""
+        return self._t_written - (self._written - pos) / self.rate
+
+    def position_at(self, t: float) -> int:
+        return self._written - int(round((self._t_written - t) * self.rate))
+
+    def history(self, start: int, n: int) -> np.ndarray:
+        """Copy of up to n past samples from `start`, clamped to what is still in the ring."""
+        start = max(start, self._written - self.size, 0)
+        out = np.empty(max(0, min(n, self._written - start)), dtype=np.float32)
+        self._copy(start, out)
+        return out
+
+    def reader(self, start: int | None = None, preroll_s: float = 0.0, name: str = "reader") -> "HubReader":
+        """Open a reader at `start` (default: now), moved back by `preroll_s`."""
+        pos = self._written if start is None else start
+        pos -= int(preroll_s * self.rate)
+        pos = max(pos, self._written - self.size, 0)
+        r = HubReader(self, pos, name)
+        self._readers.add(r)
+        return r
+
+    def _callback(self, indata, frames, time_info, status):
+        if status:
+            metrics.inc("capture.status_flags")
+        mono = indata[:, 0] if indata.ndim > 1 else indata
+        n = len(mono)
+        start = self._written % self.size
+        first = min(n, self.size - start)
+        self._ring[start:start + first] = mono[:first]
+        if first < n:
+            self._ring[:n - first] = mono[first:]
+        self._t_written = time.monotonic()
+        self._written += n
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._notify)
+
+    def _notify(self):
+        for r in self._readers:
+            r._event.set()
+
+    def _copy(self, pos: int, out: np.ndarray) -> int:
+        """Copy samples from `pos` into `out`; returns how many were copied."""
+        n = min(len(out), self._written - pos)
+        start = pos % self.size
+        first = min(n, self.size - start)
+        out[:first] = self._ring[start:start + first]
+        if first < n:
+            out[first:n] = self._ring[:n - first]
+        return n
+
+class HubReader:
+    """An independent read cursor into a CaptureHub.
+    `dropped` counts samples skipped because the reader fell a full ring behind.
+    """
+    def __init__(self, hub: CaptureHub, pos: int, name: str = "reader"):
+        self.hub = hub
+        self.pos = pos
+        self.name = name
+        self.dropped = 0
+        self._event = asyncio.Event()
+
+    def available(self) -> int:
+        return self.hub._written - self.pos
+
+    async def wait(self):
+        """Wait until at least one new sample is available."""
+        while self.available() <= 0:
+            self._event.clear()
+            if self.available() > 0:
+                break
+            await self._event.wait()
+        self._skip_overrun()
+
+    async def read(self, max_samples: int | None = None) -> np.ndarray:
+        """Return the next available samples (a new array)."""
+        await self.wait()
+        n = self.available()
+        if max_samples is not None:
+            n = min(n, max_samples)
+        out = np.empty(n, dtype=np.float32)
+        self.pos += self.hub._copy(self.pos, out)
+        return out
+
+    async def read_into(self, out: np.ndarray) -> int:
+        """Copy up to len(out) new samples into `out` without allocating."""
+        await self.wait()
+        n = self.hub._copy(self.pos, out)
+        self.pos += n
+        return n
+
+    def close(self):
+        self.hub._readers.discard(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a):
+        self.close()
+
+    def _skip_overrun(self):
+        # the writer lapped us; jump to the oldest sample still in the ring
+        oldest = self.hub._written - self.hub.size
+        if self.pos < oldest:
+            self.dropped += oldest - self.pos
+            metrics.inc(f"capture.{self.name}.dropped_samples", oldest - self.pos)
+            self.pos = oldest
+
+class FrameAssembler:
+    """Cuts a reader's stream into fixed-size int16 frames without allocating.
+
+    Samples are copied straight from the hub ring into a preallocated float32
+    frame, then clipped/scaled in place and cast into a reused int16 buffer.
+    next_frame() returns a view of that buffer, valid until the next call.
+    `process(frame, pos)`, if given, may modify the float32 frame in place
+    (e.g. echo cancellation) before conversion; `pos` is its hub position.
+    """
+    def __init__(self, frame_samples: int, process=None):
+        self.frame_samples = frame_samples
+        self.process = process
+        self._f32 = np.zeros(frame_samples, dtype=np.float32)
+        self._i16 = np.zeros(frame_samples, dtype=np.int16)
+        self._fill = 0
+
+    async def next_frame(self, reader: HubReader) -> np.ndarray:
+        while self._fill < self.frame_samples:
+            self._fill += await reader.read_into(self._f32[self._fill:])
+        self._fill = 0
+        if self.process is not None:
+            self.process(self._f32, reader.pos - self.frame_samples)
+        return self.to_i16(self._f32)
+
+    def to_i16(self, frame: np.ndarray) -> np.ndarray:
+        np.clip(frame, -1.0, 1.0, out=frame)
+        np.multiply(frame, 32767.0, out=frame)
+        np.copyto(self._i16, frame, casting="unsafe")
+        return self._i16
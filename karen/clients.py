@@ -0,0 +1,117 @@
+import asyncio
+import time
+import httpx
+import openai
+from .config import settings
+from .metrics import metrics
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HAS_HTTP2 = True
+except Exception:
+    HAS_HTTP2 = False
+
+class ClientPool:
+    """One AsyncOpenAI client, and so one connection pool, shared by STT, LLM and TTS.
+
+    Providers acquire() it in __aenter__ and release() it in __aexit__; the
+    pool is closed when the last one lets go. warm() opens connections ahead
+    of need (called right after the wake word), and a background task re-warms
+    them when they have been idle for HTTP_KEEPALIVE_S so the next turn
+    doesn't pay for TCP + TLS setup.
+    """
+    def __init__(self):
+        self._client: openai.AsyncOpenAI | None = None
+        self._http: httpx.AsyncClient | None = None
+        self._users = 0
+        self._last_used = 0.0
+        self._keepalive: asyncio.Task | None = None
+        self._warming: asyncio.Task | None = None
+
+    def acquire(self) -> openai.AsyncOpenAI:
+        if not settings.OPENAI_API_KEY:
+            raise ValueError("OPENAI_API_KEY is not set in environment")
+        if self._client is None:
+            self._http = openai.DefaultAsyncHttpxClient(
+                http2=settings.HTTP2 and HAS_HTTP2,
+                limits=httpx.Limits(
+                    max_connections=settings.HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.HTTP_MAX_CONNECTIONS,
+                    keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_S,
+                ),
+                event_hooks={"request": [self._on_request]},
+            )
+            self._client = openai.AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=settings.OPENAI_BASE_URL,
+                http_client=self._http,
+            )
+            self._keepalive = asyncio.create_task(self._keepalive_loop())
+        self._users += 1
+        return self._client
+
+    async def release(self):
+        self._users -= 1
+        if self._users > 0 or self._client is None:
+            return
+        for task in (self._keepalive, self._warming):
+            if task:
+                task.cancel()
+        self._keepalive = self._warming = None
+        await self._client.close()
+        self._client = self._http = None
+
+    def warm(self):
+        """Open connections in the background; a no-op if already warming."""
+        if self._http is None or (self._warming and not self._warming.done()):
+            return
+        self._warming = asyncio.create_task(self._warm())
+
+    def stats(self) -> dict[str, float]:
+        requests = metrics.get("http.requests")
+        connections = metrics.get("http.connections")
+        return {
+            "requests": requests,
+            "connections": connections,
+            "tls_handshakes": metrics.get("http.tls_handshakes"),
+            "reused": max(0.0, requests - connections),
+        }
+
+    @property
+    def idle_s(self) -> float:
+        return time.monotonic() - self._last_used if self._last_used else float("inf")
+
+    async def _warm(self):
+        # a cheap request per connection we expect to need; any HTTP status
+        # will do, we only want the sockets and TLS sessions in the pool
+        url = str(self._client.base_url).rstrip("/") + "/models"
+        n = 1 if settings.HTTP2 and HAS_HTTP2 else settings.HTTP_WARM_CONNECTIONS
+        metrics.inc("http.warmups")
+        results = await asyncio.gather(
+            *(self._http.head(url, headers={"Authorization": f"Bearer {settings.OPENAI_API_KEY}"})
+              for _ in range(n)),
+            return_exceptions=True,
+        )
+        for r in results:
+            if isinstance(r, Exception):
+                print(f"[http] Warm-up failed: {r!r}")
+
+    async def _keepalive_loop(self):
+        while True:
+            await asyncio.sleep(settings.HTTP_KEEPALIVE_S / 2)
+            if self._last_used and self.idle_s >= settings.HTTP_KEEPALIVE_S:
+                self.warm()
+
+    async def _on_request(self, request: httpx.Request):
+        self._last_used = time.monotonic()
+        metrics.inc("http.requests")
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event: str, info: dict):
+        # httpcore connection events tell us when a request could not reuse a socket
+        if event == "connection.connect_tcp.complete":
+            metrics.inc("http.connections")
+        elif event == "connection.start_tls.complete":
+            metrics.inc("http.tls_handshakes")
+
+clients = ClientPool()
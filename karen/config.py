@@ -11,19 +11,77 @@ class Settings(BaseSettings):
 
     # API keys
     OPENAI_API_KEY: str | None = None
+    OPENAI_BASE_URL: str | None = None   # override for proxies or local stand-ins
     DEEPGRAM_API_KEY: str | None = None
     AZURE_SPEECH_KEY: str | None = None
     AZURE_SPEECH_REGION: str | None = None
     ELEVENLABS_API_KEY: str | None = None
 
+    # Shared HTTP connection pool (see clients.py)
+    HTTP2: bool = True                # used when the h2 package is installed
+    HTTP_MAX_CONNECTIONS: int = 8
+    HTTP_KEEPALIVE_EXPIRY_S: float = 120.0
+    HTTP_KEEPALIVE_S: float = 45.0    # re-warm connections idle this long
+    HTTP_WARM_CONNECTIONS: int = 2    # HTTP/1.1 sockets opened by a warm-up
+
+    # STT
+    STT_MODEL: str = "gpt-4o-mini-transcribe"
+    STT_STREAMING: bool = True        # stream audio while the user talks; batch upload is the fallback
+    STT_STREAM_URL: str = "wss://api.openai.com/v1/realtime?intent=transcription"
+    STT_FINAL_TIMEOUT_S: float = 1.5  # wait for the final transcript after endpointing
+    STT_COMMIT_MS: int = 1000         # streaming: commit a segment this often, for partial transcripts
+    STT_UPLOAD_FORMAT: str = "flac"   # batch upload: "wav" | "flac" | "ogg" | "opus"
+    STT_UPLOAD_RATE: int = 16000      # resample uploads to this rate (0 keeps the capture rate)
+    STT_TRIM_PAD_MS: int = 150        # context kept around trimmed speech
+
+    # TTS
+    TTS_MODEL: str = "gpt-4o-mini-tts"
+    TTS_VOICE: str = "sage"
+    TTS_CACHE_DIR: str = "tts_cache"  # phrase cache for fillers etc.; "" disables
+    TTS_CACHE_MAX_MB: float = 64.0
+
     # Audio
     SAMPLE_RATE: int = 16000
     CHANNELS: int = 1
+    VOLUME: float = 0.8               # playback gain; "volume up/down" steps it by 0.1
+    CAPTURE_RING_S: float = 20.0      # capture history kept for pre-roll and slow readers
+    MAX_SEC: int = 12                 # longest command recording
+    SPEAKER_BLOCK: int = 320          # output callback size in samples (20 ms at 16 kHz)
+    SPEAKER_BUFFER_S: float = 2.0     # queue per mixer voice
+    SPEAKER_DUCK_DB: float = -12.0    # fillers/earcons under the reply
+    SPEAKER_FADE_MS: float = 30.0     # fade-in under other audio, and flush() fade-out
+    SPEAKER_LAG_PERIOD_MS: float = 5.0  # event-loop lag probe interval during playback
+
+    # End-of-speech detection (see endpoint.py)
+    ENDPOINT_FRAME_MS: int = 20
+    ENDPOINT_START_DB: float = 9.0    # above noise floor to count as speech
+    ENDPOINT_STOP_DB: float = 5.0     # below this (above floor) counts as quiet
+    ENDPOINT_MIN_DB: float = -55.0    # speech must also be at least this loud (dBFS)
+    ENDPOINT_FLOOR_DB: float = -60.0  # initial noise floor if nothing to prime from
+    ENDPOINT_FLOOR_RISE: float = 0.005
+    ENDPOINT_HANGOVER_MS: int = 600   # quiet needed after speech to end the turn
+    ENDPOINT_MIN_SPEECH_MS: int = 120
+    ENDPOINT_NO_SPEECH_S: float = 4.0 # give up if nobody starts talking
+
+    # Network monitor
+    NET_PROBE_HOST: str = "1.1.1.1"
+    NET_PROBE_PORT: int = 53
+    NET_PROBE_TIMEOUT_S: float = 0.6
+    NET_PROBE_INTERVAL_S: float = 15.0  # while up, probe if no API call succeeded for this long
+    NET_BACKOFF_MIN_S: float = 0.5      # while down, retry after this, doubling...
+    NET_BACKOFF_MAX_S: float = 30.0     # ...up to this
 
     # Wake word
     WAKE_THRESHOLD: float = 0.5
     WAKE_TRIGGER_LEVEL: int = 3
     WAKE_COOLDOWN_S: float = 2.0
+    WAKE_WORKER: bool = True          # score frames on a dedicated thread, off the event loop
+    WAKE_CPUS: list[int] = []         # pin that thread to these cores (empty: any core)
+    WAKE_THREADS: int = 1             # openWakeWord feature-extraction threads
+    WAKE_MAX_BATCH: int = 4           # frames scored per call once the worker falls behind
+    WAKE_MAX_BACKLOG: int = 25        # queued frames (2 s) before the oldest are dropped
+    BARGE_IN: bool = True             # keep listening for the wake word while Karen talks
+    ECHO_MAX_DELAY_MS: int = 250      # longest speaker-to-mic delay the echo canceller looks for
 
     # Filler speech
     FILLERS: list[str] = [
@@ -33,8 +91,66 @@ class Settings(BaseSettings):
         "hold on…",
         "one moment…",
     ]
-    FILLER_MIN_S: float = 2.5
-    FILLER_MAX_S: float = 4.0
+    FILLER_DELAY_S: float = 1.0       # quiet after the user stops before any filler
+    FILLER_PAUSE_S: float = 0.6       # and between fillers
+    FILLER_MARGIN_S: float = 0.3      # a filler and its pause must fit this far inside the predicted gap
+    FILLER_RECHECK_S: float = 0.2     # re-predict this often while no filler fits
+    FILLER_QUANTILE: float = 0.2      # prediction: this quantile of what slower past turns had left
+    FILLER_PRIOR_S: float = 2.5       # assumed wait until a kind of turn has been timed
+    FILLER_MIN_SAMPLES: int = 3       # slower past turns needed before a prediction is trusted
+    FILLER_WINDOW: int = 50           # past turns kept per kind (LLM, response cache)
+
+    # Conversation memory (see memory.py)
+    MEMORY_TOKEN_BUDGET: int = 1200   # verbatim recent turns
+    MEMORY_FOLD_TO: float = 0.5       # fraction of the budget kept after summarizing
+    MEMORY_SUMMARY_TOKENS: int = 160
+
+    # Response cache for repeated questions (see response_cache.py)
+    RESPONSE_CACHE_TTL_S: float = 6 * 3600.0
+    RESPONSE_CACHE_MAX_ENTRIES: int = 256
+    RESPONSE_CACHE_PATH: str = "response_cache.json"   # "" keeps it in memory only
+    RESPONSE_CACHE_MIN_WORDS: int = 2 # words beyond articles and auxiliaries a question needs to be cached
+
+    # Local intents (see intents.py)
+    INTENT_MIN_COVERAGE: float = 0.6  # share of the utterance a pattern must cover
+
+    # Streaming reply: LLM sentences are queued for TTS as they complete
+    SPEECH_MIN_CHARS: int = 12        # hold back shorter fragments
+    SPEECH_CLAUSE_CHARS: int = 60     # cut at a comma once a sentence gets this long
+    SPEECH_QUEUE_MAX: int = 4         # sentences buffered ahead of TTS
+
+    # Latency tracing (see metrics.Tracer)
+    TRACE: bool = False               # per-stage turn timings, loop lag, p50/p95/p99
+    TRACE_WINDOW: int = 500           # observations kept per histogram
+    TRACE_PROM_PATH: str = ""         # Prometheus textfile, e.g. /var/lib/node_exporter/karen.prom
+    TRACE_JSONL_PATH: str = ""        # one JSON line per turn plus periodic snapshots
+    TRACE_EXPORT_S: float = 10.0
+    TRACE_OVERLAY: bool = False       # show the histograms over the Qt window
+
+    # Qt window (see qt_ui.py)
+    UI_FPS: float = 30.0              # updates are batched into at most one repaint per frame
+    UI_TRANSCRIPT_LINES: int = 500    # transcript ring buffer; older lines are dropped
+    UI_MOUTH_FRAMES: int = 8          # mouth sprites pre-decoded from the GIF, closed to open
+
+    # Lip-sync: the mouth follows the audio being played (see lipsync.py)
+    LIPSYNC_FPS: float = 20.0         # mouth frames per second, at most UI_FPS
+    LIPSYNC_HOP_MS: float = 10.0      # loudness is measured per hop
+    LIPSYNC_FLOOR_DB: float = -40.0   # dBFS at or below which the mouth is closed
+    LIPSYNC_OPEN_DB: float = -12.0    # dBFS at or above which it is wide open
+
+    # Offline stub providers (see stubs.py); latencies are medians
+    STUB_SEED: int = 0
+    STUB_JITTER: float = 0.25         # lognormal sigma applied to every stub latency
+    STUB_FAILURE_RATE: float = 0.0    # chance that any one stub request fails
+    STUB_STT_MS: float = 350.0        # batch transcription
+    STUB_STT_MS_PER_S: float = 20.0   # plus upload time per second of audio
+    STUB_STT_FINAL_MS: float = 150.0  # streaming: final transcript after the commit
+    STUB_LLM_FIRST_TOKEN_MS: float = 450.0
+    STUB_LLM_TOKEN_MS: float = 25.0
+    STUB_TTS_FIRST_BYTE_MS: float = 250.0
+    STUB_TTS_SPEED: float = 6.0       # synthesis speed, multiples of real time
+    STUB_TRANSCRIPT: str = "what's the plan for today"
+    STUB_REPLY: str = "Uhh, {text}? Wow. Fine, the answer is forty two, mmkay?"  # {text}: the question
 
     class Config:
         env_file = "karen.env"
@@ -0,0 +1,112 @@
+import numpy as np
+from .config import settings
+
+def frame_energy_db(frames: np.ndarray) -> np.ndarray:
+    """Mean power per row of a (n_frames, frame_len) array, in dBFS."""
+    power = np.einsum("ij,ij->i", frames, frames) / frames.shape[1]
+    return 10.0 * np.log10(power + 1e-10)
+
+class Endpointer:
+    """Streaming end-of-speech detector on fixed frames.
+
+    Audio can be pushed in blocks of any size; it is cut into
+    ENDPOINT_FRAME_MS frames whose energy is compared with an adaptive noise
+    floor. Speech starts once frames stay `start_db` above the floor for
+    `min_speech_ms`, and ends after `hangover_ms` of frames below the lower
+    `stop_db` threshold (hysteresis). `onset` and `end` are sample offsets
+    from the first pushed sample.
+    """
+    def __init__(self, rate: int, frame_ms: int | None = None, start_db: float | None = None,
+                 stop_db: float | None = None, hangover_ms: int | None = None,
+                 min_speech_ms: int | None = None, min_db: float | None = None,
+                 floor_db: float | None = None):
+        frame_ms = frame_ms or settings.ENDPOINT_FRAME_MS
+        self.frame = int(rate * frame_ms / 1000)
+        self.start_db = start_db if start_db is not None else settings.ENDPOINT_START_DB
+        self.stop_db = stop_db if stop_db is not None else settings.ENDPOINT_STOP_DB
+        self.min_db = min_db if min_db is not None else settings.ENDPOINT_MIN_DB
+        self.floor_db = floor_db if floor_db is not None else settings.ENDPOINT_FLOOR_DB
+        hangover_ms = hangover_ms if hangover_ms is not None else settings.ENDPOINT_HANGOVER_MS
+        min_speech_ms = min_speech_ms if min_speech_ms is not None else settings.ENDPOINT_MIN_SPEECH_MS
+        self._hang_frames = max(1, -(-hangover_ms // frame_ms))
+        self._min_frames = max(1, -(-min_speech_ms // frame_ms))
+        self._tail = np.zeros(self.frame, dtype=np.float32)
+        self._tail_n = 0
+        self.frames_seen = 0
+        self.onset: int | None = None
+        self.end: int | None = None
+        self._run = 0      # speech frames before onset / quiet frames after it
+        self._cand = 0     # first frame of the current speech candidate
+
+    @property
+    def in_speech(self) -> bool:
+        return self.onset is not None and self.end is None
+
+    @property
+    def done(self) -> bool:
+        return self.end is not None
+
+    def prime(self, audio: np.ndarray):
+        """Seed the noise floor from audio known to be mostly background."""
+        n = len(audio) // self.frame
+        if n:
+            db = frame_energy_db(audio[:n * self.frame].reshape(n, self.frame))
+            self.floor_db = float(np.percentile(db, 20))
+
+    def push(self, samples: np.ndarray) -> bool:
+        """Feed audio; returns True once end of speech has been found."""
+        if self.done:
+            return True
+        x = samples
+        if self._tail_n:
+            k = min(self.frame - self._tail_n, len(x))
+            self._tail[self._tail_n:self._tail_n + k] = x[:k]
+            self._tail_n += k
+            x = x[k:]
+            if self._tail_n < self.frame:
+                return False
+            self._tail_n = 0
+            if self._step(float(frame_energy_db(self._tail[None, :])[0])):
+                return True
+        n = len(x) // self.frame
+        if n:
+            for db in frame_energy_db(x[:n * self.frame].reshape(n, self.frame)).tolist():
+                if self._step(db):
+                    return True
+        rest = len(x) - n * self.frame
+        if rest:
+            self._tail[:rest] = x[n * self.frame:]
+            self._tail_n = rest
+        return self.done
+
+    def _step(self, db: float) -> bool:
+        i = self.frames_seen
+        self.frames_seen += 1
+        start_th = max(self.floor_db + self.start_db, self.min_db)
+        stop_th = max(self.floor_db + self.stop_db, self.min_db - (self.start_db - self.stop_db))
+        if self.onset is None:
+            if db >= start_th:
+                if self._run == 0:
+                    self._cand = i
+                self._run += 1
+                if self._run >= self._min_frames:
+                    self.onset = self._cand * self.frame
+                    self._run = 0
+            elif db < stop_th:
+                self._run = 0
+        else:
+            if db < stop_th:
+                self._run += 1
+                if self._run >= self._hang_frames:
+                    self.end = (i - self._run + 1) * self.frame
+                    return True
+            else:
+                self._run = 0
+        # the floor drops quickly to quieter frames and creeps up slowly, so
+        # steady noise is absorbed within seconds but speech bursts are not
+        if db < self.floor_db:
+            self.floor_db += 0.5 * (db - self.floor_db)
+        else:
+            rise = settings.ENDPOINT_FLOOR_RISE
+            self.floor_db += (rise * 0.1 if self.in_speech else rise) * (db - self.floor_db)
+        return False
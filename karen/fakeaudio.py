@@ -0,0 +1,288 @@
+# Stand-ins for sounddevice streams so the audio pipeline can run from WAV
+# files on a machine with no sound card.
+from __future__ import annotations
+import threading, time, types, wave
+import numpy as np
+from .resample import Resampler
+
+def read_wav(path: str) -> tuple[np.ndarray, int]:
+    """Read a 16-bit PCM WAV as mono float32 in [-1, 1]."""
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV is supported")
+        rate = wf.getframerate()
+        ch = wf.getnchannels()
+        data = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    audio = data.reshape(-1, ch).mean(axis=1) if ch > 1 else data
+    return audio.astype(np.float32) / 32768.0, rate
+
+def write_wav(path: str, audio: np.ndarray, rate: int):
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767.0).astype(np.int16)
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1); wf.setsampwidth(2); wf.setframerate(rate)
+        wf.writeframes(pcm.tobytes())
+
+class FakeInputStream:
+    """Replays WAV files (or arrays) through an sd.InputStream-style callback.
+
+    Audio is delivered in `block`-sample chunks from a background thread,
+    paced in real time unless `speed` is 0 (as fast as possible). After the
+    sources run out it keeps delivering silence, like a mic in a quiet room,
+    unless `loop` is set. Use functools.partial to pass it as a stream factory.
+    `mixer(pos, block)`, if given, may add to each mono block in place;
+    `pos` is the number of samples delivered before it.
+    """
+    def __init__(self, sources=(), samplerate: int = 16000, channels: int = 1,
+                 dtype: str = "float32", callback=None, blocksize: int = 0,
+                 device=None, block: int = 320, speed: float = 1.0, loop: bool = False,
+                 mixer=None):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.callback = callback
+        self.block = blocksize or block
+        self.speed = speed
+        self.loop = loop
+        self.mixer = mixer
+        self.delivered = 0
+        self._audio = self._load(sources, samplerate)
+        self._pos = 0
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self.done = threading.Event()  # set once every source has been played
+
+    @staticmethod
+    def _load(sources, rate: int) -> np.ndarray:
+        parts = []
+        for src in sources:
+            if isinstance(src, str):
+                audio, src_rate = read_wav(src)
+                if src_rate != rate:
+                    rs = Resampler(src_rate, rate)
+                    audio = np.concatenate([rs.process(audio), rs.flush()])
+            else:
+                audio = np.asarray(src, dtype=np.float32)
+            parts.append(audio)
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def close(self):
+        self.stop()
+
+    def next_block(self) -> np.ndarray:
+        n = self.block
+        out = np.zeros((n, self.channels), dtype=np.float32)
+        got = min(n, len(self._audio) - self._pos)
+        if got > 0:
+            out[:got, 0] = self._audio[self._pos:self._pos + got]
+            self._pos += got
+        if self._pos >= len(self._audio):
+            if self.loop and len(self._audio):
+                self._pos = 0
+            else:
+                self.done.set()
+        if self.mixer is not None:
+            self.mixer(self.delivered, out[:, 0])
+        self.delivered += n
+        return out
+
+    def _run(self):
+        period = self.block / self.samplerate / self.speed if self.speed else 0.0
+        t_next = time.perf_counter()
+        while not self._stop.is_set():
+            self.callback(self.next_block(), self.block, None, None)
+            if period:
+                t_next += period
+                delay = t_next - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                time.sleep(0)
+
+class FakeOutputStream:
+    """An sd.OutputStream stand-in with no sound card behind it.
+
+    With a `callback`, a background thread asks it for `blocksize` samples at
+    a time, paced in real time, like a PortAudio callback stream. Without
+    one, write() queues into a device buffer of `latency` seconds that drains
+    in real time and blocks while it is full. Either way each sample is heard
+    `latency` after it leaves the buffer: `on_play(data, t)` gets every mono
+    block with the monotonic time it starts to be heard, and `on_abort(t)` is
+    called when queued audio is dropped.
+    """
+    def __init__(self, samplerate: int = 16000, channels: int = 1, dtype: str = "float32",
+                 callback=None, blocksize: int = 0, device=None, latency: float = 0.05,
+                 on_play=None, on_abort=None):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.callback = callback
+        self.blocksize = blocksize or 320
+        self.latency = latency
+        self.on_play = on_play
+        self.on_abort = on_abort
+        self.active = False
+        self.written = 0
+        self._until = 0.0  # monotonic time the device buffer runs dry (write mode)
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def start(self):
+        self.active = True
+        if self.callback is not None and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self.callback is None:
+            # like sounddevice, stop() lets queued audio finish
+            delay = self._until + self.latency - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        self._halt()
+
+    def abort(self):
+        now = time.monotonic()
+        queued = self.callback is not None or self._until + self.latency > now
+        self._halt()
+        if queued and self.on_abort:
+            self.on_abort(now)
+        self._until = 0.0
+
+    def close(self):
+        self._halt()
+
+    def write(self, data):
+        data = np.asarray(data, dtype=np.float32)
+        mono = data[:, 0] if data.ndim > 1 else data
+        start = max(time.monotonic(), self._until)
+        self._until = start + len(mono) / self.samplerate
+        self.written += len(mono)
+        if self.on_play:
+            self.on_play(mono, start + self.latency)
+        delay = self._until - self.latency - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _halt(self):
+        self.active = False
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        n = self.blocksize
+        period = n / self.samplerate
+        out = np.zeros((n, self.channels), dtype=np.float32)
+        t_next = time.monotonic()
+        while not self._stop.is_set():
+            out.fill(0.0)
+            # PortAudio-style timing: when this block will reach the speaker
+            info = types.SimpleNamespace(currentTime=t_next, outputBufferDacTime=t_next + self.latency)
+            self.callback(out, n, info, None)
+            self.written += n
+            if self.on_play:
+                self.on_play(out[:, 0].copy(), t_next + self.latency)
+            t_next += period
+            delay = t_next - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+class FakeDuplex:
+    """A fake sound card whose speaker leaks into its mic.
+
+    Pass `input_stream` to CaptureHub and `output_stream` to Speaker as
+    stream factories. Everything written to the output comes back on the
+    input `echo_delay_ms` after it plays, scaled by `echo_gain` and mixed
+    with the scripted `sources` (the user). Aborted output stops leaking at
+    once, as it would from a real speaker. say() queues more of the user's
+    voice while running, for scripts that react to what Karen does.
+    """
+    def __init__(self, sources=(), samplerate: int = 16000, echo_gain: float = 0.5,
+                 echo_delay_ms: float = 40.0, latency: float = 0.05, seconds: float = 30.0):
+        self.sources = sources
+        self.samplerate = samplerate
+        self.echo_gain = echo_gain
+        self.echo_delay = int(samplerate * echo_delay_ms / 1000)
+        self.latency = latency
+        self.input: FakeInputStream | None = None
+        self.output: FakeOutputStream | None = None
+        self._echo = np.zeros(int(samplerate * seconds), dtype=np.float32)
+        self._echo_end = 0
+        self._leak_until = 0.0  # play time the last leaked chunk ends
+        self._said: list[np.ndarray] = []
+        self._said_pos = 0      # samples of _said[0] already heard
+        self._lock = threading.Lock()
+
+    def input_stream(self, **kw) -> FakeInputStream:
+        self.input = FakeInputStream(self.sources, mixer=self._mix, **kw)
+        return self.input
+
+    def output_stream(self, **kw) -> FakeOutputStream:
+        kw.setdefault("latency", self.latency)
+        self.output = FakeOutputStream(on_play=self._leak, on_abort=self._silence, **kw)
+        return self.output
+
+    def say(self, audio: np.ndarray):
+        """Queue user audio; the mic hears it from the next input block, after anything still queued."""
+        with self._lock:
+            self._said.append(np.asarray(audio, dtype=np.float32))
+
+    @property
+    def talking(self) -> bool:
+        """True until everything passed to say() has been heard."""
+        return bool(self._said)
+
+    def input_index(self, t: float) -> int:
+        """Input sample index that is being captured at monotonic time `t`."""
+        return self.input.delivered + int((t - time.monotonic()) * self.samplerate)
+
+    def _leak(self, data: np.ndarray, t: float):
+        if self.input is None:
+            return
+        size = len(self._echo)
+        with self._lock:
+            if abs(t - self._leak_until) < 1e-6:
+                pos = self._echo_end  # back-to-back playback stays sample-contiguous
+            else:
+                pos = max(self.input_index(t) + self.echo_delay, self.input.delivered)
+            self._leak_until = t + len(data) / self.samplerate
+            idx = (pos + np.arange(len(data))) % size
+            self._echo[idx] += data * self.echo_gain
+            self._echo_end = max(self._echo_end, pos + len(data))
+
+    def _silence(self, t: float):
+        if self.input is None:
+            return
+        with self._lock:
+            pos = max(self.input_index(t) + self.echo_delay, self.input.delivered)
+            if self._echo_end > pos:
+                self._echo[(pos + np.arange(self._echo_end - pos)) % len(self._echo)] = 0.0
+                self._echo_end = pos
+            self._leak_until = 0.0
+
+    def _mix(self, pos: int, block: np.ndarray):
+        idx = (pos + np.arange(len(block))) % len(self._echo)
+        with self._lock:
+            block += self._echo[idx]
+            self._echo[idx] = 0.0
+            off = 0
+            while self._said and off < len(block):
+                head = self._said[0]
+                n = min(len(head) - self._said_pos, len(block) - off)
+                block[off:off + n] += head[self._said_pos:self._said_pos + n]
+                off += n
+                self._said_pos += n
+                if self._said_pos == len(head):
+                    self._said.pop(0)
+                    self._said_pos = 0
@@ -1,23 +1,90 @@
-import asyncio, random
+import asyncio, random, time
+from collections import deque
+import numpy as np
 from .config import settings
+from .metrics import metrics
+
+_S_PER_CHAR = 0.08  # rough speaking time for a phrase not in the phrase cache yet
+
+class ReplyWaits:
+    """Rolling record of how long replies took to be ready, per kind of turn
+    ("llm", or "cached" for the response cache).
+
+    A wait runs from the end of the user's speech to the first chunk of reply
+    audio. remaining() predicts what is left of the current one: of the last
+    FILLER_WINDOW turns of that kind that took longer than `elapsed`, the
+    FILLER_QUANTILE of how much longer they took. The quantile is low, so a
+    filler only starts if even a quick reply would leave room for it, and
+    with fewer than FILLER_MIN_SAMPLES such turns the missing ones count as
+    replies due now: one slow turn on record is no evidence. Until a kind
+    has been timed, FILLER_PRIOR_S stands in.
+    """
+    def __init__(self, window: int | None = None):
+        self.window = window or settings.FILLER_WINDOW
+        self._waits: dict[str, deque[float]] = {}
+
+    def observe(self, kind: str, seconds: float):
+        waits = self._waits.get(kind)
+        if waits is None:
+            waits = self._waits[kind] = deque(maxlen=self.window)
+        waits.append(seconds)
+
+    def remaining(self, kind: str, elapsed: float) -> float:
+        """Predicted seconds until the reply is ready, `elapsed` seconds in."""
+        waits = self._waits.get(kind)
+        if not waits:
+            return max(0.0, settings.FILLER_PRIOR_S - elapsed)
+        longer = [w - elapsed for w in waits if w > elapsed]
+        if not longer:
+            # slower than any turn on record: expect at least a quick turn's wait more
+            return float(np.quantile(waits, settings.FILLER_QUANTILE))
+        longer += [0.0] * (settings.FILLER_MIN_SAMPLES - len(longer))
+        return float(np.quantile(longer, settings.FILLER_QUANTILE))
+
+waits = ReplyWaits()
 
 class Filler:
-    """Speaks short interjections while in thinking state to mask latency."""
-    def __init__(self, ui, tts, spk):
+    """Speaks short interjections while in thinking state to mask latency.
+
+    `since` is when the user stopped talking. From FILLER_DELAY_S after that,
+    and FILLER_PAUSE_S after each filler, the predicted gap from `waits` is
+    checked: a filler starts only if the phrase, the pause after it and
+    FILLER_MARGIN_S all fit before the reply is due, and it is the longest
+    phrase that does. So a second filler in a turn needs a fresh prediction
+    that it fits too, and one that would run into the reply is never begun.
+    stop(ready=True) is called the moment the first reply audio is ready: it
+    records the wait and fades out whatever filler is playing, from the next
+    device block.
+    """
+    def __init__(self, ui, tts, spk, since: float | None = None, kind: str = "llm"):
         self.ui = ui
         self.tts = tts
         self.spk = spk
+        self.since = since
+        self.kind = kind
         self._task = None
         self._running = False
+        self._speaking = False
+        self._last: str | None = None
 
     async def start(self):
         if self._running:
             return
         self._running = True
+        if self.since is None:
+            self.since = time.monotonic()
         self._task = asyncio.create_task(self._loop())
 
-    async def stop(self):
+    async def stop(self, ready: bool = False):
+        """Stop filling; with ready=True the reply is ready, and the wait is recorded."""
+        if ready and self._running:
+            waits.observe(self.kind, time.monotonic() - self.since)
+            if self._speaking:
+                metrics.inc("filler.cut")
         self._running = False
+        # fade out rather than cut off mid-word; the reply crossfades in over it.
+        # Before awaiting the task, so the fade starts with the next block
+        await self.spk.flush("filler", wait=False)
         if self._task:
             self._task.cancel()
             try:
@@ -26,15 +93,37 @@ class Filler:
                 pass
             self._task = None
 
+    def _seconds(self, phrase: str) -> float:
+        seconds = self.tts.cached_seconds(phrase)
+        return seconds if seconds is not None else len(phrase) * _S_PER_CHAR
+
+    def _pick(self, gap: float) -> str | None:
+        """The longest filler that fits in `gap` seconds, not the one just spoken."""
+        room = gap - settings.FILLER_PAUSE_S - settings.FILLER_MARGIN_S
+        fits = [(self._seconds(p), random.random(), p) for p in settings.FILLERS if p != self._last]
+        fits = [f for f in fits if f[0] <= room]
+        return max(fits)[2] if fits else None
+
     async def _loop(self):
+        wake = self.since + settings.FILLER_DELAY_S
         while self._running:
-            delay = random.uniform(settings.FILLER_MIN_S, settings.FILLER_MAX_S)
-            await asyncio.sleep(delay)
-            if not self._running:
-                break
-            phrase = random.choice(settings.FILLERS)
+            await asyncio.sleep(max(0.0, wake - time.monotonic()))
+            now = time.monotonic()
+            phrase = self._pick(waits.remaining(self.kind, now - self.since))
+            if phrase is None:
+                # the reply is due; look again in case it turns out late
+                wake = now + settings.FILLER_RECHECK_S
+                continue
+            self._last = phrase
+            metrics.inc("filler.started")
             # Show on screen to reinforce "alive" feeling
             self.ui.show_karen(f"[thinking] {phrase}")
-            # Speak with current TTS (stub or real)
-            async for chunk in self.tts.stream(phrase):
-                await self.spk.play_pcm(chunk)
+            self._speaking = True
+            try:
+                # Speak with current TTS (stub or real); fillers come from the phrase cache
+                async for chunk in self.tts.stream(phrase, cached=True, trace=False):
+                    await self.spk.play_pcm(chunk, voice="filler")
+                await self.spk.drain("filler")
+            finally:
+                self._speaking = False
+            wake = time.monotonic() + settings.FILLER_PAUSE_S
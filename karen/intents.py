@@ -0,0 +1,122 @@
+import re, time
+from datetime import datetime
+from typing import Awaitable, Callable
+from .config import settings
+from .metrics import metrics
+from .response_cache import normalize
+
+# requests wrapped around a command ("can you ... for me"); the response
+# cache keeps these words, but they don't change which intent is meant
+REQUEST_WRAPPER = re.compile(
+    r"^(?:(?:so|well|ok|okay|just|actually)\s+)*(?:(?:can|could|would|will)\s+you\s+)?(?:just\s+)?"
+    r"|\s+(?:for me|right now|now)$")
+
+# [[action:name]] tags the LLM is asked to append when the user wants something done
+ACTION_TAG = re.compile(r"\s*\[\[action:([a-z_]+)\]\]")
+
+def extract_actions(text: str) -> tuple[str, list[dict]]:
+    """Strip action tags from LLM output; returns (clean text, actions)."""
+    actions = [{"intent": m.group(1)} for m in ACTION_TAG.finditer(text)]
+    return ACTION_TAG.sub("", text).strip(), actions
+
+class ActionContext:
+    """What an action handler may touch."""
+    def __init__(self, ui=None, spk=None):
+        self.ui = ui
+        self.spk = spk
+
+Handler = Callable[[ActionContext, str], Awaitable[str | None]]
+
+class IntentEngine:
+    """Matches transcripts against local intents without calling the LLM.
+
+    Utterances are normalized (see response_cache.normalize), stripped of
+    REQUEST_WRAPPER and looked up in a dict of exact phrases first, then in
+    one precompiled alternation of all intent patterns, so a match costs
+    microseconds. A pattern match only counts if it covers most of the
+    utterance, so "stop" in "how do I stop Plankton" still goes to the LLM.
+    """
+    def __init__(self):
+        self._patterns: dict[str, list[str]] = {}
+        self._handlers: dict[str, Handler] = {}
+        self._fixed: dict[str, str] = {}
+        self._exact: dict[str, str] = {}
+        self._regex: re.Pattern | None = None
+
+    def register(self, name: str, patterns: list[str], handler: Handler, reply: str | None = None):
+        """Add an intent. `reply` marks a fixed response that can be pre-synthesized."""
+        self._patterns[name] = patterns
+        self._handlers[name] = handler
+        if reply:
+            self._fixed[name] = reply
+        self._regex = None
+
+    def fixed_replies(self) -> list[str]:
+        return list(self._fixed.values())
+
+    def match(self, text: str) -> str | None:
+        t0 = time.perf_counter()
+        if self._regex is None:
+            self._compile()
+        norm = REQUEST_WRAPPER.sub("", normalize(text))
+        name = self._exact.get(norm)
+        if name is None and norm:
+            m = self._regex.search(norm)
+            if m and len(m.group(0)) >= settings.INTENT_MIN_COVERAGE * len(norm):
+                name = m.lastgroup
+        metrics.set("intents.match_us", (time.perf_counter() - t0) * 1e6)
+        if name:
+            metrics.inc(f"intents.{name}")
+        return name
+
+    async def dispatch(self, name: str, ctx: ActionContext) -> str | None:
+        """Run an intent's handler; returns the text to speak, if any."""
+        handler = self._handlers.get(name)
+        if handler is None:
+            print(f"[intents] Unknown action '{name}'")
+            return None
+        return await handler(ctx, name)
+
+    def _compile(self):
+        self._exact = {}
+        groups = []
+        for name, patterns in self._patterns.items():
+            for p in patterns:
+                if re.fullmatch(r"[\w ]+", p):
+                    self._exact.setdefault(p, name)
+            groups.append(f"(?P<{name}>\\b(?:{'|'.join(patterns)})\\b)")
+        self._regex = re.compile("|".join(groups))
+
+# --- built-in intents ---
+
+def _fixed(reply: str) -> Handler:
+    async def handler(ctx: ActionContext, name: str) -> str | None:
+        return reply
+    return handler
+
+def _volume(step: float, reply: str) -> Handler:
+    async def handler(ctx: ActionContext, name: str) -> str | None:
+        if ctx.spk is not None:
+            ctx.spk.volume = min(1.0, max(0.1, ctx.spk.volume + step))
+        return reply
+    return handler
+
+async def _time(ctx: ActionContext, name: str) -> str | None:
+    now = datetime.now()
+    return f"It's {now.strftime('%I:%M %p').lstrip('0')}. Like you couldn't look at a clock."
+
+async def _date(ctx: ActionContext, name: str) -> str | None:
+    now = datetime.now()
+    return f"It's {now.strftime('%A, %B')} {now.day}. Mark your calendar, genius."
+
+intents = IntentEngine()
+intents.register("stop", ["stop", "stop it", "shut up", "be quiet", "quiet", "cancel", "enough"],
+                 _fixed("Fine."), reply="Fine.")
+intents.register("never_mind", ["never ?mind", "forget it", "nothing", "no one asked"],
+                 _fixed("Whatever."), reply="Whatever.")
+intents.register("volume_up", ["volume up", "louder", "turn (?:it|the volume) up", "speak up", "raise the volume"],
+                 _volume(+0.1, "Louder. Happy now?"), reply="Louder. Happy now?")
+intents.register("volume_down", ["volume down", "quieter", "softer", "turn (?:it|the volume) down", "lower the volume"],
+                 _volume(-0.1, "Quieter. Finally."), reply="Quieter. Finally.")
+intents.register("time", ["what time is it", "what is the time", "time is it"], _time)
+intents.register("date", ["what (?:day|date) is it(?: today)?", "what is the date(?: today)?", "what is today"], _date)
@@ -0,0 +1,60 @@
+import math, time
+import numpy as np
+from .config import settings
+
+class LipSync:
+    """How open Karen's mouth is, from the audio the Speaker actually plays.
+
+    The Speaker reports every block it mixes via played(), from its audio
+    callback, stamped with the monotonic time the block reaches the speaker.
+    Its loudness is kept per LIPSYNC_HOP_MS hop in a short ring on that
+    clock, so the UI can ask what is being heard at any moment: frame() maps
+    the loudest hop of the video frame starting at `t` from LIPSYNC_FLOOR_DB
+    (closed) to LIPSYNC_OPEN_DB (wide open) onto one of `frames` mouth
+    sprites. Silence, and anything after the last block reported, is a
+    closed mouth.
+    """
+    def __init__(self, rate: int | None = None, history_s: float = 4.0):
+        self.rate = rate or settings.SAMPLE_RATE
+        self.hop = max(1, int(self.rate * settings.LIPSYNC_HOP_MS / 1000))
+        self.hop_s = self.hop / self.rate
+        self.frame_s = 1.0 / settings.LIPSYNC_FPS
+        size = max(1, int(history_s / self.hop_s))
+        self._t = np.full(size, -np.inf)               # time each hop starts being heard
+        self._level = np.zeros(size, dtype=np.float32)
+        self._n = 0
+        self._floor = settings.LIPSYNC_FLOOR_DB
+        self._span = max(1e-3, settings.LIPSYNC_OPEN_DB - settings.LIPSYNC_FLOOR_DB)
+
+    def played(self, pcm: np.ndarray, t: float):
+        """Record output (at `rate`) that starts being heard at monotonic time `t`."""
+        # a block is a hop or two: one dot product each is cheaper than vectorizing across hops
+        # no lock: a frame read while this runs can be off by one hop, for that frame only
+        size = len(self._t)
+        for start in range(0, len(pcm), self.hop):
+            x = pcm[start:start + self.hop]
+            i = self._n % size
+            self._level[i] = math.sqrt(float(np.dot(x, x)) / len(x))
+            self._t[i] = t + start / self.rate
+            self._n += 1
+
+    def stop(self):
+        """Playback was cut off: forget what will never be heard."""
+        self._level[self._t > time.monotonic()] = 0.0
+
+    def level(self, t0: float, t1: float) -> float:
+        """RMS of the loudest hop heard between `t0` and `t1`."""
+        heard = (self._t < t1) & (self._t + self.hop_s > t0)
+        return float(self._level[heard].max()) if heard.any() else 0.0
+
+    def openness(self, t: float) -> float:
+        """0 (closed) to 1 (wide open) for the video frame shown from `t`."""
+        level = self.level(t, t + self.frame_s)
+        if level <= 0.0:
+            return 0.0
+        db = 20.0 * np.log10(level)
+        return float(np.clip((db - self._floor) / self._span, 0.0, 1.0))
+
+    def frame(self, t: float, frames: int) -> int:
+        """Index of the sprite to show from `t`, out of `frames` ordered closed to open."""
+        return int(round(self.openness(t) * (frames - 1)))
@@ -1,5 +1,11 @@
-import openai
+import re
+from typing import AsyncGenerator
 from .config import settings
+from .memory import ConversationMemory
+from .response_cache import ResponseCache
+from .intents import extract_actions
+from .metrics import tracer
+from . import netwatch, providers
 
 SYSTEM_PROMPT = (
     "You are Karen from SpongeBob SquarePants: Plankton’s sarcastic computer wife. "
@@ -8,35 +14,106 @@ SYSTEM_PROMPT = (
     "annoyed or unimpressed. You mock Plankton's dumb plans, reference the Chum "
     "Bucket, and act like you're way too smart for this job. Keep it "
     "TTS-friendly—short sentences, no big words, no long rambles. Sound like "
-    "you've had it... because you have."
+    "you've had it... because you have. "
+    "If the user wants you to stop, change the volume, or drop the subject, "
+    "end your reply with one tag: [[action:stop]], [[action:volume_up]], "
+    "[[action:volume_down]] or [[action:never_mind]]."
 )
 
-class LLM:
-    client: openai.AsyncOpenAI | None = None
+# sentence end, optionally followed by closing quotes/brackets, then whitespace
+_SENTENCE_END = re.compile(r"[.!?…]+[\"'”’)\]]*\s+")
+# clause boundary used to cut long sentences early
+_CLAUSE_END = re.compile(r"[,;:—–]\s+")
 
-    async def __aenter__(self):
-        if settings.LLM_PROVIDER == "openai":
-            if not settings.OPENAI_API_KEY:
-                raise ValueError("OPENAI_API_KEY is not set in environment")
-            self.client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-        return self
+class SentenceSplitter:
+    """Turns a stream of token deltas into speakable sentences or clauses.
+    Short fragments are held back so TTS is never fed a lone "Uhh." and long
+    run-on sentences are cut at the next clause boundary.
+    """
+    def __init__(self, min_chars: int | None = None, clause_chars: int | None = None):
+        self.min_chars = min_chars if min_chars is not None else settings.SPEECH_MIN_CHARS
+        self.clause_chars = clause_chars if clause_chars is not None else settings.SPEECH_CLAUSE_CHARS
+        self._buf = ""
 
-    async def __aexit__(self, *a):
-        if self.client:
-            await self.client.close()
+    def feed(self, delta: str) -> list[str]:
+        self._buf += delta
+        out: list[str] = []
+        while True:
+            m = _SENTENCE_END.search(self._buf, self.min_chars)
+            if m is None and len(self._buf) >= self.clause_chars:
+                m = _CLAUSE_END.search(self._buf, self.min_chars)
+            if m is None:
+                break
+            seg = self._buf[:m.end()].strip()
+            self._buf = self._buf[m.end():]
+            if seg:
+                out.append(seg)
+        return out
+
+    def flush(self) -> str | None:
+        seg = self._buf.strip()
+        self._buf = ""
+        return seg or None
+
+SUMMARY_PROMPT = (
+    "Summarize this conversation between a user and Karen for Karen's own "
+    "memory. Keep names, facts, requests and open questions; drop banter. "
+    "Write at most a few short sentences."
+)
+
+class LLM(providers.Frontend):
+    """Replies through the LLM_PROVIDER backend, with memory and a response cache."""
+    registry = providers.llm
+    setting = "LLM_PROVIDER"
+
+    def __init__(self):
+        self.memory = ConversationMemory(self.summarize)
+        self.responses = ResponseCache()
+        self.last_actions: list[dict] = []  # actions tagged in the last streamed reply
+
+    def _messages(self, text: str) -> list[dict]:
+        return self.memory.messages(SYSTEM_PROMPT, text)
+
+    def remember(self, text: str, reply: str):
+        """Add a spoken turn to the conversation memory (call after playback)."""
+        self.memory.add(text, reply)
+
+    def _take_actions(self, sentence: str) -> str:
+        clean, actions = extract_actions(sentence)
+        self.last_actions.extend(actions)
+        return clean
+
+    async def summarize(self, summary: str, turns: list[tuple[str, str]]) -> str:
+        """Fold `turns` into the rolling `summary`."""
+        lines = [f"Summary so far: {summary}"] if summary else []
+        for user, karen in turns:
+            lines += [f"User: {user}", f"Karen: {karen}"]
+        messages = [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": "\n".join(lines)},
+        ]
+        with netwatch.reporting():
+            return await self.backend.complete(messages, settings.MEMORY_SUMMARY_TOKENS) or summary
 
     async def reply(self, text: str):
-        if settings.LLM_PROVIDER == "openai":
-            assert self.client is not None
-            res = await self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": text},
-                ],
-                max_tokens=180,
-            )
-            reply = res.choices[0].message.content or ""
-            actions: list[dict] = []
-            return reply, actions
-        raise NotImplementedError(f"LLM provider '{settings.LLM_PROVIDER}' not implemented")
+        with netwatch.reporting():
+            return extract_actions(await self.backend.complete(self._messages(text), 180))
+
+    async def stream(self, text: str) -> AsyncGenerator[str, None]:
+        """Yield the reply as speakable sentences while it is still being generated.
+        Action tags are stripped from the text and collected in last_actions.
+        """
+        self.last_actions = []
+        tracer.mark("llm_request")
+        splitter = SentenceSplitter()
+        with netwatch.reporting():
+            async for delta in self.backend.deltas(self._messages(text), 180):
+                tracer.mark("llm_first_token")
+                for seg in splitter.feed(delta):
+                    if seg := self._take_actions(seg):
+                        tracer.mark("llm_first_sentence")
+                        yield seg
+        tail = splitter.flush()
+        if tail and (tail := self._take_actions(tail)):
+            tracer.mark("llm_first_sentence")
+            yield tail
@@ -1,5 +1,8 @@
 import asyncio
+import contextlib
+import time
 from .audio_io import Mic, Speaker
+from .capture import CaptureHub
 from .wake import WakeWordService, record_wakeword_samples
 from .stt import STT
 from .llm import LLM
@@ -7,42 +10,170 @@ from .tts import TTS
 from .ui import UI
 from .netwatch import NetWatch
 from .filler import Filler
+from .config import settings
+from .metrics import metrics, tracer, PrometheusTextfile, JsonlSink
+from .intents import intents, ActionContext
+from .bargein import EchoCanceller, interruptible
+from .lipsync import LipSync
 import os
 
-async def run_turn(ui: UI, spk: Speaker, stt: STT, llm: LLM, tts: TTS):
+REPLY_PREFIX = "Ugh, fine, here's your answer:"
+
+async def run_turn(ui: UI, hub: CaptureHub, spk: Speaker, stt: STT, llm: LLM, tts: TTS,
+                   start: int | None = None, wake: WakeWordService | None = None):
     ui.set_state("listening")
-    async with Mic() as mic:
-        audio = await mic.capture_until_silence(max_sec=12, silence_ms=700, thresh=0.01)
-        rate = getattr(mic, "rate", 16000)
+    # transcription runs while the user is still talking, when available
+    stream = stt.open_stream(hub.rate, on_partial=ui.show_partial)
+    async with Mic(hub, start=start) as mic:
+        utt = await mic.capture_until_silence(on_audio=stream.feed if stream else None)
+    # dead air is counted from when the user stopped talking
+    said = utt.end_ts or time.monotonic()
+    if wake is not None:
+        # the command is in; from here on the wake word interrupts Karen
+        await wake.resume()
+
+    if not utt.has_speech:
+        if stream:
+            await stream.close()
+        ui.toast("What, mumbling already? Speak up, genius!")
+        return
 
     ui.set_state("transcribing")
-    text = await stt.transcribe((audio, rate))
+    text = await stt.finish(stream, utt.audio, utt.rate)
     if not text:
         ui.toast("What, mumbling already? Speak up, genius!")
         return
 
     ui.show_user(text)
 
+    # simple commands are handled locally, with no LLM round trip
+    intent = intents.match(text)
+    if intent:
+        reply = await intents.dispatch(intent, ActionContext(ui=ui, spk=spk))
+        if reply:
+            ui.set_state("speaking")
+            ui.show_karen(reply)
+            async for chunk in tts.stream(reply, cached=reply in intents.fixed_replies()):
+                await spk.play_pcm(chunk)
+            await spk.drain()
+            _record_dead_air(spk, said)
+        return
+
     ui.set_state("thinking")
-    filler = Filler(ui=ui, tts=tts, spk=spk)
+    # repeated questions are answered from the response cache: no LLM, and
+    # the reply audio comes from the TTS phrase cache
+    cached = llm.responses.get(text)
+    filler = Filler(ui=ui, tts=tts, spk=spk, since=said, kind="cached" if cached else "llm")
     await filler.start()
 
+    t_start = time.monotonic()
+    keep_audio = cached is not None or llm.responses.cacheable(text)
+    source = _replay(cached) if cached else llm.stream(text)
+    sentences: asyncio.Queue = asyncio.Queue(maxsize=settings.SPEECH_QUEUE_MAX)
+    producer = asyncio.create_task(_produce_sentences(source, sentences))
+    spoken: list[str] = []
+    ttfa = None
     try:
-        reply, actions = await llm.respond(text)
-        reply = f"Ugh, fine, here's your answer: {reply}"
+        item = await sentences.get()
+        while item is not None:
+            if isinstance(item, Exception):
+                raise item
+            spoken.append(item)
+            async for chunk in tts.stream(item, cached=keep_audio or item == REPLY_PREFIX):
+                if ttfa is None:
+                    # reply audio is ready: the filler fades out under it
+                    await filler.stop(ready=True)
+                    ui.set_state("speaking")
+                    ttfa = (time.monotonic() - t_start) * 1000.0
+                    metrics.set("turn.time_to_first_audio_ms", ttfa)
+                await spk.play_pcm(chunk)
+            item = await sentences.get()
+        await spk.drain()
     finally:
         await filler.stop()
+        # wait for the producer to unwind, so its LLM stream is closed with the turn
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+
+    if spoken:
+        ui.show_karen(" ".join(spoken))
+        reply = [s for s in spoken if s != REPLY_PREFIX]
+        # run actions the LLM tagged; they already have their spoken reply
+        actions = [] if cached else llm.last_actions
+        for action in actions:
+            await intents.dispatch(action["intent"], ActionContext(ui=ui, spk=spk))
+        if cached is None and not actions:
+            llm.responses.put(text, reply)
+        _record_cache_latency(cached is not None, ttfa)
+        _record_dead_air(spk, said)
+        # after playback, so any summarization stays off the critical path
+        llm.remember(text, " ".join(reply))
 
-    ui.set_state("speaking")
-    ui.show_karen(reply)
+def _record_cache_latency(hit: bool, ttfa: float | None):
+    if ttfa is None:
+        return
+    if hit:
+        saved = metrics.get("response_cache.miss_ttfa_ms") - ttfa
+        metrics.inc("response_cache.saved_ms", max(0.0, saved))
+    else:
+        prev = metrics.get("response_cache.miss_ttfa_ms", ttfa)
+        metrics.set("response_cache.miss_ttfa_ms", 0.8 * prev + 0.2 * ttfa)
+
+def _record_dead_air(spk: Speaker, said: float):
+    """Silence between the user's last word and Karen's reply; fillers don't count."""
+    heard = spk.reply_heard(said)
+    if heard is None:
+        return
+    dead_air = spk.silence(said, heard) * 1000.0
+    metrics.set("turn.dead_air_ms", dead_air)
+    tracer.observe("turn.dead_air_ms", dead_air)
 
-    async for chunk in tts.stream(reply):
-        await spk.play_pcm(chunk)
+_background: set[asyncio.Task] = set()
 
-async def main():
-    ui = UI()
-    net = NetWatch()
+def _start_tracing(ui: UI):
+    if settings.TRACE_PROM_PATH:
+        tracer.sinks.append(PrometheusTextfile(settings.TRACE_PROM_PATH))
+    if settings.TRACE_JSONL_PATH:
+        tracer.sinks.append(JsonlSink(settings.TRACE_JSONL_PATH))
+    tasks = [tracer.watch_loop()]
+    if tracer.sinks:
+        tasks.append(tracer.export(settings.TRACE_EXPORT_S))
+    if settings.TRACE_OVERLAY:
+        tasks.append(_trace_overlay(ui))
+    for coro in tasks:
+        task = asyncio.create_task(coro)
+        _background.add(task)
+        task.add_done_callback(_background.discard)
+
+async def _trace_overlay(ui: UI):
+    while True:
+        await asyncio.sleep(1.0)
+        ui.show_trace(f"{'ms':<28} {'p50':>8} {'p95':>8} {'p99':>8}\n{tracer.report()}")
+
+async def _replay(sentences: list[str]):
+    for s in sentences:
+        yield s
+
+async def _produce_sentences(source, out: asyncio.Queue):
+    """Push reply sentences from `source` into `out` as they arrive.
+    Ends with None, or with the exception that stopped the stream.
+    """
+    try:
+        first = True
+        async for sentence in source:
+            if first:
+                first = False
+                await out.put(REPLY_PREFIX)
+            await out.put(sentence)
+    except Exception as e:
+        await out.put(e)
+    else:
+        await out.put(None)
+    finally:
+        # if cancelled, close the stream now rather than when it is collected
+        await source.aclose()
 
+async def main():
     custom_model = "hey_karen.tflite"
     training_dir = "wake_training_data"
     model_paths = [custom_model] if os.path.exists(custom_model) else []
@@ -52,39 +183,118 @@ async def main():
         print("Want to record 10 'Hey Karen' samples to train a model? (y/n): ", end="")
         choice = input().strip().lower()
         if choice in ["y", "yes"]:
-            await record_wakeword_samples(num_samples=10)
-            print("\nRecording complete. Train the model with:")
-            print("python -c \"import openwakeword; openwakeword.train(wake_word='hey_karen', positive_path='wake_training_data/', save_path='hey_karen.tflite')\"")
+            record_wakeword_samples(num_samples=10)
+            print("\nRecording complete. Augment the samples with:")
+            print("python -m karen.wake_data wake_training_data wake_dataset --count 5000 --format wav")
+            print("Then train the model with:")
+            print("python -c \"import openwakeword; openwakeword.train(wake_word='hey_karen', positive_path='wake_dataset/', save_path='hey_karen.tflite')\"")
             print("Re-run this script after training.")
             return
         else:
             print("No recording. Using dummy mode (wakes every 5s).")
 
-    async with Speaker() as spk, STT() as stt, LLM() as llm, TTS() as tts, WakeWordService(model_paths=model_paths) as wake:
+    async with boot(model_paths=model_paths) as k, NetWatch() as net:
+        if tracer.enabled:
+            _start_tracing(k.ui)
+        await serve(k.ui, net, k.hub, k.spk, k.stt, k.llm, k.tts, k.wake)
+
+class Assistant:
+    """Everything boot() brings up."""
+    def __init__(self, ui, hub: CaptureHub, spk: Speaker, stt: STT, llm: LLM, tts: TTS,
+                 wake: WakeWordService):
+        self.ui, self.hub, self.spk = ui, hub, spk
+        self.stt, self.llm, self.tts, self.wake = stt, llm, tts, wake
+
+@contextlib.asynccontextmanager
+async def boot(ui_factory=UI, model_paths=(), wake_model=None, input_factory=None, output_factory=None):
+    """Bring up devices, providers, the wake detector and the UI concurrently.
+
+    Provider SDKs are imported and the wake model loaded in worker threads
+    while the UI is built on this one. Yields once everything but the wake
+    model is up; serve() waits for that (WakeWordService.ready()).
+    """
+    async with contextlib.AsyncExitStack() as stack:
+        hub = await stack.enter_async_context(CaptureHub(stream_factory=input_factory))
+        echo = EchoCanceller(hub) if settings.BARGE_IN else None
+        mouth = LipSync()
+        parts = [Speaker(echo=echo, mouth=mouth, stream_factory=output_factory), STT(), LLM(), TTS(),
+                 WakeWordService(hub, model_paths=model_paths, model=wake_model, echo=echo)]
+        opening = asyncio.gather(*(stack.enter_async_context(p) for p in parts), return_exceptions=True)
+        await asyncio.sleep(0)  # let the loaders start before the UI holds this thread
+        try:
+            ui = ui_factory()
+            if hasattr(ui, "set_mouth"):
+                ui.set_mouth(mouth)
+            ui.set_state("booting")
+        except BaseException:
+            # let the parts finish opening first, or the stack unwinds while
+            # they are still being added to it and leaks them
+            await opening
+            raise
+        # wait for all, so everything that did open is closed by the stack on failure
+        results = await opening
+        for r in results:
+            if isinstance(r, BaseException):
+                raise r
+        yield Assistant(ui, hub, *results)
+
+def net_changed(ui: UI, ok: bool):
+    if hasattr(ui, "set_net_ok"):
+        ui.set_net_ok(ok)
+    if not ok:
+        ui.toast("Network's down. What am I, a miracle worker? Waiting...")
+
+async def online(ui: UI, net: NetWatch) -> bool:
+    """Whether a turn can reach the APIs: NetWatch's cached state, re-probed once if it says down."""
+    if net.ok() or await net.check():
+        return True
+    ui.toast("Network's still down. Talk to the router, not me.")
+    return False
+
+async def serve(ui: UI, net: NetWatch, hub: CaptureHub, spk: Speaker, stt: STT, llm: LLM,
+                tts: TTS, wake: WakeWordService):
+    """The assistant loop: wait for the wake word, run the turn, repeat."""
+    # fill the phrase cache off the critical path so fillers never wait on the API
+    prewarm = asyncio.create_task(tts.prewarm([*settings.FILLERS, REPLY_PREFIX, *intents.fixed_replies()]))
+    try:
+        net.on_change = lambda ok: net_changed(ui, ok)
+        await wake.ready()
         ui.set_state("idle")
         ui.toast("KAREN online. Don't waste my circuits, what's up?")
         while True:
-            ok = await net.ok()
-            if hasattr(ui, "set_net_ok"):
-                ui.set_net_ok(ok)
-            if not ok:
-                ui.toast("Network's down. What am I, a miracle worker? Waiting...")
-                await asyncio.sleep(1.0)
+            await wake.wait()
+            if not await online(ui, net):
                 continue
+            start = wake.trigger_pos
+            # saying the wake word while Karen talks cuts her off and starts a new turn
+            barge_in = settings.BARGE_IN and wake.detecting
+            while start is not None:
+                # open API connections while the user is still talking
+                for provider in (stt, llm, tts):
+                    provider.warm()
+                ui.ping()
+                ui.toast("Alright, you got my attention. What's the big idea?")
 
-            await wake.wait()
-            ui.ping()
-            ui.toast("Alright, you got my attention. What's the big idea?")
-
-            try:
-                await wake.pause()
-                await run_turn(ui, spk, stt, llm, tts)
-            except Exception as e:
-                ui.error(f"Oh, great, something broke: {str(e)}. Typical.")
-            finally:
-                await wake.resume()
-                ui.set_state("idle")
-                ui.toast("Back to waiting. Don't make me sit here all day.")
-
-if _name_ == "_main_":
+                try:
+                    await wake.pause()
+                    turn = run_turn(ui, hub, spk, stt, llm, tts, start=start,
+                                    wake=wake if barge_in else None)
+                    start = await interruptible(turn, wake, spk) if barge_in else await turn
+                except Exception as e:
+                    start = None
+                    ui.error(f"Oh, great, something broke: {str(e)}. Typical.")
+                finally:
+                    if start is None:
+                        tracer.end_turn()
+                        await wake.resume()
+                        ui.set_state("idle")
+                        ui.toast("Back to waiting. Don't make me sit here all day.")
+    finally:
+        # tts (and its phrase cache) is closed once serve() returns
+        prewarm.cancel()
+        failed, = await asyncio.gather(prewarm, return_exceptions=True)
+        if isinstance(failed, Exception):
+            print(f"[tts] Pre-warm failed: {failed!r}")
+
+if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,68 @@
+import asyncio
+from typing import Awaitable, Callable
+from .config import settings
+from .metrics import metrics
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 chars per token) plus per-message overhead."""
+    return len(text) // 4 + 4
+
+class ConversationMemory:
+    """Multi-turn context for the LLM under a fixed token budget.
+
+    Recent turns are kept verbatim. When they exceed MEMORY_TOKEN_BUDGET the
+    oldest ones are folded into a rolling summary by `summarize`, in the
+    background after the reply has been spoken. Folding drops to
+    MEMORY_FOLD_TO of the budget in one go, so between folds the prompt only
+    ever grows at the end and its prefix stays byte-identical across turns
+    (which is what provider-side prompt caching keys on).
+    """
+    def __init__(self, summarize: Callable[[str, list[tuple[str, str]]], Awaitable[str]],
+                 budget: int | None = None):
+        self.summarize = summarize
+        self.budget = budget or settings.MEMORY_TOKEN_BUDGET
+        self.summary = ""
+        self.turns: list[tuple[str, str]] = []
+        self._folding: asyncio.Task | None = None
+
+    def messages(self, system_prompt: str, text: str) -> list[dict]:
+        msgs = [{"role": "system", "content": system_prompt}]
+        if self.summary:
+            msgs.append({"role": "system", "content": f"Earlier in this conversation: {self.summary}"})
+        for user, karen in self.turns:
+            msgs.append({"role": "user", "content": user})
+            msgs.append({"role": "assistant", "content": karen})
+        msgs.append({"role": "user", "content": text})
+        return msgs
+
+    def tokens(self) -> int:
+        return sum(estimate_tokens(u) + estimate_tokens(k) for u, k in self.turns)
+
+    def add(self, user: str, karen: str):
+        """Record a finished turn; schedules a fold if over budget."""
+        self.turns.append((user, karen))
+        metrics.set("memory.tokens", self.tokens() + estimate_tokens(self.summary))
+        if self.tokens() > self.budget and not (self._folding and not self._folding.done()):
+            self._folding = asyncio.create_task(self._fold())
+
+    async def wait_idle(self):
+        if self._folding:
+            await asyncio.gather(self._folding, return_exceptions=True)
+
+    async def _fold(self):
+        keep = int(self.budget * settings.MEMORY_FOLD_TO)
+        n, total = 0, self.tokens()
+        while n < len(self.turns) and total > keep:
+            u, k = self.turns[n]
+            total -= estimate_tokens(u) + estimate_tokens(k)
+            n += 1
+        old = self.turns[:n]
+        try:
+            summary = await self.summarize(self.summary, old)
+        except Exception as e:
+            print(f"[memory] Summarization failed, dropping {n} old turns: {e}")
+            summary = self.summary
+        # turns that arrived meanwhile were appended after `old`, so slicing is safe
+        self.turns = self.turns[n:]
+        self.summary = summary
+        metrics.inc("memory.folds")
@@ -0,0 +1,252 @@
+import asyncio, collections, json, os, re, threading, time
+from .config import settings
+
+class Metrics:
+    """Process-wide counters and last-value gauges, keyed by dotted name.
+    Safe to update from audio callbacks and worker threads.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: dict[str, float] = {}
+        self.gauges: dict[str, float] = {}
+
+    def inc(self, name: str, n: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set(self, name: str, value: float):
+        with self._lock:
+            self.gauges[name] = value
+
+    def get(self, name: str, default: float = 0.0) -> float:
+        with self._lock:
+            if name in self.gauges:
+                return self.gauges[name]
+            return self.counters.get(name, default)
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            return {**self.counters, **self.gauges}
+
+metrics = Metrics()
+
+class Histogram:
+    """Rolling window of the last `size` observations with percentile summaries."""
+    def __init__(self, size: int = 500):
+        self._values = collections.deque(maxlen=size)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self._values.append(value)
+        self.count += 1
+        self.sum += value
+
+    def percentiles(self, qs=(50, 95, 99)) -> dict[int, float]:
+        values = sorted(self._values)
+        if not values:
+            return {q: float("nan") for q in qs}
+        return {q: values[min(len(values) - 1, int(q / 100 * len(values)))] for q in qs}
+
+# (span, from mark, to mark); a span is recorded when a turn has both marks
+SPANS = [
+    ("wake_to_speech", "wake", "speech_start"),
+    ("endpoint", "speech_end", "endpointed"),
+    ("stt", "endpointed", "transcribed"),
+    ("llm_first_token", "llm_request", "llm_first_token"),
+    ("llm_first_sentence", "llm_request", "llm_first_sentence"),
+    ("tts_first_byte", "tts_request", "tts_first_byte"),
+    ("tts_first_frame", "tts_request", "tts_first_frame"),
+    ("first_audio", "speech_end", "first_audio"),
+    ("turn", "wake", "done"),
+]
+
+class Tracer:
+    """Per-turn stage timestamps, event-loop lag and rolling histograms.
+
+    Components call mark(stage) at stage boundaries (wake, speech_start,
+    speech_end, endpointed, transcribed, llm_request, llm_first_token, ...,
+    first_audio, done); only the first mark of each stage in a turn counts.
+    end_turn() turns the marks into SPANS, feeds their histograms and hands
+    the turn to any sinks. Disabled (settings.TRACE off), mark() and
+    observe() return after one attribute check. Marks and observations
+    come from the audio callback and the wake-word thread as well as the
+    event loop, so the turn and the histograms are only touched under a
+    lock; sinks are called outside it.
+    """
+    def __init__(self, enabled: bool = False, window: int = 500):
+        self.enabled = enabled
+        self.window = window
+        self.histograms: dict[str, Histogram] = {}
+        self.last_turn: dict | None = None
+        self.sinks: list = []
+        self._turn: dict[str, float] | None = None
+        self._turn_id = 0
+        self._lock = threading.Lock()
+
+    def start_turn(self, t: float | None = None):
+        """Open a turn at the wake word; an unfinished previous turn ends as interrupted."""
+        if not self.enabled:
+            return
+        with self._lock:
+            interrupted = self._close_turn(interrupted=True)
+            self._turn_id += 1
+            self._turn = {"wake": t if t is not None else time.monotonic()}
+        self._to_sinks(interrupted)
+
+    def mark(self, stage: str, t: float | None = None):
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._turn is not None and stage not in self._turn:
+                self._turn[stage] = t if t is not None else time.monotonic()
+
+    def observe(self, name: str, value: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._observe(name, value)
+
+    def end_turn(self, interrupted: bool = False):
+        if not self.enabled:
+            return
+        with self._lock:
+            turn = self._close_turn(interrupted)
+        self._to_sinks(turn)
+
+    def _observe(self, name: str, value: float):
+        h = self.histograms.get(name)
+        if h is None:
+            h = self.histograms[name] = Histogram(self.window)
+        h.observe(value)
+
+    def _close_turn(self, interrupted: bool) -> dict | None:
+        # with the lock held
+        if self._turn is None:
+            return None
+        marks, self._turn = self._turn, None
+        marks.setdefault("done", time.monotonic())
+        spans = {}
+        for name, a, b in SPANS:
+            if a in marks and b in marks:
+                spans[name] = (marks[b] - marks[a]) * 1000.0
+                self._observe(f"span.{name}_ms", spans[name])
+        t0 = marks["wake"]
+        self.last_turn = {
+            "turn": self._turn_id,
+            "time": time.time(),
+            "interrupted": interrupted,
+            "marks_ms": {k: round((v - t0) * 1000.0, 2) for k, v in sorted(marks.items(), key=lambda kv: kv[1])},
+            "spans_ms": {k: round(v, 2) for k, v in spans.items()},
+        }
+        return self.last_turn
+
+    def _to_sinks(self, turn: dict | None):
+        if turn is None:
+            return
+        for sink in self.sinks:
+            try:
+                sink.turn(turn)
+            except Exception as e:
+                print(f"[trace] {type(sink).__name__} failed: {e!r}")
+
+    def summary(self) -> dict[str, dict[int, float]]:
+        with self._lock:
+            return {name: h.percentiles() for name, h in self.histograms.items()}
+
+    def stats(self) -> list[tuple[str, dict[int, float], int, float]]:
+        """(name, percentiles, count, sum) per histogram, sorted by name."""
+        with self._lock:
+            return [(name, h.percentiles(), h.count, h.sum) for name, h in sorted(self.histograms.items())]
+
+    def report(self) -> str:
+        """One line per histogram: p50/p95/p99 and count."""
+        lines = []
+        for name, p, count, _ in self.stats():
+            lines.append(f"{name:<28} {p[50]:8.1f} {p[95]:8.1f} {p[99]:8.1f}  n={count}")
+        return "\n".join(lines)
+
+    async def watch_loop(self, period: float = 0.05):
+        """Sample event-loop lag (how late a sleep wakes up) into loop.lag_ms."""
+        while True:
+            t0 = time.perf_counter()
+            await asyncio.sleep(period)
+            self.observe("loop.lag_ms", (time.perf_counter() - t0 - period) * 1000.0)
+
+    async def export(self, interval: float = 10.0):
+        """Periodically write every sink's snapshot."""
+        while True:
+            await asyncio.sleep(interval)
+            for sink in self.sinks:
+                try:
+                    sink.snapshot(self)
+                except Exception as e:
+                    print(f"[trace] {type(sink).__name__} failed: {e!r}")
+
+class PrometheusTextfile:
+    """Writes counters, gauges and histogram quantiles in the Prometheus text
+    format, for node_exporter's textfile collector. Replaced atomically.
+
+    Histograms are exported as `<name>_summary`: many are observed under the
+    name of a gauge holding the latest value, and the collector rejects the
+    whole file if one name has two types. Any other clash (two names that
+    sanitize alike) keeps the first.
+    """
+    def __init__(self, path: str, prefix: str = "karen"):
+        self.path = path
+        self.prefix = prefix
+
+    def turn(self, turn: dict):
+        pass
+
+    def snapshot(self, tracer: Tracer):
+        lines, seen = [], set()
+        with metrics._lock:
+            counters, gauges = dict(metrics.counters), dict(metrics.gauges)
+        for kind, values in (("counter", counters), ("gauge", gauges)):
+            for name, value in sorted(values.items()):
+                metric = self._name(name)
+                if metric in seen:
+                    continue
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} {kind}")
+                lines.append(f"{metric} {value}")
+        for name, percentiles, count, total in tracer.stats():
+            metric = self._name(name) + "_summary"
+            if seen & {metric, metric + "_sum", metric + "_count"}:
+                continue
+            seen.add(metric)
+            lines.append(f"# TYPE {metric} summary")
+            for q, v in percentiles.items():
+                lines.append(f'{metric}{{quantile="{q / 100}"}} {v}')
+            lines.append(f"{metric}_sum {total}")
+            lines.append(f"{metric}_count {count}")
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, self.path)
+
+    def _name(self, name: str) -> str:
+        return self.prefix + "_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+class JsonlSink:
+    """Appends one JSON line per finished turn and one per snapshot."""
+    def __init__(self, path: str):
+        self.path = path
+
+    def turn(self, turn: dict):
+        self._write({"type": "turn", **turn})
+
+    def snapshot(self, tracer: Tracer):
+        self._write({
+            "type": "snapshot",
+            "time": time.time(),
+            "metrics": metrics.snapshot(),
+            "histograms": {k: {f"p{q}": v for q, v in p.items()} for k, p in tracer.summary().items()},
+        })
+
+    def _write(self, record: dict):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+tracer = Tracer(enabled=settings.TRACE, window=settings.TRACE_WINDOW)
@@ -1,21 +1,151 @@
-import asyncio, socket
+import asyncio, contextlib, time, weakref
+from typing import Callable
+from .config import settings
+from .metrics import metrics
 
 class NetWatch:
-    def __init__(self, host='1.1.1.1', port=53, timeout=0.6):
-        self.host, self.port, self.timeout = host, port, timeout
+    """Background network health monitor; ok() answers from cached state.
 
-    async def ok(self):
+    While the network is up a TCP connect probe runs only when nothing has
+    proven it for NET_PROBE_INTERVAL_S, since every successful STT/LLM/TTS
+    call (see report()) counts as one. A failed call, or a failed probe,
+    switches to probing with exponential backoff from NET_BACKOFF_MIN_S to
+    NET_BACKOFF_MAX_S until a probe or a call succeeds. `on_change(ok)` is
+    called on the event loop on transitions only, including the first
+    result. Until then the network is assumed up.
+    """
+    def __init__(self, host: str | None = None, port: int | None = None, timeout: float | None = None,
+                 interval: float | None = None):
+        self.host = host or settings.NET_PROBE_HOST
+        self.port = port or settings.NET_PROBE_PORT
+        self.timeout = timeout if timeout is not None else settings.NET_PROBE_TIMEOUT_S
+        self.interval = interval if interval is not None else settings.NET_PROBE_INTERVAL_S
+        self.up: bool | None = None
+        self.on_change: Callable[[bool], None] | None = None
+        self.probes = 0
+        self.probe_s = 0.0
+        self._seen = 0.0          # monotonic time the network last proved up
+        self._probed = -1e9       # monotonic time the last probe finished
+        self._suspect = False     # a call failed; probe now
+        self._kick = asyncio.Event()
+        self._probing: asyncio.Future | None = None
+        self._task: asyncio.Task | None = None
+
+    async def __aenter__(self):
+        _watchers.add(self)
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *a):
+        _watchers.discard(self)
+        if self._probing:
+            self._probing.cancel()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def ok(self) -> bool:
+        return self.up is not False
+
+    async def check(self, max_age: float = 1.0) -> bool:
+        """Probe now, unless a probe finished within `max_age` seconds or one is running."""
+        if time.monotonic() - self._probed < max_age:
+            return bool(self.up)
+        return await self.probe()
+
+    async def probe(self) -> bool:
+        if self._probing is None:
+            self._probing = asyncio.ensure_future(self._connect())
+            self._probing.add_done_callback(lambda _: setattr(self, "_probing", None))
+        return await asyncio.shield(self._probing)
+
+    def observe(self, error: BaseException | None = None):
+        """Feed the outcome of a real network call (None for success)."""
+        if error is None:
+            self._set(True)
+        elif is_network_error(error):
+            metrics.inc("net.call_failures")
+            self._suspect = True
+            self._kick.set()
+
+    async def _connect(self) -> bool:
+        t0 = time.perf_counter()
+        self.probes += 1
+        metrics.inc("net.probes")
         try:
-            fut = asyncio.get_running_loop().run_in_executor(
-                None,
-                self._try_connect
-            )
-            await asyncio.wait_for(fut, timeout=self.timeout+0.2)
-            return True
-        except Exception:
-            return False
-
-    def _try_connect(self):
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.settimeout(self.timeout)
-            s.connect((self.host, self.port))
+            _, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+            writer.close()
+            ok = True
+        except (OSError, asyncio.TimeoutError):
+            ok = False
+        dt = time.perf_counter() - t0
+        self.probe_s += dt
+        metrics.inc("net.probe_ms", dt * 1000.0)
+        self._probed = time.monotonic()
+        self._set(ok)
+        return ok
+
+    def _set(self, ok: bool):
+        if ok:
+            self._seen = time.monotonic()
+            self._suspect = False
+        if ok == self.up:
+            return
+        self.up = ok
+        metrics.set("net.up", float(ok))
+        metrics.inc("net.transitions")
+        if self.on_change is not None:
+            try:
+                self.on_change(ok)
+            except Exception as e:
+                print(f"[net] on_change failed: {e!r}")
+
+    async def _sleep(self, seconds: float):
+        """Sleep, waking early if a call fails."""
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._kick.wait(), max(0.0, seconds))
+
+    async def _run(self):
+        backoff = settings.NET_BACKOFF_MIN_S
+        while True:
+            self._kick.clear()
+            if self.up and not self._suspect:
+                due = self._seen + self.interval - time.monotonic()
+                if due > 0:
+                    await self._sleep(due)
+                    continue
+            if await self.probe():
+                backoff = settings.NET_BACKOFF_MIN_S
+            else:
+                await self._sleep(backoff)
+                backoff = min(backoff * 2, settings.NET_BACKOFF_MAX_S)
+
+_watchers: "weakref.WeakSet[NetWatch]" = weakref.WeakSet()
+
+def report(error: BaseException | None = None):
+    """Tell every running NetWatch how a real API call went (None for success)."""
+    for w in list(_watchers):
+        w.observe(error)
+
+@contextlib.contextmanager
+def reporting():
+    """report() the outcome of the API call made inside the block."""
+    try:
+        yield
+    except (asyncio.CancelledError, GeneratorExit):
+        raise
+    except Exception as e:
+        report(e)
+        raise
+    else:
+        report()
+
+def is_network_error(e: BaseException) -> bool:
+    """Connection failures and timeouts, including the SDKs' own classes for them."""
+    if isinstance(e, (OSError, asyncio.TimeoutError)):
+        return True
+    return any("Connect" in c.__name__ or "Timeout" in c.__name__ for c in type(e).__mro__)
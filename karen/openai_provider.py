@@ -0,0 +1,231 @@
+"""OpenAI backends: realtime and batch transcription, chat completions and
+speech synthesis, all on the shared connection pool in clients.py.
+Imported by providers.py only when an "openai" provider is configured.
+"""
+import asyncio, base64, json
+from typing import AsyncGenerator, Callable
+import numpy as np
+import websockets
+from .config import settings
+from .clients import clients
+from .resample import Resampler
+from .upload import prepare_upload
+
+STREAM_RATE = 24000  # realtime API pcm16 input: 24kHz, 16-bit mono
+MIN_COMMIT_MS = 100  # the realtime API rejects smaller commits
+LLM_MODEL = "gpt-4o-mini"
+
+class STTStream:
+    """Realtime transcription session fed while the user is still talking.
+
+    feed() can be called from the moment the session is created; audio is
+    queued until the websocket is up. Turn detection is ours (the local
+    endpointer), and the server only transcribes audio once it is committed,
+    so the buffer is committed every STT_COMMIT_MS while the user talks: each
+    commit is a segment, and the segments' text so far goes to `on_partial`.
+    finish() commits the rest and waits (bounded) for every segment, whose
+    transcripts joined in order are the final one.
+    """
+    def __init__(self, url: str, api_key: str, rate: int,
+                 on_partial: Callable[[str], None] | None = None):
+        self.url = url
+        self.api_key = api_key
+        self.on_partial = on_partial
+        self.partial = ""
+        self._rs = Resampler(rate, STREAM_RATE)
+        self._pending = 0      # samples appended since the last commit
+        self._commits = 0
+        self._items: list[str] = []  # segments in commit order
+        self._text: dict[str, str] = {}
+        self._done: set[str] = set()
+        self._finishing = False
+        self._queue: asyncio.Queue[np.ndarray | None] = asyncio.Queue()
+        self._final: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+        self._ws = None
+        self._task = asyncio.create_task(self._run())
+
+    def feed(self, audio: np.ndarray):
+        self._queue.put_nowait(audio)
+
+    async def finish(self, timeout: float | None = None) -> str:
+        """Commit the audio and return the final transcript."""
+        self._queue.put_nowait(None)
+        timeout = timeout if timeout is not None else settings.STT_FINAL_TIMEOUT_S
+        try:
+            return await asyncio.wait_for(asyncio.shield(self._final), timeout)
+        finally:
+            await self.close()
+
+    async def close(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+        if not self._final.done():
+            self._final.cancel()
+        elif not self._final.cancelled():
+            self._final.exception()  # mark retrieved
+
+    async def _run(self):
+        try:
+            async with websockets.connect(
+                self.url,
+                additional_headers={"Authorization": f"Bearer {self.api_key}", "OpenAI-Beta": "realtime=v1"},
+                max_size=None,
+            ) as ws:
+                await ws.send(json.dumps({
+                    "type": "transcription_session.update",
+                    "session": {
+                        "input_audio_format": "pcm16",
+                        "input_audio_transcription": {"model": settings.STT_MODEL},
+                        "turn_detection": None,  # we endpoint locally
+                    },
+                }))
+                sender = asyncio.create_task(self._send_loop(ws))
+                try:
+                    await self._recv_loop(ws)
+                finally:
+                    sender.cancel()
+        except Exception as e:
+            if not self._final.done():
+                self._final.set_exception(e)
+
+    async def _send_loop(self, ws):
+        every = STREAM_RATE * settings.STT_COMMIT_MS // 1000
+        while (audio := await self._queue.get()) is not None:
+            await self._append(ws, self._rs.process(audio))
+            if self._pending >= every:
+                await self._commit(ws)
+        await self._append(ws, self._rs.flush())
+        # the server refuses to commit less than MIN_COMMIT_MS; that much
+        # after endpointing is trailing silence
+        if self._pending >= STREAM_RATE * MIN_COMMIT_MS // 1000:
+            await self._commit(ws)
+        self._finishing = True
+        self._check_final()
+
+    async def _append(self, ws, audio: np.ndarray):
+        if len(audio) == 0:
+            return
+        pcm = (np.clip(audio, -1.0, 1.0) * 32767.0).astype(np.int16).tobytes()
+        await ws.send(json.dumps({"type": "input_audio_buffer.append",
+                                  "audio": base64.b64encode(pcm).decode("ascii")}))
+        self._pending += len(audio)
+
+    async def _commit(self, ws):
+        await ws.send(json.dumps({"type": "input_audio_buffer.commit"}))
+        self._pending = 0
+        self._commits += 1
+
+    def _item(self, item_id: str):
+        if item_id not in self._text:
+            self._items.append(item_id)
+            self._text[item_id] = ""
+
+    def _joined(self) -> str:
+        return " ".join(t.strip() for t in (self._text[i] for i in self._items) if t.strip())
+
+    def _check_final(self):
+        if self._finishing and len(self._done) >= self._commits and not self._final.done():
+            self._final.set_result(self._joined())
+
+    async def _recv_loop(self, ws):
+        async for raw in ws:
+            msg = json.loads(raw)
+            kind = msg.get("type", "")
+            item_id = msg.get("item_id", "")
+            if kind == "input_audio_buffer.committed":
+                self._item(item_id)
+            elif kind == "conversation.item.input_audio_transcription.delta":
+                self._item(item_id)
+                self._text[item_id] += msg.get("delta", "")
+                self._show(self._joined())
+            elif kind == "conversation.item.input_audio_transcription.completed":
+                self._item(item_id)
+                self._text[item_id] = msg.get("transcript", "")
+                self._done.add(item_id)
+                self._show(self._joined())
+                self._check_final()
+                if self._final.done():
+                    return
+            elif kind == "error":
+                raise RuntimeError(msg.get("error", {}).get("message", "realtime transcription error"))
+        raise ConnectionError("transcription socket closed before the final transcript")
+
+    def _show(self, partial: str):
+        if partial != self.partial:
+            self.partial = partial
+            if self.on_partial:
+                self.on_partial(partial)
+
+class _OpenAIBackend:
+    client = None
+
+    async def open(self):
+        self.client = clients.acquire()
+
+    async def close(self):
+        if self.client:
+            self.client = None
+            await clients.release()
+
+    def warm(self):
+        clients.warm()
+
+class OpenAISTT(_OpenAIBackend):
+    def open_stream(self, rate: int, on_partial: Callable[[str], None] | None = None) -> STTStream | None:
+        if not settings.OPENAI_API_KEY:
+            return None
+        return STTStream(settings.STT_STREAM_URL, settings.OPENAI_API_KEY, rate, on_partial)
+
+    async def transcribe(self, audio: np.ndarray, rate: int) -> str:
+        upload = await asyncio.to_thread(prepare_upload, audio, rate)
+        if upload is None:
+            return ""
+        tr = await self.client.audio.transcriptions.create(
+            model=settings.STT_MODEL,
+            file=upload,
+        )
+        return tr.text or ""
+
+class OpenAILLM(_OpenAIBackend):
+    async def deltas(self, messages: list[dict], max_tokens: int) -> AsyncGenerator[str, None]:
+        # The SDK's stream stops reading at [DONE] and closes the response
+        # before the end of the body, which costs the pool its connection:
+        # read the events ourselves, to the end
+        async with self.client.chat.completions.with_streaming_response.create(
+            model=LLM_MODEL,
+            messages=messages,
+            max_tokens=max_tokens,
+            stream=True,
+        ) as resp:
+            async for line in resp.iter_lines():
+                if not line.startswith("data:") or line[5:].strip() == "[DONE]":
+                    continue
+                chunk = json.loads(line[5:])
+                if chunk.get("error"):
+                    raise RuntimeError(chunk["error"].get("message", "chat completion stream error"))
+                choices = chunk.get("choices")
+                if choices and choices[0].get("delta", {}).get("content"):
+                    yield choices[0]["delta"]["content"]
+
+    async def complete(self, messages: list[dict], max_tokens: int) -> str:
+        res = await self.client.chat.completions.create(
+            model=LLM_MODEL,
+            messages=messages,
+            max_tokens=max_tokens,
+        )
+        return res.choices[0].message.content or ""
+
+class OpenAITTS(_OpenAIBackend):
+    async def synth(self, text: str) -> AsyncGenerator[bytes, None]:
+        # raw PCM: 24kHz, 16-bit mono
+        async with self.client.audio.speech.with_streaming_response.create(
+            model=settings.TTS_MODEL,
+            voice=settings.TTS_VOICE,
+            input=text,
+            response_format="pcm",
+        ) as resp:
+            async for data in resp.iter_bytes():
+                yield data
@@ -0,0 +1,112 @@
+import hashlib, json, os
+from collections import OrderedDict
+import numpy as np
+from .config import settings
+
+INDEX_FILE = "index.json"
+
+class PhraseCache:
+    """Content-addressed store of synthesized phrases as raw int16 PCM.
+
+    Each entry is a `<sha256>.pcm` file that is memory-mapped on read, so a hit
+    costs no network round trip and no decode. `index.json` keeps entries in
+    least-recently-used order; the oldest are evicted once the total size
+    exceeds the byte budget. `.pcm` files the index doesn't list are deleted
+    when the cache is opened.
+    """
+    def __init__(self, root: str | None = None, max_bytes: int | None = None):
+        self.root = root or settings.TTS_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else int(settings.TTS_CACHE_MAX_MB * 1024 * 1024)
+        os.makedirs(self.root, exist_ok=True)
+        self._index: OrderedDict[str, dict] = self._load_index()
+        self._bytes = sum(e["bytes"] for e in self._index.values())
+        self._dirty = False
+        self._remove_orphans()
+
+    @staticmethod
+    def key(provider: str, model: str, voice: str, text: str, rate: int) -> str:
+        raw = "\0".join([provider, model, voice, text, str(rate)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def samples(self, key: str) -> int | None:
+        """Length of a cached entry in samples, from the index (the entry is not read)."""
+        entry = self._index.get(key)
+        return entry["bytes"] // 2 if entry else None
+
+    def get(self, key: str) -> np.ndarray | None:
+        """Return the cached PCM as a read-only int16 memmap, or None."""
+        if key not in self._index:
+            return None
+        try:
+            pcm = np.memmap(self._path(key), dtype=np.int16, mode="r")
+        except (OSError, ValueError):
+            self._drop(key)
+            return None
+        self._index.move_to_end(key)
+        self._dirty = True
+        return pcm
+
+    def put(self, key: str, pcm: np.ndarray, text: str = ""):
+        """Store int16 PCM under key, evicting least-recently-used entries."""
+        data = np.ascontiguousarray(pcm, dtype=np.int16)
+        if data.nbytes == 0 or data.nbytes > self.max_bytes:
+            return
+        if key in self._index:
+            self._drop(key)
+        tmp = self._path(key) + ".tmp"
+        data.tofile(tmp)
+        os.replace(tmp, self._path(key))
+        self._index[key] = {"bytes": data.nbytes, "text": text}
+        self._bytes += data.nbytes
+        self._dirty = True
+        while self._bytes > self.max_bytes and self._index:
+            self._drop(next(iter(self._index)))
+        self.save()
+
+    def save(self):
+        """Persist the index (and LRU order) if it changed."""
+        if not self._dirty:
+            return
+        tmp = os.path.join(self.root, INDEX_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(list(self._index.items()), f)
+        os.replace(tmp, os.path.join(self.root, INDEX_FILE))
+        self._dirty = False
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key + ".pcm")
+
+    def _drop(self, key: str):
+        entry = self._index.pop(key)
+        self._bytes -= entry["bytes"]
+        self._dirty = True
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _remove_orphans(self):
+        # files the index doesn't know are outside the byte budget and would
+        # never be evicted (e.g. left by a crash between a put and its save)
+        for name in os.listdir(self.root):
+            stem, ext = os.path.splitext(name)
+            if (ext == ".pcm" and stem not in self._index) or name.endswith(".pcm.tmp"):
+                try:
+                    os.remove(os.path.join(self.root, name))
+                except OSError:
+                    pass
+
+    def _load_index(self) -> OrderedDict:
+        try:
+            with open(os.path.join(self.root, INDEX_FILE), encoding="utf-8") as f:
+                items = json.load(f)
+        except (OSError, ValueError):
+            return OrderedDict()
+        # forget entries whose file has gone missing or changed size
+        return OrderedDict(
+            (k, e) for k, e in items
+            if os.path.exists(self._path(k)) and os.path.getsize(self._path(k)) == e["bytes"]
+        )
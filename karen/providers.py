@@ -0,0 +1,99 @@
+"""Registry of STT, LLM and TTS backends, imported on first use.
+
+Built-in backends are registered as "module:attribute" strings and only
+imported when that provider is opened, off the event loop, so importing
+karen.main does not load any vendor SDK and an unused provider costs
+nothing. Other packages add providers through entry points in the groups
+"karen.stt", "karen.llm" and "karen.tts", e.g. in their pyproject.toml:
+
+    [project.entry-points."karen.tts"]
+    piper = "karen_piper:PiperTTS"
+
+and are then selected with TTS_PROVIDER=piper. A backend is constructed
+with no arguments, opened with `await open()` and released with
+`await close()`. Per kind it provides:
+
+    stt: transcribe(audio, rate) -> str
+         open_stream(rate, on_partial) -> stream or None (see stt.STT.finish)
+    llm: deltas(messages, max_tokens) -> async iterator of text deltas
+         complete(messages, max_tokens) -> str
+    tts: synth(text) -> async iterator of 16-bit mono PCM bytes at tts.TTS_RATE
+
+and optionally warm(), to open connections ahead of a turn.
+"""
+import asyncio
+from importlib import import_module, metadata
+from .config import settings
+
+class Registry:
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._specs: dict[str, str | type] = {}
+        self._discovered = False
+
+    def register(self, name: str, spec: str | type):
+        """Add a backend class, or "module:attribute" to import on first use."""
+        self._specs[name] = spec
+
+    def names(self) -> list[str]:
+        self._discover()
+        return sorted(self._specs)
+
+    def resolve(self, name: str) -> type:
+        """The backend class for `name`, importing it if needed."""
+        spec = self._specs.get(name)
+        if spec is None:
+            self._discover()
+            spec = self._specs.get(name)
+        if spec is None:
+            raise NotImplementedError(f"{self.kind.upper()} provider '{name}' not implemented")
+        if isinstance(spec, str):
+            module, _, attr = spec.partition(":")
+            spec = self._specs[name] = getattr(import_module(module), attr)
+        return spec
+
+    async def create(self, name: str):
+        """Import (in a worker thread), construct and open the backend `name`."""
+        cls = await asyncio.to_thread(self.resolve, name)
+        backend = cls()
+        await backend.open()
+        return backend
+
+    def _discover(self):
+        if self._discovered:
+            return
+        self._discovered = True
+        for ep in metadata.entry_points(group=f"karen.{self.kind}"):
+            self._specs.setdefault(ep.name, ep.value)
+
+stt = Registry("stt")
+stt.register("openai", "karen.openai_provider:OpenAISTT")
+stt.register("stub", "karen.stubs:StubSTT")
+
+llm = Registry("llm")
+llm.register("openai", "karen.openai_provider:OpenAILLM")
+llm.register("stub", "karen.stubs:StubLLM")
+
+tts = Registry("tts")
+tts.register("openai", "karen.openai_provider:OpenAITTS")
+tts.register("stub", "karen.stubs:StubTTS")
+
+class Frontend:
+    """Base for STT, LLM and TTS: opens the configured backend on __aenter__."""
+    registry: Registry
+    setting: str        # name of the settings field selecting the provider
+    backend = None
+
+    async def __aenter__(self):
+        self.backend = await self.registry.create(getattr(settings, self.setting))
+        return self
+
+    async def __aexit__(self, *a):
+        if self.backend:
+            backend, self.backend = self.backend, None
+            await backend.close()
+
+    def warm(self):
+        """Open connections ahead of a turn, if the backend keeps any."""
+        if hasattr(self.backend, "warm"):
+            self.backend.warm()
@@ -0,0 +1,309 @@
+# Qt window with the GIF mouth; imported by ui.UI only when PySide6 is installed.
+from __future__ import annotations
+import asyncio, collections, os, signal, sys, threading, time
+from datetime import datetime
+import numpy as np
+from PySide6 import QtCore, QtGui, QtWidgets
+from .config import settings
+from .metrics import metrics, tracer
+
+_COLOURS = {"You": "#d9f1ff", "Karen": "#8fd3ff", "*": "#7f93a8", "!": "#e67e22"}
+
+class TranscriptModel(QtCore.QAbstractListModel):
+    """The last `capacity` transcript lines, oldest first.
+
+    Each row's wrapped height is measured once and kept (SizeHintRole), so
+    the view's relayout after an insert doesn't lay out every line's text
+    again; a new wrap width drops the measurements.
+    """
+    def __init__(self, capacity: int, parent: QtCore.QObject | None = None):
+        super().__init__(parent)
+        self.capacity = max(1, capacity)
+        self._rows: collections.deque[list] = collections.deque()  # [who, line, QSize | None]
+        self._brushes = {who: QtGui.QBrush(QtGui.QColor(c)) for who, c in _COLOURS.items()}
+        self._metrics: QtGui.QFontMetrics | None = None
+        self._width = 0
+
+    def set_wrap(self, metrics: QtGui.QFontMetrics, width: int):
+        if width == self._width and self._metrics == metrics:
+            return
+        self._metrics, self._width = metrics, width
+        self.layoutAboutToBeChanged.emit()
+        for row in self._rows:
+            row[2] = None
+        self.layoutChanged.emit()
+
+    def rowCount(self, parent=QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        if role == QtCore.Qt.DisplayRole:
+            return row[1]
+        if role == QtCore.Qt.ForegroundRole:
+            return self._brushes.get(row[0])
+        if role == QtCore.Qt.SizeHintRole and self._metrics is not None:
+            if row[2] is None:
+                r = self._metrics.boundingRect(0, 0, self._width, 1 << 20, QtCore.Qt.TextWordWrap, row[1])
+                row[2] = QtCore.QSize(self._width, r.height() + 4)
+            return row[2]
+        return None
+
+    def extend(self, rows: list[tuple[str, str]]):
+        """Append (who, line) rows, dropping the oldest beyond capacity."""
+        rows = rows[-self.capacity:]
+        if not rows:
+            return
+        drop = len(self._rows) + len(rows) - self.capacity
+        if drop > 0:
+            self.beginRemoveRows(QtCore.QModelIndex(), 0, drop - 1)
+            for _ in range(drop):
+                self._rows.popleft()
+            self.endRemoveRows()
+        n = len(self._rows)
+        self.beginInsertRows(QtCore.QModelIndex(), n, n + len(rows) - 1)
+        self._rows.extend([who, line, None] for who, line in rows)
+        self.endInsertRows()
+
+class _TranscriptView(QtWidgets.QListView):
+    """Word-wrapped transcript that stays scrolled to the newest line."""
+    def __init__(self, model: TranscriptModel):
+        super().__init__()
+        self.setModel(model)
+        self.setWordWrap(True)
+        self.setLayoutMode(QtWidgets.QListView.Batched)
+        self.setBatchSize(64)
+        self.setVerticalScrollMode(QtWidgets.QAbstractItemView.ScrollPerPixel)
+        self.setSelectionMode(QtWidgets.QAbstractItemView.NoSelection)
+        self.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.setFocusPolicy(QtCore.Qt.NoFocus)
+        bar = self.verticalScrollBar()
+        bar.rangeChanged.connect(lambda lo, hi: bar.setValue(hi))
+    def resizeEvent(self, e):
+        # the item delegate pads the text by a few pixels on each side
+        self.model().set_wrap(self.fontMetrics(), self.viewport().width() - 8)
+        super().resizeEvent(e)
+
+class _MouthView(QtWidgets.QWidget):
+    """One of the mouth sprites, centered. Changing it repaints only this widget."""
+    def __init__(self, frames: list[QtGui.QPixmap]):
+        super().__init__()
+        self.frames = frames
+        self.index = 0
+        self.setMinimumSize(frames[0].size())
+    def show_frame(self, i: int):
+        if i != self.index:
+            self.index = i
+            self.update()
+    def paintEvent(self, e):
+        pix = self.frames[self.index]
+        p = QtGui.QPainter(self)
+        p.drawPixmap((self.width() - pix.width()) // 2, (self.height() - pix.height()) // 2, pix)
+        p.end()
+
+class _KarenWindow(QtWidgets.QMainWindow):
+    quit_requested = QtCore.Signal()
+
+    def __init__(self, gif_path: str):
+        super().__init__()
+        self.setWindowTitle("Karen")
+        self.setCursor(QtCore.Qt.BlankCursor)
+        self.setStyleSheet("background: #070a0f; color: #d9f1ff; font-family: Inter, Arial;")
+        self.setWindowFlag(QtCore.Qt.FramelessWindowHint)
+        self.showFullScreen()
+        # ESC and Ctrl+Alt+Q to quit cleanly (works under systemd too)
+        esc = QtGui.QShortcut(QtGui.QKeySequence("Esc"), self)
+        esc.activated.connect(self.quit_requested)
+        quit_combo = QtGui.QShortcut(QtGui.QKeySequence("Ctrl+Alt+Q"), self)
+        quit_combo.activated.connect(self.quit_requested)
+        # central layout
+        central = QtWidgets.QWidget()
+        self.setCentralWidget(central)
+        v = QtWidgets.QVBoxLayout(central)
+        v.setContentsMargins(40,40,40,40)
+        v.setSpacing(16)
+        # top bar: state + net dot
+        top = QtWidgets.QHBoxLayout()
+        self.state_lbl = QtWidgets.QLabel("IDLE")
+        self.state_lbl.setStyleSheet("""font-size: 18pt; letter-spacing: 2px;""")
+        top.addWidget(self.state_lbl)
+        top.addStretch(1)
+        self.net_dot = QtWidgets.QLabel("●")
+        self.net_dot.setStyleSheet("font-size: 18pt; color: #2ecc71;")
+        top.addWidget(self.net_dot)
+        v.addLayout(top)
+        # live transcript while the user is talking
+        self.partial_lbl = QtWidgets.QLabel("")
+        self.partial_lbl.setStyleSheet("font-size: 14pt; color: #7f93a8;")
+        v.addWidget(self.partial_lbl)
+        # GIF mouth: sprites decoded once; the one shown follows the audio (see QtUI.set_mouth)
+        self.mouth_frames = _mouth_atlas(gif_path, settings.UI_MOUTH_FRAMES) if os.path.exists(gif_path) else []
+        if self.mouth_frames:
+            self.mouth = _MouthView(self.mouth_frames)
+        else:
+            self.mouth = QtWidgets.QLabel("(missing assets/karen_mouth.gif)")
+            self.mouth.setAlignment(QtCore.Qt.AlignCenter)
+        v.addWidget(self.mouth, 1)
+        # transcript: a bounded model; the view only lays out and paints visible rows
+        self.transcript_model = TranscriptModel(settings.UI_TRANSCRIPT_LINES, self)
+        self.transcript = _TranscriptView(self.transcript_model)
+        self.transcript.setStyleSheet("""background: #0c1118; border: 1px solid #1c2430; font-size: 12pt;""")
+        v.addWidget(self.transcript, 1)
+        # latency overlay (TRACE_OVERLAY), floats over the top-right corner
+        self.trace_lbl = QtWidgets.QLabel(self)
+        self.trace_lbl.setStyleSheet("background: rgba(7,10,15,200); color: #7f93a8; font: 9pt monospace; padding: 6px;")
+        self.trace_lbl.hide()
+    def show_trace(self, text: str):
+        self.trace_lbl.setText(text)
+        self.trace_lbl.adjustSize()
+        self.trace_lbl.move(self.width() - self.trace_lbl.width() - 12, 12)
+        self.trace_lbl.show()
+        self.trace_lbl.raise_()
+    def set_state(self, state: str):
+        self.state_lbl.setText(state.upper())
+        if state.lower() != "listening":
+            self.partial_lbl.setText("")
+    def show_mouth(self, i: int):
+        if self.mouth_frames:
+            self.mouth.show_frame(i)
+    def append(self, rows: list[tuple[str, str]]):
+        self.transcript_model.extend(rows)
+    def set_net_ok(self, ok: bool):
+        self.net_dot.setStyleSheet("font-size: 18pt; color: %s;" % ("#2ecc71" if ok else "#e67e22"))
+
+def _mouth_atlas(gif_path: str, count: int) -> list[QtGui.QPixmap]:
+    """Up to `count` frames of the mouth GIF, ordered from closed to open.
+
+    The first frame is the mouth at rest; the others are ranked by how much
+    they differ from it.
+    """
+    reader = QtGui.QImageReader(gif_path)
+    images = []
+    while (image := reader.read()) and not image.isNull():
+        images.append(image.convertToFormat(QtGui.QImage.Format_RGB32))
+    if not images:
+        return []
+    pixels = [np.frombuffer(im.constBits(), dtype=np.uint8, count=im.sizeInBytes())[::16].astype(np.int16)
+              for im in images]
+    rank = np.argsort([np.abs(p - pixels[0]).mean() for p in pixels], kind="stable")
+    keep = rank[np.round(np.linspace(0, len(rank) - 1, min(count, len(rank)))).astype(int)]
+    return [QtGui.QPixmap.fromImage(images[i]) for i in keep]
+
+class QtUI:
+    """The Qt window, driven from the asyncio loop it was created on.
+
+    The public methods only record what changed, so they are cheap and safe
+    to call from any thread. Once per frame (UI_FPS) everything recorded
+    since the last one is applied in one go (the latest state, partial
+    text, network dot and overlay, and the new transcript lines) and Qt
+    processes its events, so a burst of calls costs at most one repaint.
+    With set_mouth(), the mouth sprite is picked from what the speaker is
+    playing, at most LIPSYNC_FPS times a second.
+    Created outside a running loop, a QTimer applies the updates instead
+    and whoever runs QApplication.exec() drives it.
+    """
+    def __init__(self, gif_path: str = "assets/karen_mouth.gif"):
+        self._app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+        self.win = _KarenWindow(gif_path)
+        self.frame_s = 1.0 / settings.UI_FPS
+        self._lock = threading.Lock()
+        self._pending: dict[str, object] = {}
+        self._rows: list[tuple[str, str]] = []
+        self._timer = self._handle = None
+        self._mouth = None
+        self.mouth_s = 1.0 / min(settings.LIPSYNC_FPS, settings.UI_FPS)
+        self._mouth_slot = -1
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+            self.win.quit_requested.connect(QtWidgets.QApplication.quit)
+            self._timer = QtCore.QTimer()
+            self._timer.timeout.connect(self._frame)
+            self._timer.start(int(self.frame_s * 1000))
+        else:
+            # there is no QApplication.exec() here, so quit the way Ctrl+C does
+            self.win.quit_requested.connect(lambda: signal.raise_signal(signal.SIGINT))
+            self._handle = self._loop.call_soon(self._tick)
+
+    def close(self):
+        if self._handle:
+            self._handle.cancel()
+        if self._timer:
+            self._timer.stop()
+        self.win.close()
+        self._app.processEvents()
+
+    def set_mouth(self, mouth):
+        """Drive the mouth from a LipSync fed by the Speaker."""
+        self._mouth = mouth
+
+    # Public API used by the app
+    def set_state(self, state: str):
+        with self._lock:
+            self._pending["state"] = state
+            if state.lower() != "listening":
+                self._pending.pop("partial", None)
+        metrics.inc("ui.updates")
+    def show_user(self, text: str): self._append("You", text)
+    def show_partial(self, text: str): self._post("partial", text)
+    def show_karen(self, text: str): self._append("Karen", text)
+    def toast(self, msg: str): self._append("*", msg)
+    def error(self, msg: str): self._append("!", msg)
+    def ping(self): pass
+    def set_net_ok(self, ok: bool): self._post("net", ok)
+    def show_trace(self, text: str): self._post("trace", text)
+
+    def _post(self, key: str, value):
+        with self._lock:
+            self._pending[key] = value
+        metrics.inc("ui.updates")
+
+    def _append(self, who: str, text: str):
+        row = (who, f"[{datetime.now():%H:%M:%S}] {who}: {text}")
+        cap = self.win.transcript_model.capacity
+        with self._lock:
+            self._rows.append(row)
+            if len(self._rows) > 2 * cap:  # the loop is stalled; only the last cap rows can show
+                del self._rows[:-cap]
+        metrics.inc("ui.updates")
+
+    def _tick(self):
+        t0 = time.perf_counter()
+        self._frame()
+        self._app.processEvents()
+        dt = time.perf_counter() - t0
+        tracer.observe("ui.frame_ms", dt * 1000.0)
+        self._handle = self._loop.call_later(max(0.0, self.frame_s - dt), self._tick)
+
+    def _frame(self):
+        self._flush()
+        if self._mouth is None or not self.win.mouth_frames:
+            return
+        now = time.monotonic()
+        slot = int(now / self.mouth_s)
+        if slot != self._mouth_slot:
+            self._mouth_slot = slot
+            self.win.show_mouth(self._mouth.frame(now, len(self.win.mouth_frames)))
+
+    def _flush(self):
+        """Apply everything recorded since the last frame."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            rows, self._rows = self._rows, []
+        if not pending and not rows:
+            return
+        win = self.win
+        if "state" in pending:
+            win.set_state(pending["state"])
+        if "partial" in pending:
+            win.partial_lbl.setText(pending["partial"])
+        if rows:
+            win.append(rows)
+        if "net" in pending:
+            win.set_net_ok(pending["net"])
+        if "trace" in pending:
+            win.show_trace(pending["trace"])
+        metrics.inc("ui.flushes")
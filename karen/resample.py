@@ -0,0 +1,103 @@
+from functools import lru_cache
+from math import gcd
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+TAPS_PER_PHASE = 64
+ROLLOFF = 0.9       # cutoff as a fraction of the lower Nyquist
+KAISER_BETA = 8.0   # ~80 dB stopband
+
+def _centre(n: int) -> int:
+    # filters are odd-length (zero-padded to n) so the centre is a whole sample
+    return (n - 2 + n % 2) // 2
+
+@lru_cache(maxsize=16)
+def filter_bank(up: int, down: int, taps: int = TAPS_PER_PHASE) -> np.ndarray:
+    """Windowed-sinc lowpass split into `up` polyphase branches.
+    Row p holds h[p + k*up] for k = taps-1..0, i.e. time-reversed so a row can
+    be dotted directly with an input window in ascending time order.
+    """
+    n = up * taps
+    odd = n - 1 + n % 2
+    m = np.arange(odd, dtype=np.float64) - _centre(n)
+    fc = ROLLOFF * 0.5 / max(up, down)  # cycles per upsampled sample
+    h = np.zeros(n, dtype=np.float64)
+    h[:odd] = 2.0 * fc * np.sinc(2.0 * fc * m) * np.kaiser(odd, KAISER_BETA)
+    h *= up / h.sum()  # unity DC gain after zero-stuffing
+    return np.ascontiguousarray(h.reshape(taps, up).T[:, ::-1], dtype=np.float32)
+
+# precompute the banks used on the TTS/mic paths
+for _src, _dst in ((24000, 16000), (24000, 48000), (16000, 48000)):
+    _g = gcd(_src, _dst)
+    filter_bank(_dst // _g, _src // _g)
+
+class Resampler:
+    """Streaming polyphase resampler for mono float32 audio.
+
+    Filter history and fractional output phase carry over between calls, so
+    feeding a signal in arbitrary chunks gives the same samples as feeding it
+    in one piece (no clicks at chunk edges). Output is aligned with the input
+    (filter delay is compensated); call flush() at the end to drain the tail.
+    """
+    def __init__(self, from_rate: int, to_rate: int, taps: int = TAPS_PER_PHASE):
+        g = gcd(from_rate, to_rate)
+        self.from_rate, self.to_rate = from_rate, to_rate
+        self.up, self.down = to_rate // g, from_rate // g
+        self.passthrough = from_rate == to_rate
+        self.taps = taps
+        self._bank = filter_bank(self.up, self.down, taps)
+        self._delay = _centre(self.up * taps)
+        self._xh = np.zeros(taps - 1 + 4096, dtype=np.float32)  # history + chunk
+        self._t = self._delay  # upsampled index of the next output, relative to chunk start
+        self._n_in = 0
+        self._n_out = 0
+
+    def reset(self):
+        self._xh[:self.taps - 1] = 0.0
+        self._t = self._delay
+        self._n_in = self._n_out = 0
+
+    def out_len(self, n_in: int) -> int:
+        """Number of samples the next process() call will return for n_in inputs."""
+        total = n_in * self.up
+        return max(0, -(-(total - self._t) // self.down))
+
+    def process(self, x: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+        if self.passthrough:
+            return x.astype(np.float32, copy=False)
+        n = len(x)
+        k = self.taps
+        count = self.out_len(n)
+        if out is None:
+            out = np.empty(count, dtype=np.float32)
+        else:
+            out = out[:count]
+        if len(self._xh) < k - 1 + n:
+            grown = np.zeros(k - 1 + n, dtype=np.float32)
+            grown[:k - 1] = self._xh[:k - 1]
+            self._xh = grown
+        xh = self._xh
+        xh[k - 1:k - 1 + n] = x
+        if count:
+            windows = sliding_window_view(xh[:k - 1 + n], k)
+            # outputs q, q+up, q+2*up, ... share a phase and step `down` inputs apart
+            for q in range(min(self.up, count)):
+                t = self._t + q * self.down
+                i0, p = divmod(t, self.up)
+                cnt = len(range(q, count, self.up))
+                np.matmul(windows[i0:i0 + (cnt - 1) * self.down + 1:self.down], self._bank[p], out=out[q::self.up])
+        self._t += count * self.down - n * self.up
+        self._n_in += n
+        self._n_out += count
+        # keep the last k-1 inputs as history for the next chunk
+        xh[:k - 1] = xh[n:n + k - 1]
+        return out
+
+    def flush(self) -> np.ndarray:
+        """Emit the samples still held back by the filter delay."""
+        if self.passthrough:
+            return np.zeros(0, dtype=np.float32)
+        owed = -(-self._n_in * self.up // self.down) - self._n_out
+        y = self.process(np.zeros(self._delay // self.up + 1, dtype=np.float32))[:max(0, owed)]
+        self.reset()
+        return y
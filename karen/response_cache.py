@@ -0,0 +1,128 @@
+import json, os, re, time
+from collections import OrderedDict
+from .config import settings
+from .metrics import metrics
+
+# disfluencies only: anything that can change the meaning stays in the key
+FILLER_WORDS = {"um", "umm", "uh", "uhh", "er", "erm", "hmm", "hmmm", "please"}
+SYNONYMS = {
+    "whats": "what is", "what's": "what is", "wats": "what is",
+    "hows": "how is", "how's": "how is", "its": "it is", "it's": "it is",
+    "tell": "say", "gimme": "give", "jokes": "joke",
+}
+# (pattern on the normalized query, ttl seconds); 0 means never cache
+TTL_RULES = [
+    (re.compile(r"\b(time|date|day|today|tonight|tomorrow|now|timer|alarm)\b"), 0.0),
+    (re.compile(r"\b(weather|temperature|rain|forecast)\b"), 900.0),
+]
+_PUNCT = re.compile(r"[^\w\s']+")
+_ADDRESS = re.compile(r"^(?:(?:hey|ok|okay)\s+)?karen\b")
+# questions that only make sense after the previous turn are never cached:
+# they must have RESPONSE_CACHE_MIN_WORDS words that count (see
+# FUNCTION_WORDS), none of these words, and not be one of FOLLOW_UP_PHRASES
+FOLLOW_UPS = {
+    "why", "more", "again", "else", "yes", "yeah", "yep", "no", "nope", "ok", "okay",
+    "it", "that", "this", "those", "these", "them", "they", "he", "she", "him", "her",
+    "then", "also", "too", "same", "instead", "previous", "last", "before", "earlier",
+    "ask", "asked", "said", "mean", "meant", "continue", "really", "sure",
+}
+FOLLOW_UP_PHRASES = re.compile(r"^(?:how come|how about (?:you|me)|and (?:you|me)|what for|go on)$")
+# glue that doesn't count towards RESPONSE_CACHE_MIN_WORDS; pronouns, question
+# words and "say" (from "tell") do count: "who are you" and "tell me a joke"
+# are whole questions
+FUNCTION_WORDS = {
+    "a", "an", "the", "is", "are", "am", "was", "were", "be", "do", "does", "did",
+    "can", "could", "would", "will", "should", "to", "of", "in", "on", "for", "with",
+    "and", "or", "just", "so",
+}
+
+def normalize(text: str) -> str:
+    """Canonical form of a query for cache lookups."""
+    words = []
+    for w in _ADDRESS.sub(" ", _PUNCT.sub(" ", text.lower()).strip()).split():
+        w = SYNONYMS.get(w, w)
+        words.extend(x for x in w.split() if x not in FILLER_WORDS)
+    return " ".join(w.replace("'", "") for w in words)
+
+def standalone(key: str) -> bool:
+    """Whether a normalized query makes sense without the conversation before it."""
+    words = key.split()
+    if FOLLOW_UP_PHRASES.match(key) or any(w in FOLLOW_UPS for w in words):
+        return False
+    return sum(w not in FUNCTION_WORDS for w in words) >= settings.RESPONSE_CACHE_MIN_WORDS
+
+class ResponseCache:
+    """Replies to repeated questions, keyed on the normalized transcript.
+
+    Entries expire after a per-query TTL (see TTL_RULES; time-sensitive
+    questions are never cached, nor are follow-ups like "why?" that depend on
+    the conversation, see standalone()) and the least recently used are evicted
+    beyond RESPONSE_CACHE_MAX_ENTRIES. Only reply sentences are stored here;
+    their audio lives in the TTS phrase cache, so a hit skips both the LLM and
+    TTS. Optionally persisted to RESPONSE_CACHE_PATH across restarts.
+    """
+    def __init__(self, path: str | None = None, max_entries: int | None = None):
+        self.path = path if path is not None else settings.RESPONSE_CACHE_PATH
+        self.max_entries = max_entries or settings.RESPONSE_CACHE_MAX_ENTRIES
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._load()
+
+    def ttl(self, key: str) -> float:
+        for pattern, ttl in TTL_RULES:
+            if pattern.search(key):
+                return ttl
+        return settings.RESPONSE_CACHE_TTL_S
+
+    def cacheable(self, text: str) -> bool:
+        return self._cacheable(normalize(text))
+
+    def _cacheable(self, key: str) -> bool:
+        return bool(key) and standalone(key) and self.ttl(key) > 0
+
+    def get(self, text: str) -> list[str] | None:
+        key = normalize(text)
+        if not self._cacheable(key):
+            return None
+        entry = self._entries.get(key)
+        if entry is None or entry["expires"] < time.time():
+            if entry is not None:
+                del self._entries[key]
+            metrics.inc("response_cache.misses")
+            return None
+        self._entries.move_to_end(key)
+        metrics.inc("response_cache.hits")
+        return entry["sentences"]
+
+    def put(self, text: str, sentences: list[str]):
+        key = normalize(text)
+        if not sentences or not self._cacheable(key):
+            return
+        ttl = self.ttl(key)
+        self._entries[key] = {"sentences": sentences, "expires": time.time() + ttl}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._save()
+
+    def hit_rate(self) -> float:
+        hits, misses = metrics.get("response_cache.hits"), metrics.get("response_cache.misses")
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                items = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        self._entries = OrderedDict((k, e) for k, e in items if e["expires"] > now)
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(list(self._entries.items()), f)
+        os.replace(tmp, self.path)
@@ -1,36 +1,35 @@
-import io, wave
-import openai
+from typing import Callable
 import numpy as np
 from .config import settings
+from .metrics import metrics, tracer
+from . import netwatch, providers
 
-class STT:
-    client: openai.AsyncOpenAI | None = None
+class STT(providers.Frontend):
+    """Speech to text through the STT_PROVIDER backend."""
+    registry = providers.stt
+    setting = "STT_PROVIDER"
 
-    async def __aenter__(self):
-        if settings.STT_PROVIDER == "openai":
-            if not settings.OPENAI_API_KEY:
-                raise ValueError("OPENAI_API_KEY is not set in environment")
-            self.client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-        return self
+    def open_stream(self, rate: int, on_partial: Callable[[str], None] | None = None):
+        """Start a streaming session, or None if streaming isn't available."""
+        if not settings.STT_STREAMING or not hasattr(self.backend, "open_stream"):
+            return None
+        return self.backend.open_stream(rate, on_partial)
 
-    async def __aexit__(self, *a):
-        if self.client:
-            await self.client.close()
+    async def finish(self, stream, audio: np.ndarray, rate: int) -> str:
+        """Final transcript from the stream, falling back to a batch upload."""
+        text = None
+        if stream is not None:
+            try:
+                with netwatch.reporting():
+                    text = await stream.finish()
+            except Exception as e:
+                metrics.inc("stt.stream_fallbacks")
+                print(f"[stt] Streaming failed ({e!r}); using batch upload.")
+        if text is None:
+            text = await self.transcribe(audio, rate)
+        tracer.mark("transcribed")
+        return text
 
     async def transcribe(self, audio: np.ndarray, rate: int) -> str:
-        if settings.STT_PROVIDER == "openai":
-            assert self.client is not None
-            audio16 = np.clip(audio, -1.0, 1.0)
-            audio16 = (audio16 * 32767.0).astype(np.int16)
-            wav_bytes = io.BytesIO()
-            with wave.open(wav_bytes, "wb") as wf:
-                wf.setnchannels(1); wf.setsampwidth(2); wf.setframerate(rate)
-                wf.writeframes(audio16.tobytes())
-            wav_bytes.seek(0)
-            file_tuple = ("audio.wav", wav_bytes)
-            tr = await self.client.audio.transcriptions.create(
-                model="gpt-4o-mini-transcribe",
-                file=file_tuple,
-            )
-            return tr.text or ""
-        raise NotImplementedError(f"STT provider '{settings.STT_PROVIDER}' not implemented")
+        with netwatch.reporting():
+            return await self.backend.transcribe(audio, rate)
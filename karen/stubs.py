@@ -0,0 +1,139 @@
+"""Offline stand-ins for the STT, LLM and TTS APIs (provider "stub").
+
+Selected with STT_PROVIDER / LLM_PROVIDER / TTS_PROVIDER = "stub" (the
+StubSTT / StubLLM / StubTTS backends at the bottom). Nothing
+touches the network: each request sleeps for a latency drawn from a
+lognormal distribution around the configured median (STUB_*_MS, spread
+STUB_JITTER), streams its output the way the real API does, and fails with
+probability STUB_FAILURE_RATE. Draws come from one seeded generator, so a
+run with the same inputs makes the same draws in the same order.
+
+Every utterance transcribes to `transcript` (a harness sets it to match the
+audio it plays), or to STUB_TRANSCRIPT while that is None.
+"""
+import asyncio, math, random, re
+from typing import AsyncGenerator, Callable
+import numpy as np
+from .config import settings
+from .metrics import metrics
+
+TTS_RATE = 24000      # same pcm16 stream format as the OpenAI TTS API
+CHAR_S = 0.065        # spoken length per character of text
+
+rng = random.Random(settings.STUB_SEED)
+transcript: str | None = None
+
+def seed(n: int):
+    rng.seed(n)
+
+def latency(median_ms: float) -> float:
+    """A latency in seconds around `median_ms`."""
+    if median_ms <= 0:
+        return 0.0
+    return median_ms / 1000.0 * math.exp(rng.gauss(0.0, settings.STUB_JITTER))
+
+def check_failure(stage: str):
+    if rng.random() < settings.STUB_FAILURE_RATE:
+        metrics.inc(f"stub.{stage}_failures")
+        raise ConnectionError(f"stub {stage} request failed")
+
+def current_transcript() -> str:
+    return transcript if transcript is not None else settings.STUB_TRANSCRIPT
+
+class STTStream:
+    """Streaming transcription session with the interface of stt.STTStream.
+
+    Audio is accepted while the user talks; a word of partial transcript is
+    revealed per second of audio and finish() returns the final transcript
+    STUB_STT_FINAL_MS after the commit.
+    """
+    def __init__(self, rate: int, on_partial: Callable[[str], None] | None = None):
+        self.rate = rate
+        self.on_partial = on_partial
+        self.partial = ""
+        self._text = current_transcript()
+        self._samples = 0
+
+    def feed(self, audio: np.ndarray):
+        self._samples += len(audio)
+        words = self._text.split()[:self._samples // self.rate]
+        partial = " ".join(words)
+        if partial != self.partial:
+            self.partial = partial
+            if self.on_partial:
+                self.on_partial(partial)
+
+    async def finish(self, timeout: float | None = None) -> str:
+        timeout = timeout if timeout is not None else settings.STT_FINAL_TIMEOUT_S
+        delay = latency(settings.STUB_STT_FINAL_MS)
+        check_failure("stt")
+        if delay > timeout:
+            await asyncio.sleep(timeout)
+            raise asyncio.TimeoutError()
+        await asyncio.sleep(delay)
+        return self._text
+
+    async def close(self):
+        pass
+
+async def transcribe(audio: np.ndarray, rate: int) -> str:
+    """Batch transcription: the upload scales with the audio, then a fixed latency."""
+    text = current_transcript()
+    seconds = len(audio) / rate
+    await asyncio.sleep(latency(settings.STUB_STT_MS) + seconds * settings.STUB_STT_MS_PER_S / 1000.0)
+    check_failure("stt")
+    return text
+
+async def complete(messages: list[dict], max_tokens: int = 180) -> AsyncGenerator[str, None]:
+    """Stream STUB_REPLY, about the last user message, as word-sized token deltas."""
+    await asyncio.sleep(latency(settings.STUB_LLM_FIRST_TOKEN_MS))
+    check_failure("llm")
+    reply = settings.STUB_REPLY.replace("{text}", messages[-1]["content"])
+    for token in re.findall(r"\S+\s*", reply)[:max_tokens]:
+        yield token
+        await asyncio.sleep(latency(settings.STUB_LLM_TOKEN_MS))
+
+def voice(text: str) -> np.ndarray:
+    """Speech-shaped pcm16 at TTS_RATE: harmonic syllables, CHAR_S per character."""
+    n = max(1, int(len(text) * CHAR_S * TTS_RATE))
+    t = np.arange(n) / TTS_RATE
+    f0 = 140.0 + 20.0 * (len(text) % 5)
+    tone = sum(np.sin(2 * np.pi * f0 * h * t) / h for h in range(1, 6))
+    syllables = np.sin(np.pi * 4.0 * t) ** 2
+    return (tone * syllables * 0.15 * 32767.0).astype(np.int16)
+
+async def synth(text: str) -> AsyncGenerator[bytes, None]:
+    """Stream pcm16 bytes STUB_TTS_SPEED times faster than real time, in odd-sized chunks."""
+    await asyncio.sleep(latency(settings.STUB_TTS_FIRST_BYTE_MS))
+    check_failure("tts")
+    data = voice(text).tobytes()
+    chunk = 4097  # network chunks need not hold whole samples
+    per_chunk = chunk / 2 / TTS_RATE / max(settings.STUB_TTS_SPEED, 1e-3)
+    for i in range(0, len(data), chunk):
+        yield data[i:i + chunk]
+        await asyncio.sleep(per_chunk)
+
+class _StubBackend:
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+class StubSTT(_StubBackend):
+    def open_stream(self, rate: int, on_partial: Callable[[str], None] | None = None) -> STTStream:
+        return STTStream(rate, on_partial)
+
+    async def transcribe(self, audio: np.ndarray, rate: int) -> str:
+        return await transcribe(audio, rate)
+
+class StubLLM(_StubBackend):
+    def deltas(self, messages: list[dict], max_tokens: int) -> AsyncGenerator[str, None]:
+        return complete(messages, max_tokens)
+
+    async def complete(self, messages: list[dict], max_tokens: int) -> str:
+        return "".join([d async for d in complete(messages, max_tokens)])
+
+class StubTTS(_StubBackend):
+    def synth(self, text: str) -> AsyncGenerator[bytes, None]:
+        return synth(text)
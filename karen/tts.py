@@ -1,10 +1,19 @@
+import time
 import numpy as np
-from typing import AsyncGenerator
-import openai
+from typing import AsyncGenerator, AsyncIterator, Iterator
 from .config import settings
+from .metrics import metrics, tracer
+from .resample import Resampler
+from .phrase_cache import PhraseCache
+from . import netwatch, providers
+
+TTS_RATE = 24000   # backend pcm output: 24kHz, 16-bit mono
 
 def resample(audio: np.ndarray, from_rate: int, to_rate: int) -> np.ndarray:
-    """Simple linear resampler using numpy.interp."""
+    """Simple linear resampler using numpy.interp.
+    One-shot only; streams should use resample.Resampler, which keeps phase
+    and filter state across chunks.
+    """
     if from_rate == to_rate or len(audio) == 0:
         return audio.astype(np.float32, copy=False)
     secs = len(audio) / from_rate
@@ -16,42 +25,134 @@ def resample(audio: np.ndarray, from_rate: int, to_rate: int) -> np.ndarray:
     y = np.interp(x_new, x_old, audio.astype(np.float32))
     return y.astype(np.float32)
 
-class TTS:
-    client: openai.AsyncOpenAI | None = None
+class PcmFramer:
+    """Reassembles an int16 byte stream into fixed-size float32 frames.
+    Network chunks may end anywhere, including mid-sample; bytes are copied
+    once into a preallocated frame buffer and never re-concatenated.
+    """
+    def __init__(self, frame_samples: int):
+        self._buf = bytearray(frame_samples * 2)
+        self._fill = 0
+
+    def feed(self, data: bytes) -> Iterator[np.ndarray]:
+        mv = memoryview(data)
+        size = len(self._buf)
+        while mv:
+            n = min(size - self._fill, len(mv))
+            self._buf[self._fill:self._fill + n] = mv[:n]
+            self._fill += n
+            mv = mv[n:]
+            if self._fill == size:
+                self._fill = 0
+                yield np.frombuffer(self._buf, dtype=np.int16).astype(np.float32) / 32768.0
+
+    def flush(self) -> np.ndarray | None:
+        # a trailing odd byte is half a sample; drop it
+        n = self._fill - (self._fill % 2)
+        self._fill = 0
+        if n == 0:
+            return None
+        return np.frombuffer(self._buf, dtype=np.int16, count=n // 2).astype(np.float32) / 32768.0
+
+class TTS(providers.Frontend):
+    """Text to speech through the TTS_PROVIDER backend, with a phrase cache."""
+    registry = providers.tts
+    setting = "TTS_PROVIDER"
+    cache: PhraseCache | None = None
 
     async def __aenter__(self):
-        if settings.TTS_PROVIDER == "openai":
-            if not settings.OPENAI_API_KEY:
-                raise ValueError("OPENAI_API_KEY is not set in environment")
-            self.client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        await super().__aenter__()
+        if settings.TTS_CACHE_DIR:
+            self.cache = PhraseCache()
         return self
 
     async def __aexit__(self, *a):
-        if self.client:
-            await self.client.close()
-
-    async def stream(self, text: str) -> AsyncGenerator[np.ndarray, None]:
-        """Yield PCM chunks (float32, mono, [-1,1]) at settings.SAMPLE_RATE."""
-        if settings.TTS_PROVIDER == "openai":
-            assert self.client is not None
-            # Request raw PCM (24kHz, 16-bit mono). We'll chunk and resample.
-            resp = await self.client.audio.speech.create(
-                model="gpt-4o-mini-tts",
-                voice="sage",
-                input=text,
-                response_format="pcm",
-            )
-            pcm_bytes: bytes = resp.read() if hasattr(resp, "read") else bytes(resp)  # type: ignore
-            # Slice into frames of ~50 ms at 24kHz
-            frame_samples = int(0.05 * 24000)
-            sample_width = 2  # int16
-            step = frame_samples * sample_width
-            for i in range(0, len(pcm_bytes), step):
-                frame = pcm_bytes[i:i+step]
-                if not frame:
-                    continue
-                audio_24k = np.frombuffer(frame, dtype=np.int16).astype(np.float32) / 32768.0
-                audio_out = resample(audio_24k, from_rate=24000, to_rate=settings.SAMPLE_RATE)
-                yield audio_out
+        if self.cache:
+            self.cache.save()
+        await super().__aexit__(*a)
+
+    def cache_key(self, text: str) -> str:
+        return PhraseCache.key(settings.TTS_PROVIDER, settings.TTS_MODEL, settings.TTS_VOICE,
+                               text, settings.SAMPLE_RATE)
+
+    def cached_seconds(self, text: str) -> float | None:
+        """How long a phrase in the cache plays for; None if it is not cached."""
+        if not self.cache:
+            return None
+        n = self.cache.samples(self.cache_key(text))
+        return n / settings.SAMPLE_RATE if n is not None else None
+
+    async def stream(self, text: str, cached: bool = False, trace: bool = True) -> AsyncGenerator[np.ndarray, None]:
+        """Yield PCM chunks (float32, mono, [-1,1]) at settings.SAMPLE_RATE.
+        With cached=True the phrase is played from (and saved to) the phrase
+        cache; use it for fixed strings like fillers, not for replies.
+        trace=False keeps the call out of the turn's latency trace (fillers).
+        """
+        if not (cached and self.cache):
+            async for chunk in self._synth(text, trace):
+                yield chunk
+            return
+        key = self.cache_key(text)
+        pcm = self.cache.get(key)
+        if pcm is not None:
+            # not a TTS request: the turn's tts_* spans come from real synthesis
+            metrics.inc("tts.cache_hits")
+            step = int(0.05 * settings.SAMPLE_RATE)
+            for i in range(0, len(pcm), step):
+                yield pcm[i:i + step].astype(np.float32) / 32768.0
+            return
+        metrics.inc("tts.cache_misses")
+        chunks = []
+        async for chunk in self._synth(text, trace):
+            chunks.append(chunk)
+            yield chunk
+        # only reached if the phrase was played to the end
+        if chunks:
+            audio = np.concatenate(chunks)
+            self.cache.put(key, (np.clip(audio, -1.0, 1.0) * 32767.0).astype(np.int16), text)
+
+    async def prewarm(self, phrases: list[str]):
+        """Synthesize any phrases missing from the cache. Meant to run in the background."""
+        if not self.cache:
             return
-        raise NotImplementedError(f"TTS provider '{settings.TTS_PROVIDER}' not implemented")
+        for phrase in phrases:
+            if self.cache_key(phrase) in self.cache:
+                continue
+            try:
+                async for _ in self.stream(phrase, cached=True, trace=False):
+                    pass
+            except Exception as e:
+                print(f"[tts] Warning: could not pre-warm {phrase!r}: {e}")
+
+    async def _synth(self, text: str, trace: bool = True) -> AsyncGenerator[np.ndarray, None]:
+        t0 = time.monotonic()
+        if trace:
+            tracer.mark("tts_request", t0)
+        with netwatch.reporting():
+            async for chunk in self._decode(self.backend.synth(text), t0, trace):
+                yield chunk
+
+    async def _decode(self, data_iter: AsyncIterator[bytes], t0: float, trace: bool) -> AsyncGenerator[np.ndarray, None]:
+        """pcm16 bytes at TTS_RATE in, float32 frames at SAMPLE_RATE out."""
+        framer = PcmFramer(int(0.05 * TTS_RATE))  # ~50 ms frames
+        rs = Resampler(TTS_RATE, settings.SAMPLE_RATE)
+        first_byte = first_frame = True
+        async for data in data_iter:
+            if first_byte:
+                first_byte = False
+                metrics.set("tts.time_to_first_byte_ms", (time.monotonic() - t0) * 1000.0)
+                if trace:
+                    tracer.mark("tts_first_byte")
+            for audio_24k in framer.feed(data):
+                if first_frame:
+                    first_frame = False
+                    metrics.set("tts.time_to_first_frame_ms", (time.monotonic() - t0) * 1000.0)
+                    if trace:
+                        tracer.mark("tts_first_frame")
+                yield rs.process(audio_24k)
+        tail = framer.flush()
+        if tail is not None:
+            yield rs.process(tail)
+        tail = rs.flush()
+        if len(tail):
+            yield tail
@@ -0,0 +1,84 @@
+import io, time, wave
+import numpy as np
+from .config import settings
+from .endpoint import frame_energy_db
+from .metrics import metrics
+from .resample import Resampler
+
+try:
+    import soundfile as sf
+except Exception:  # optional: only needed for flac/ogg/opus uploads
+    sf = None
+
+# format -> (file name sent to the API, soundfile format, subtype)
+FORMATS = {
+    "wav": ("audio.wav", "WAV", "PCM_16"),
+    "flac": ("audio.flac", "FLAC", "PCM_16"),
+    "ogg": ("audio.ogg", "OGG", "VORBIS"),
+    "opus": ("audio.ogg", "OGG", "OPUS"),
+}
+
+def trim_silence(audio: np.ndarray, rate: int, pad_ms: int | None = None,
+                 frame_ms: int = 20, margin_db: float = 10.0) -> np.ndarray:
+    """Drop leading/trailing frames quieter than the noise floor + margin.
+    Returns a view; keeps `pad_ms` of context on each side. Audio with no
+    quiet frames to take the floor from (steady speech or noise throughout)
+    is returned whole; only a capture quieter than ENDPOINT_MIN_DB
+    everywhere comes back empty.
+    """
+    pad_ms = pad_ms if pad_ms is not None else settings.STT_TRIM_PAD_MS
+    frame = int(rate * frame_ms / 1000)
+    n = len(audio) // frame
+    if n < 2:
+        return audio
+    db = frame_energy_db(audio[:n * frame].reshape(n, frame))
+    thresh = max(float(np.percentile(db, 10)) + margin_db, settings.ENDPOINT_MIN_DB)
+    loud = np.flatnonzero(db >= thresh)
+    if loud.size == 0:
+        return audio[:0] if db.max() < settings.ENDPOINT_MIN_DB else audio
+    pad = int(rate * pad_ms / 1000)
+    start = max(0, loud[0] * frame - pad)
+    end = min(len(audio), (loud[-1] + 1) * frame + pad)
+    return audio[start:end]
+
+def prepare_upload(audio: np.ndarray, rate: int, fmt: str | None = None) -> tuple[str, bytes] | None:
+    """Trim, downmix, resample and encode a capture for STT upload.
+    Returns (file name, encoded bytes), or None if nothing but silence is
+    left. Falls back to WAV if the configured format needs soundfile and it
+    isn't installed.
+    """
+    t0 = time.perf_counter()
+    fmt = (fmt or settings.STT_UPLOAD_FORMAT).lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown STT_UPLOAD_FORMAT '{fmt}'")
+    if fmt != "wav" and sf is None:
+        print(f"[stt] soundfile not installed; uploading WAV instead of {fmt}.")
+        fmt = "wav"
+
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    trimmed = trim_silence(audio, rate)
+    kept = len(trimmed)
+    if kept == 0:
+        return None
+    out_rate = settings.STT_UPLOAD_RATE or rate
+    if out_rate != rate:
+        rs = Resampler(rate, out_rate)
+        trimmed = np.concatenate([rs.process(trimmed), rs.flush()])
+    pcm = np.clip(trimmed, -1.0, 1.0)
+    pcm = (pcm * 32767.0).astype(np.int16)
+
+    name, sf_format, subtype = FORMATS[fmt]
+    buf = io.BytesIO()
+    if fmt == "wav":
+        with wave.open(buf, "wb") as wf:
+            wf.setnchannels(1); wf.setsampwidth(2); wf.setframerate(out_rate)
+            wf.writeframes(pcm.tobytes())
+    else:
+        sf.write(buf, pcm, out_rate, format=sf_format, subtype=subtype)
+    data = buf.getvalue()
+
+    metrics.set("stt.upload_bytes", len(data))
+    metrics.set("stt.encode_ms", (time.perf_counter() - t0) * 1000.0)
+    metrics.set("stt.trimmed_ms", (len(audio) - kept) / rate * 1000.0)
+    return name, data
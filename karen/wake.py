@@ -1,26 +1,14 @@
 # wake.py — Offline wake-word (“Hey Karen”) using openWakeWord on Raspberry Pi
-from _future_ import annotations
+from __future__ import annotations
 import asyncio
+import collections
+import threading
 import time
 import os
-from typing import Optional, Sequence
+from typing import Callable, Optional, Sequence
 import numpy as np
-import sounddevice as sd
-
-try:
-    import openwakeword
-    from openwakeword.model import Model
-except Exception as e:
-    raise RuntimeError(
-        "openwakeword is required. pip install openwakeword sounddevice numpy"
-    ) from e
-
-try:
-    import soundfile as sf
-except Exception as e:
-    raise RuntimeError(
-        "soundfile is required for recording. pip install soundfile"
-    ) from e
+from .capture import CaptureHub, HubReader, FrameAssembler
+from .metrics import metrics, tracer
 
 # Optional settings import; falls back to sane defaults for Pi
 try:
@@ -31,7 +19,7 @@ except Exception:
         USE_PRETRAINED = False
         WAKE_THRESHOLD = 0.5
         WAKE_TRIGGER_LEVEL = 3
-        WAKE_COOLDOWN_MS = 1200
+        WAKE_COOLDOWN_S = 2.0
         WAKE_DEVICE = None
         WAKE_VAD_THRESHOLD = 0.5
         WAKE_SPEEX_NS = False
@@ -47,6 +35,15 @@ def record_wakeword_samples(num_samples: int = 10, sample_rate: int = 16000, cha
     Record wake word samples for training a custom model.
     Saves as .wav files in 'wake_training_data'.
     """
+    import sounddevice as sd
+    from .wake_data import trim
+    try:
+        import soundfile as sf
+    except Exception as e:
+        raise RuntimeError(
+            "soundfile is required for recording. pip install soundfile"
+        ) from e
+
     os.makedirs('wake_training_data', exist_ok=True)
     
     print(f"\n=== Recording {num_samples} 'Hey Karen' samples ===")
@@ -67,55 +64,239 @@ def record_wakeword_samples(num_samples: int = 10, sample_rate: int = 16000, cha
         with sd.InputStream(samplerate=sample_rate, channels=channels, dtype='float32') as stream:
             audio = stream.read(int(sample_rate * duration_sec))[0]
         
-        thresh = 0.01
-        start_idx = 0
-        end_idx = len(audio)
-        for j, sample in enumerate(audio):
-            if abs(sample) > thresh:
-                start_idx = max(0, j - int(sample_rate * 0.1))
-                break
-        for j in range(len(audio) - 1, 0, -1):
-            if abs(audio[j]) > thresh:
-                end_idx = min(len(audio), j + int(sample_rate * 0.1))
-                break
-        
-        audio_trimmed = audio[start_idx:end_idx]
+        audio_trimmed = trim(audio.mean(axis=1), sample_rate)
         filename = os.path.join('wake_training_data', f'hey_karen_{i:02d}.wav')
         sf.write(filename, audio_trimmed, sample_rate)
         print(f"Saved {filename}")
     
     print(f"\nAll {num_samples} samples recorded in 'wake_training_data'.")
+    print("Augment them into a training set with:")
+    print("python -m karen.wake_data wake_training_data wake_dataset --count 5000 --format wav")
     print("Train the model with:")
-    print("python -c \"import openwakeword; openwakeword.train(wake_word='hey_karen', positive_path='wake_training_data/', save_path='hey_karen.tflite')\"")
+    print("python -c \"import openwakeword; openwakeword.train(wake_word='hey_karen', positive_path='wake_dataset/', save_path='hey_karen.tflite')\"")
+
+def load_model(model_paths: Sequence[str], vad_threshold: float = 0.0, use_speex_ns: bool = False):
+    """An openWakeWord Model scoring every model in `model_paths`."""
+    from openwakeword.model import Model
+    return Model(
+        wakeword_models=list(model_paths),
+        vad_threshold=vad_threshold,
+        enable_speex_noise_suppression=use_speex_ns,
+        ncpu=int(getattr(settings, "WAKE_THREADS", 1)),
+    )
+
+def streak_step(streak: int, score: float, threshold: float) -> int:
+    """The trigger streak after a score: up one on a hit, down one (to 0) on a miss."""
+    return streak + 1 if score >= threshold else max(0, streak - 1)
+
+def replay_triggers(scores: np.ndarray, threshold: float, trigger_level: int, cooldown_frames: int) -> list[int]:
+    """Frame indices at which WakeWordService would trigger on a track of per-frame scores.
+
+    The same rule as the service (streak_step, fire once the streak reaches
+    trigger_level and the cooldown has passed, then start over), but only
+    frames at or above the threshold are visited, so a long quiet track
+    costs one vectorised comparison.
+    """
+    fires: list[int] = []
+    streak, prev, last = 0, -1, None
+
+    def fire_in_gap(end: int):
+        # a cooldown can end during a run of misses while the decaying streak is still high enough
+        nonlocal streak, last
+        if last is None or not streak:
+            return
+        at = max(prev + 1, last + cooldown_frames)
+        if at < end and streak - (at - prev) >= trigger_level:
+            fires.append(at)
+            last, streak = at, 0
+
+    for i in np.flatnonzero(scores >= threshold).tolist():
+        fire_in_gap(i)
+        streak = max(0, streak - (i - prev - 1)) + 1
+        prev = i
+        if streak >= trigger_level and (last is None or i - last >= cooldown_frames):
+            fires.append(i)
+            last, streak = i, 0
+    fire_in_gap(len(scores))
+    return fires
+
+class InferenceWorker:
+    """Runs a wake-word model on its own thread, fed through a frame queue.
+
+    submit() queues a frame from the event loop and returns at once. The
+    thread scores frames in order; when it has fallen behind it scores up to
+    `max_batch` queued frames in one predict() call (openWakeWord takes any
+    multiple of 80 ms, and a longer chunk costs less than its frames one by
+    one; the scores are those of its last frame). `on_scores(scores, batch)`
+    is called on the thread with the queued (frame, end_pos, tag, submitted)
+    tuples it covers. Beyond `max_backlog` queued frames the oldest are
+    dropped. `cpus` pins the thread to those cores (Linux only).
+    """
+    def __init__(self, predict: Callable, on_scores: Callable, cpus: Sequence[int] = (),
+                 max_batch: int = 4, max_backlog: int = 25):
+        self._predict = predict
+        self._on_scores = on_scores
+        self.cpus = set(cpus)
+        self.max_batch = max(1, int(max_batch))
+        self.max_backlog = max(1, int(max_backlog))
+        self._frames: collections.deque = collections.deque()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="wake-inference", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def submit(self, frame: np.ndarray, end_pos: int, tag=None):
+        """Queue a copy of `frame`, whose last sample is at hub position end_pos - 1."""
+        item = (frame.copy(), end_pos, tag, time.perf_counter())
+        with self._cond:
+            if len(self._frames) >= self.max_backlog:
+                self._frames.popleft()
+                metrics.inc("wake.dropped_frames")
+            self._frames.append(item)
+            self._cond.notify()
+
+    def clear(self):
+        with self._cond:
+            self._frames.clear()
+
+    @property
+    def backlog(self) -> int:
+        """Frames queued and not yet scored (wake.backlog_frames records it as each batch is taken)."""
+        return len(self._frames)
+
+    def stop(self, timeout: float = 1.0):
+        with self._cond:
+            self._stopped = True
+            self._frames.clear()
+            self._cond.notify()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _run(self):
+        if self.cpus and hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(0, self.cpus)  # pid 0: this thread
+            except OSError as e:
+                print(f"[wake] Could not pin inference to CPUs {sorted(self.cpus)}: {e}")
+        while True:
+            with self._cond:
+                while not self._frames and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                backlog = len(self._frames)
+                batch = [self._frames.popleft() for _ in range(min(backlog, self.max_batch))]
+            audio = batch[0][0] if len(batch) == 1 else np.concatenate([b[0] for b in batch])
+            t0 = time.perf_counter()
+            try:
+                scores = self._predict(audio)
+            except Exception as e:
+                metrics.inc("wake.errors")
+                print(f"[wake] Inference failed: {e}")
+                continue
+            infer_ms = (time.perf_counter() - t0) * 1000.0
+            metrics.set("wake.infer_ms", infer_ms)
+            metrics.set("wake.backlog_frames", backlog)
+            metrics.inc("wake.batches")
+            metrics.inc("wake.frames", len(batch))
+            tracer.observe("wake.infer_ms", infer_ms)
+            tracer.observe("wake.queue_ms", (t0 - batch[0][3]) * 1000.0)
+            tracer.observe("wake.backlog_frames", backlog)
+            self._on_scores(scores, batch)
 
 class WakeWordService:
-    def _init_(
+    """Scores frames from a CaptureHub reader with openWakeWord.
+    The hub keeps capturing while paused; pausing only stops inference.
+    `trigger_pos` is the hub sample position at the end of the wake word and
+    `trigger_ts` the monotonic time it was detected. Pass `echo` (an
+    EchoCanceller) to score frames with Karen's own playback subtracted, and
+    `model` to use any object with openWakeWord's predict() instead of
+    loading model files, or a zero-argument callable that builds one.
+    Models load in a worker thread after __aenter__ returns; the detector
+    reads the hub from that moment, so a wake word said while loading is
+    still caught, and ready() waits for it to be listening. `on_trigger`, if
+    set, is called on the event loop on every trigger, before wait() returns.
+    With `worker` (settings.WAKE_WORKER) frames are scored by an
+    InferenceWorker thread, so a slow model delays detection rather than
+    the event loop; echo cancellation stays on the loop, which owns the
+    playback reference. Without it, frames are scored inline on the loop.
+    """
+    def __init__(
         self,
+        hub: CaptureHub,
         model_paths: Optional[Sequence[str]] = None,
         threshold: Optional[float] = None,
         trigger_level: Optional[int] = None,
         vad_threshold: Optional[float] = None,
         use_speex_ns: Optional[bool] = None,
-        device: Optional[int] = None,
         cooldown_ms: Optional[int] = None,
+        echo=None,
+        model=None,
+        worker: Optional[bool] = None,
     ):
         self.model_paths = list(model_paths) if model_paths is not None else list(getattr(settings, "WAKE_MODEL_PATHS", []))
         self.threshold = float(threshold if threshold is not None else getattr(settings, "WAKE_THRESHOLD", 0.5))
         self.trigger_level = int(trigger_level if trigger_level is not None else getattr(settings, "WAKE_TRIGGER_LEVEL", 3))
         self.vad_threshold = float(vad_threshold if vad_threshold is not None else getattr(settings, "WAKE_VAD_THRESHOLD", 0.0))
         self.use_speex_ns = bool(use_speex_ns if use_speex_ns is not None else getattr(settings, "WAKE_SPEEX_NS", False))
-        self.device = device if device is not None else getattr(settings, "WAKE_DEVICE", None)
-        self.cooldown_s = (cooldown_ms if cooldown_ms is not None else getattr(settings, "WAKE_COOLDOWN_MS", 1200)) / 1000.0
+        self.hub = hub
+        self.cooldown_s = cooldown_ms / 1000.0 if cooldown_ms is not None else float(getattr(settings, "WAKE_COOLDOWN_S", 2.0))
 
-        self._model: Model | None = None
-        self._stream: sd.InputStream | None = None
-        self._queue: asyncio.Queue[np.ndarray] = asyncio.Queue(maxsize=32)
+        self.use_worker = bool(worker if worker is not None else getattr(settings, "WAKE_WORKER", True))
+
+        self.echo = echo
+        self._model = model
+        self._inference: InferenceWorker | None = None
+        self._gen = 0      # bumped on pause; frames and triggers from before are stale
+        self._streak = 0
+        self._streak_gen = 0
+        self._loading: asyncio.Future | None = None
+        self._reader: HubReader | None = None
         self._worker: asyncio.Task | None = None
         self._event = asyncio.Event()
         self._armed = False
         self._last_trigger_ts = 0.0
+        self.trigger_pos = 0
+        self.trigger_ts = 0.0
+        self.on_trigger = None
+
+    async def __aenter__(self):
+        self._loop = asyncio.get_running_loop()
+        self._reader = self.hub.reader(name="wake")
+        if self._model is None or not hasattr(self._model, "predict"):
+            # submitted now, not on the next loop iteration, so it overlaps whatever runs next
+            self._loading = self._loop.run_in_executor(None, self._load_models)
+        else:
+            print("[wake] Armed. Say 'Hey Karen' or wait for dummy trigger.")
+        self._worker = asyncio.create_task(self._listen_loop())
+        self._armed = True
+        return self
 
-    async def _aenter_(self):
+    async def ready(self):
+        """Wait until the model is loaded and the detector is listening."""
+        if self._loading is not None:
+            await asyncio.shield(self._loading)
+
+    def _load_models(self):
+        self._build_model()
+        print("[wake] Armed. Say 'Hey Karen' or wait for dummy trigger.")
+
+    def _build_model(self):
+        if self._model is not None:
+            self._model = self._model()
+            return
+        try:
+            import openwakeword
+            import openwakeword.model  # noqa: F401
+        except Exception as e:
+            if not self.model_paths and not getattr(settings, "USE_PRETRAINED", False):
+                print("[wake] No wake word models available. Running in dummy mode (wakes every 5s).")
+                return
+            raise RuntimeError(
+                "openwakeword is required. pip install openwakeword sounddevice numpy"
+            ) from e
         # Load custom or pretrained models
         if not self.model_paths and getattr(settings, "USE_PRETRAINED", False):
             try:
@@ -134,28 +315,22 @@ class WakeWordService:
 
         if self.model_paths:
             print(f"[wake] Loading wake word models: {self.model_paths}")
-            self._model = Model(
-                wakeword_models=self.model_paths,
-                vad_threshold=self.vad_threshold,
-                enable_speex_noise_suppression=self.use_speex_ns
-            )
+            self._model = load_model(self.model_paths, self.vad_threshold, self.use_speex_ns)
         else:
             print("[wake] No wake word models available. Running in dummy mode (wakes every 5s).")
             self._model = None
 
-        self._open_stream()
-        self._worker = asyncio.create_task(self._listen_loop())
-        self._armed = True
-        print("[wake] Armed. Say 'Hey Karen' or wait for dummy trigger.")
-        return self
-
-    async def _aexit_(self, *a):
+    async def __aexit__(self, *a):
         await self._teardown()
 
     async def wait(self):
+        await self.ready()
         if self._model is None:
             print("[wake] No model; waiting 5 seconds for demo...")
             await asyncio.sleep(5)
+            self.trigger_pos = self.hub.position
+            self.trigger_ts = time.monotonic()
+            tracer.start_turn(self.trigger_ts)
             self._event.set()
         else:
             await self._event.wait()
@@ -165,6 +340,9 @@ class WakeWordService:
         if not self._armed:
             return
         self._armed = False
+        self._gen += 1
+        if self._inference:
+            self._inference.clear()
         if self._worker:
             self._worker.cancel()
             try:
@@ -172,46 +350,41 @@ class WakeWordService:
             except asyncio.CancelledError:
                 pass
             self._worker = None
-        self._close_stream()
+        self._close_reader()
         print("[wake] Paused.")
 
     async def resume(self):
         if self._armed:
             return
-        self._open_stream()
+        # skip what was said during the turn
+        self._reader = self.hub.reader(name="wake")
         self._worker = asyncio.create_task(self._listen_loop())
         self._armed = True
         print("[wake] Re-armed.")
 
-    def _open_stream(self):
-        def cb(indata, frames, time_info, status):
-            if status:
-                pass
-            mono = indata[:, 0]
-            try:
-                self._queue.put_nowait(mono.copy())
-            except asyncio.QueueFull:
-                pass
+    @property
+    def detecting(self) -> bool:
+        """True if a real detector is running (not the 5 s dummy trigger)."""
+        return self._model is not None
 
-        self._stream = sd.InputStream(
-            samplerate=settings.SAMPLE_RATE,
-            channels=settings.CHANNELS,
-            dtype="float32",
-            callback=cb,
-            blocksize=0,
-            device=self.device,
-        )
-        self._stream.start()
-
-    def _close_stream(self):
-        if self._stream:
-            try:
-                self._stream.stop()
-                self._stream.close()
-            finally:
-                self._stream = None
+    @property
+    def backlog(self) -> int:
+        """Frames waiting for the inference worker."""
+        return self._inference.backlog if self._inference else 0
+
+    @property
+    def dropped_samples(self) -> int:
+        """Audio the detector missed because it fell behind the capture ring."""
+        return self._reader.dropped if self._reader else 0
+
+    def _close_reader(self):
+        if self._reader:
+            self._reader.close()
+            self._reader = None
 
     async def _teardown(self):
+        if self._loading and not self._loading.done():
+            self._loading.cancel()  # stops waiting; the loader thread runs to completion
         if self._worker:
             self._worker.cancel()
             try:
@@ -219,32 +392,66 @@ class WakeWordService:
             except asyncio.CancelledError:
                 pass
             self._worker = None
-        self._close_stream()
+        if self._inference:
+            inference, self._inference = self._inference, None
+            await asyncio.to_thread(inference.stop)
+        self._close_reader()
 
     async def _listen_loop(self):
+        await self.ready()
         if self._model is None:
             while True:
                 await asyncio.sleep(1)
+        frames = FrameAssembler(FRAME_SAMPLES, process=self.echo.process if self.echo else None)
+        if self.use_worker and self._inference is None:
+            self._inference = InferenceWorker(
+                self._model.predict, self._on_scores,
+                cpus=getattr(settings, "WAKE_CPUS", ()),
+                max_batch=getattr(settings, "WAKE_MAX_BATCH", 4),
+                max_backlog=getattr(settings, "WAKE_MAX_BACKLOG", 25),
+            )
+            self._inference.start()
+        while True:
+            frame_i16 = await frames.next_frame(self._reader)
+            if self._inference:
+                self._inference.submit(frame_i16, self._reader.pos, self._gen)
+            else:
+                t0 = time.perf_counter()
+                scores = self._model.predict(frame_i16)
+                tracer.observe("wake.infer_ms", (time.perf_counter() - t0) * 1000.0)
+                self._on_scores(scores, [(frame_i16, self._reader.pos, self._gen, t0)])
+
+    def _on_scores(self, scores: dict, batch: list):
+        """Track the trigger streak; runs wherever frames are scored."""
+        _, end_pos, gen, _ = batch[-1]
+        if gen != self._streak_gen:
+            self._streak_gen, self._streak = gen, 0
+        if gen != self._gen:
+            return
+        max_score = max(scores.values()) if scores else 0.0
+        # a batched predict() gives one score, for its last frame: it counts once,
+        # so a single high score can't reach trigger_level while the worker is behind
+        self._streak = streak_step(self._streak, max_score, self.threshold)
+        if self._streak < self.trigger_level:
+            return
+        now = time.monotonic()
+        if now - self._last_trigger_ts < self.cooldown_s:
+            return
+        self._last_trigger_ts = now
+        self._streak = 0
+        metrics.set("wake.latency_ms", (now - self.hub.time_at(end_pos)) * 1000.0)
+        if self._inference:
+            self._loop.call_soon_threadsafe(self._fire, end_pos, now, gen)
         else:
-            buf = np.empty(0, dtype=np.float32)
-            streak = 0
-            while True:
-                chunk = await self._queue.get()
-                buf = chunk if buf.size == 0 else np.concatenate([buf, chunk])
-                while buf.size >= FRAME_SAMPLES:
-                    frame_f32 = buf[:FRAME_SAMPLES]
-                    buf = buf[FRAME_SAMPLES:]
-                    frame_i16 = (np.clip(frame_f32, -1.0, 1.0) * 32767.0).astype(np.int16)
-                    scores = self._model.predict(frame_i16)
-                    max_score = max(scores.values()) if scores else 0.0
-                    if max_score >= self.threshold:
-                        streak += 1
-                    else:
-                        streak = max(0, streak - 1)
-                    if streak >= self.trigger_level:
-                        now = time.monotonic()
-                        if now - self._last_trigger_ts >= self.cooldown_s:
-                            self._last_trigger_ts = now
-                            streak = 0
-                            loop = asyncio.get_running_loop()
-                            loop.call_soon_threadsafe(self._event.set)
+            self._fire(end_pos, now, gen)
+
+    def _fire(self, end_pos: int, now: float, gen: int):
+        if gen != self._gen:
+            return  # paused since the frame was queued
+        # position just after the frame that completed the wake word
+        self.trigger_pos = end_pos
+        self.trigger_ts = now
+        tracer.start_turn(now)
+        self._event.set()
+        if self.on_trigger is not None:
+            self.on_trigger()
@@ -0,0 +1,257 @@
+"""Wake-word training data: trim, normalise and augment recordings into shards.
+
+    python -m karen.wake_data wake_training_data wake_dataset --count 5000 [--noise-dir DIR]
+
+Each recording (16-bit WAV, as written by wake.record_wakeword_samples) is
+trimmed to the speech and peak-normalised once. Every output clip then
+takes a recording and, from its own generator seeded with --seed and the
+clip number, perturbs its speed and pitch, adds room reverb, places it in a
+fixed --clip-s window over background noise (a random stretch of a WAV
+under --noise-dir, or coloured noise) at a random SNR, and sets a random
+level. Clips are built a shard at a time across a process pool; each shard
+is written by its worker as an int16 .npy of shape (clips, samples), or a
+directory of WAVs with --format wav, and `manifest.jsonl` gets one line per
+clip with its shard, source and augmentation parameters. The same
+arguments give the same dataset whatever the number of processes.
+"""
+from __future__ import annotations
+import argparse, concurrent.futures, json, math, os, time, wave
+import numpy as np
+from .fakeaudio import read_wav, write_wav
+from .resample import Resampler
+
+RATE = 16000
+SPEED = (0.88, 1.12)          # playback speed (tempo and pitch together)
+PITCH_SEMITONES = 2.5         # +- pitch shift at constant tempo
+REVERB_P = 0.6                # share of clips with room reverb
+RT60_S = (0.15, 0.9)
+WET = (0.2, 0.7)
+NOISE_P = 0.9                 # share of clips with background noise
+SNR_DB = (0.0, 25.0)
+PEAK_DB = (-24.0, -1.0)       # final clip level
+
+def trim(audio: np.ndarray, rate: int, threshold: float = 0.01, pad_s: float = 0.1) -> np.ndarray:
+    """Cut leading and trailing audio below `threshold`, keeping `pad_s` either side."""
+    loud = np.flatnonzero(np.abs(audio) > threshold)
+    if not len(loud):
+        return audio[:0]
+    pad = int(pad_s * rate)
+    return audio[max(0, loud[0] - pad):min(len(audio), loud[-1] + 1 + pad)]
+
+def normalize(audio: np.ndarray, peak_db: float = -1.0) -> np.ndarray:
+    peak = np.abs(audio).max() if len(audio) else 0.0
+    if peak <= 0:
+        return audio.astype(np.float32)
+    return (audio * (10 ** (peak_db / 20) / peak)).astype(np.float32)
+
+def resample(audio: np.ndarray, from_rate: int, to_rate: int) -> np.ndarray:
+    if from_rate == to_rate:
+        return audio.astype(np.float32)
+    rs = Resampler(from_rate, to_rate)
+    return np.concatenate([rs.process(audio.astype(np.float32)), rs.flush()])
+
+def change_speed(audio: np.ndarray, factor: float, rate: int = RATE) -> np.ndarray:
+    """Play `factor` times faster (shorter and higher). The factor is rounded to
+    a multiple of 1/160 so the polyphase filter bank stays small."""
+    step = rate // 160
+    return resample(audio, int(round(rate * factor / step)) * step, rate)
+
+def time_stretch(audio: np.ndarray, factor: float, n_fft: int = 512, hop: int = 128) -> np.ndarray:
+    """Phase-vocoder tempo change: `factor` times faster at the same pitch (hop must divide n_fft)."""
+    if len(audio) < n_fft or abs(factor - 1.0) < 1e-3:
+        return audio.astype(np.float32)
+    window = np.hanning(n_fft)
+    x = np.pad(audio, (n_fft // 2, n_fft // 2 + hop))
+    frames = np.lib.stride_tricks.sliding_window_view(x, n_fft)[::hop]
+    spec = np.fft.rfft(frames * window, axis=1)
+    steps = np.arange(0, len(spec) - 1, factor)
+    i = steps.astype(int)
+    frac = (steps - i)[:, None]
+    mag = (1 - frac) * np.abs(spec[i]) + frac * np.abs(spec[i + 1])
+    omega = 2 * np.pi * hop * np.arange(spec.shape[1]) / n_fft
+    dphi = np.angle(spec[i + 1]) - np.angle(spec[i]) - omega
+    dphi -= 2 * np.pi * np.round(dphi / (2 * np.pi))
+    phase = np.angle(spec[0]) + np.cumsum(np.vstack([np.zeros_like(omega), (omega + dphi)[:-1]]), axis=0)
+    out_frames = np.fft.irfft(mag * np.exp(1j * phase), n=n_fft, axis=1) * window
+    # overlap-add: hop divides n_fft, so each frame is n_fft // hop hop-sized blocks
+    k, n = n_fft // hop, len(out_frames)
+    blocks = out_frames.reshape(n, k, hop)
+    out = np.zeros((n + k - 1, hop))
+    norm = np.zeros((n + k - 1, hop))
+    for j in range(k):
+        out[j:j + n] += blocks[:, j]
+        norm[j:j + n] += window[j * hop:(j + 1) * hop] ** 2
+    out = out.ravel() / np.maximum(norm.ravel(), 1e-3)
+    return out[n_fft // 2:n_fft // 2 + int(len(audio) / factor)].astype(np.float32)
+
+def shift_pitch(audio: np.ndarray, semitones: float, rate: int = RATE) -> np.ndarray:
+    """Raise the pitch by `semitones` at about the same length."""
+    factor = 2 ** (semitones / 12)
+    return change_speed(time_stretch(audio, 1 / factor), factor, rate)
+
+def room_impulse(rng: np.random.Generator, rt60: float, rate: int = RATE) -> np.ndarray:
+    """A synthetic room: a direct path, then exponentially decaying diffuse noise."""
+    n = int(rt60 * rate)
+    t = np.arange(n) / rate
+    tail = rng.standard_normal(n) * np.exp(-6.9 * t / rt60)   # -60 dB at rt60
+    tail[:int(rng.uniform(0.003, 0.02) * rate)] = 0.0          # delay to the first reflections
+    ir = tail / (np.sqrt(np.sum(tail ** 2)) + 1e-12)
+    ir[0] = 1.0
+    return ir
+
+def reverberate(audio: np.ndarray, ir: np.ndarray, wet: float) -> np.ndarray:
+    n = len(audio) + len(ir) - 1
+    size = 1 << (n - 1).bit_length()
+    y = np.fft.irfft(np.fft.rfft(audio, size) * np.fft.rfft(ir, size), size)[:len(audio)]
+    y *= np.sqrt(np.sum(audio ** 2) / (np.sum(y ** 2) + 1e-12))
+    return ((1 - wet) * audio + wet * y).astype(np.float32)
+
+def coloured_noise(rng: np.random.Generator, n: int) -> np.ndarray:
+    """White to brown noise (spectral slope 0 to -2) at unit RMS."""
+    spec = np.fft.rfft(rng.standard_normal(n))
+    f = np.maximum(np.fft.rfftfreq(n), 1.0 / n)
+    x = np.fft.irfft(spec * f ** (-rng.uniform(0.0, 1.0)), n)
+    return x / (np.sqrt(np.mean(x ** 2)) + 1e-12)
+
+def mix_noise(audio: np.ndarray, noise: np.ndarray, snr_db: float) -> np.ndarray:
+    """Add `noise` scaled so the speech (non-silent part) sits `snr_db` above it."""
+    speech = audio[np.abs(audio) > 1e-4]
+    p_speech = np.mean(speech ** 2) if len(speech) else 0.0
+    p_noise = np.mean(noise ** 2) + 1e-12
+    return (audio + noise * np.sqrt(p_speech / p_noise / 10 ** (snr_db / 10))).astype(np.float32)
+
+class NoiseBank:
+    """Random stretches of background audio from a directory of 16-bit WAVs, at RATE."""
+    def __init__(self, directory: str | None):
+        self.files = []
+        if directory:
+            for root, _, names in os.walk(directory):
+                self.files += sorted(os.path.join(root, n) for n in names if n.endswith(".wav"))
+
+    def take(self, rng: np.random.Generator, n: int) -> tuple[np.ndarray, str]:
+        if not self.files:
+            return coloured_noise(rng, n), "coloured"
+        path = self.files[rng.integers(len(self.files))]
+        with wave.open(path, "rb") as wf:
+            rate, ch, total = wf.getframerate(), wf.getnchannels(), wf.getnframes()
+            need = int(math.ceil(n * rate / RATE)) + 64
+            start = int(rng.integers(max(1, total - need)))
+            wf.setpos(start)
+            data = np.frombuffer(wf.readframes(need), dtype=np.int16)
+        audio = (data.reshape(-1, ch).mean(axis=1) if ch > 1 else data).astype(np.float32) / 32768.0
+        audio = resample(audio, rate, RATE)
+        if len(audio) < n:
+            audio = np.resize(audio, n)   # short file: loop it
+        return audio[:n], f"{os.path.basename(path)}@{start / rate:.2f}"
+
+def prepare(paths: list[str]) -> list[tuple[str, np.ndarray]]:
+    """Trimmed, peak-normalised recordings at RATE; silent ones are skipped."""
+    out = []
+    for path in paths:
+        audio, rate = read_wav(path)
+        audio = trim(resample(audio, rate, RATE), RATE)
+        if len(audio):
+            out.append((os.path.basename(path), normalize(audio)))
+    return out
+
+def augment(clip: np.ndarray, rng: np.random.Generator, noise: NoiseBank, clip_samples: int) -> tuple[np.ndarray, dict]:
+    """One training clip from a prepared recording, and the parameters drawn for it."""
+    p: dict = {"speed": round(float(rng.uniform(*SPEED)), 4),
+               "pitch_semitones": round(float(rng.uniform(-PITCH_SEMITONES, PITCH_SEMITONES)), 3)}
+    audio = change_speed(clip, p["speed"])
+    audio = shift_pitch(audio, p["pitch_semitones"])
+    if rng.random() < REVERB_P:
+        p["rt60_s"], p["wet"] = round(float(rng.uniform(*RT60_S)), 3), round(float(rng.uniform(*WET)), 3)
+        audio = reverberate(audio, room_impulse(rng, p["rt60_s"]), p["wet"])
+    # the wake word ends somewhere in the last half of the window
+    audio = audio[-clip_samples:]
+    end = int(rng.integers(max(len(audio), clip_samples // 2), clip_samples + 1))
+    out = np.zeros(clip_samples, dtype=np.float32)
+    out[end - len(audio):end] = audio
+    p["speech_s"] = [round((end - len(audio)) / RATE, 3), round(end / RATE, 3)]
+    if rng.random() < NOISE_P:
+        bg, p["noise"] = noise.take(rng, clip_samples)
+        p["snr_db"] = round(float(rng.uniform(*SNR_DB)), 2)
+        out = mix_noise(out, bg, p["snr_db"])
+    p["peak_db"] = round(float(rng.uniform(*PEAK_DB)), 2)
+    return normalize(out, p["peak_db"]), p
+
+# --- process pool ---------------------------------------------------------
+
+_sources: list[tuple[str, np.ndarray]] = []
+_noise: NoiseBank | None = None
+
+def _init_worker(sources, noise_dir):
+    global _sources, _noise
+    _sources, _noise = sources, NoiseBank(noise_dir)
+
+def build_shard(job: tuple) -> list[dict]:
+    """Write clips [first, first + n) as one shard; returns their manifest rows."""
+    out_dir, shard, first, n, seed, clip_samples, fmt = job
+    clips = np.zeros((n, clip_samples), dtype=np.int16)
+    rows = []
+    name = f"shard-{shard:05d}" + (".npy" if fmt == "npy" else "")
+    for k in range(n):
+        i = first + k
+        rng = np.random.default_rng([seed, i])
+        source, clip = _sources[i % len(_sources)]
+        audio, params = augment(clip, rng, _noise, clip_samples)
+        clips[k] = np.clip(audio * 32767.0, -32768, 32767)
+        row = {"clip": i, "shard": name, "index": k, "source": source, **params}
+        if fmt == "wav":
+            os.makedirs(os.path.join(out_dir, name), exist_ok=True)
+            row["path"] = f"{name}/clip-{i:06d}.wav"
+            write_wav(os.path.join(out_dir, row["path"]), audio, RATE)
+        rows.append(row)
+    if fmt == "npy":
+        tmp = os.path.join(out_dir, name + ".tmp.npy")
+        np.save(tmp, clips)
+        os.replace(tmp, os.path.join(out_dir, name))
+    return rows
+
+def build_dataset(recordings: str, out_dir: str, count: int, noise_dir: str | None = None,
+                  clip_s: float = 2.0, shard_size: int = 500, seed: int = 0, jobs: int | None = None,
+                  fmt: str = "npy") -> int:
+    """Augment the WAVs in `recordings` into `count` clips under `out_dir`; returns clips written."""
+    paths = sorted(os.path.join(recordings, n) for n in os.listdir(recordings) if n.endswith(".wav"))
+    sources = prepare(paths)
+    if not sources:
+        raise ValueError(f"no usable recordings in {recordings}")
+    os.makedirs(out_dir, exist_ok=True)
+    clip_samples = int(clip_s * RATE)
+    shards = [(out_dir, k, first, min(shard_size, count - first), seed, clip_samples, fmt)
+              for k, first in enumerate(range(0, count, shard_size))]
+    t0 = time.perf_counter()
+    written = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                                initargs=(sources, noise_dir)) as pool, \
+            open(os.path.join(out_dir, "manifest.jsonl"), "w") as manifest:
+        for rows in pool.map(build_shard, shards):
+            for row in rows:
+                manifest.write(json.dumps(row) + "\n")
+            written += len(rows)
+            print(f"\r[wake_data] {written}/{count} clips", end="", flush=True)
+    with open(os.path.join(out_dir, "dataset.json"), "w") as f:
+        json.dump({"rate": RATE, "clip_samples": clip_samples, "count": written, "seed": seed,
+                   "format": fmt, "sources": [s for s, _ in sources], "noise_dir": noise_dir}, f, indent=1)
+    print(f"\n[wake_data] {written} clips from {len(sources)} recordings in "
+          f"{time.perf_counter() - t0:.1f} s -> {out_dir}")
+    return written
+
+def main():
+    ap = argparse.ArgumentParser(description="Augment wake-word recordings into a training set.")
+    ap.add_argument("recordings", nargs="?", default="wake_training_data")
+    ap.add_argument("out", nargs="?", default="wake_dataset")
+    ap.add_argument("--count", type=int, default=5000)
+    ap.add_argument("--noise-dir", help="background WAVs to mix in (default: coloured noise)")
+    ap.add_argument("--clip-s", type=float, default=2.0)
+    ap.add_argument("--shard-size", type=int, default=500)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    ap.add_argument("--format", choices=["npy", "wav"], default="npy")
+    args = ap.parse_args()
+    build_dataset(args.recordings, args.out, args.count, args.noise_dir, args.clip_s,
+                  args.shard_size, args.seed, args.jobs, args.format)
+
+if __name__ == "__main__":
+    main()